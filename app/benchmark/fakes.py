@@ -0,0 +1,248 @@
+# This module provides in-process stand-ins used by the benchmark tools: synthetic LLM and TTS backends with fixed latency,
+# tracks that replay recorded PCM as 20 ms frames, a session output that collects the frames the agent speaks,
+# and a fake room that runs one ParticipantSession per simulated participant.
+
+# Import necessary libraries
+import sys
+import os
+import uuid
+import wave
+import asyncio
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "pipeline")))
+
+import numpy as np
+from typing import AsyncIterator, Dict, List
+
+DEFAULT_REPLY = "Sure, I can help with that. Our office is open from nine to five on weekdays, and you can reach support by email at any time."
+
+class SyntheticLLM:
+
+    """Replies with a fixed answer, streamed word by word after a first-token delay. Same call shapes as llm.stream_response / llm.generate_response."""
+
+    def __init__(self, reply: str = DEFAULT_REPLY, first_token_ms: float = 250, token_ms: float = 15):
+        self.reply = reply
+        self.first_token = first_token_ms / 1000
+        self.token_delay = token_ms / 1000
+
+    async def stream_response(self, user_input: str, use_cache: bool = True) -> AsyncIterator[str]:
+        await asyncio.sleep(self.first_token)
+        for i, word in enumerate(self.reply.split()):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield word if i == 0 else " " + word
+
+    async def generate_response(self, user_input: str, use_cache: bool = True) -> str:
+        await asyncio.sleep(self.first_token + self.token_delay * (len(self.reply.split()) - 1))
+        return self.reply
+
+class SyntheticTTS:
+
+    """Returns silence sized like real speech after a first-byte delay. Same call shapes as tts.stream_speech / tts.text_to_speech."""
+
+    def __init__(self, first_byte_ms: float = 200, chars_per_second: float = 15, output_dir: str = None):
+        self.first_byte = first_byte_ms / 1000
+        self.chars_per_second = chars_per_second
+        self.output_dir = output_dir or tempfile.gettempdir()
+
+    def _samples(self, text: str, sample_rate: int) -> int:
+        return int(max(len(text), 1) / self.chars_per_second * sample_rate)
+
+    async def stream_speech(self, text: str, language: str = "en", sample_rate: int = 16000, frame_ms: int = 20) -> AsyncIterator[bytes]:
+        await asyncio.sleep(self.first_byte)
+        frame_bytes = sample_rate * frame_ms // 1000 * 2
+        frames = -(-self._samples(text, sample_rate) * 2 // frame_bytes)
+        silence = bytes(frame_bytes)
+        for _ in range(frames):
+            yield silence
+
+    async def text_to_speech(self, text: str, language: str = "en", output_path: str = None, timer=None) -> str:
+        if timer is not None:
+            timer.mark("tts_start")
+        await asyncio.sleep(self.first_byte)
+        if timer is not None:
+            timer.mark("tts_first_byte")
+
+        output_path = output_path or os.path.join(self.output_dir, f"tts_synthetic_{uuid.uuid4().hex[:6]}.wav")
+        with wave.open(output_path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(16000)
+            f.writeframes(bytes(self._samples(text, 16000) * 2))
+        return output_path
+
+class PCMFrame:
+
+    """Minimal audio frame: the session only reads .data."""
+
+    def __init__(self, data: bytes, sample_rate: int = 16000):
+        self.data = data
+        self.sample_rate = sample_rate
+        self.num_channels = 1
+        self.samples_per_channel = len(data) // 2
+
+class ReplayTrack:
+
+    """Replays int16 PCM as fixed-size frames through recv(), optionally paced in real time, followed by trailing silence
+    so the session's end-of-utterance detector fires."""
+
+    def __init__(self, pcm: np.ndarray, sample_rate: int = 16000, frame_ms: int = 20, realtime: bool = True, trailing_silence_ms: int = 1500):
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_duration = frame_ms / 1000
+        self.realtime = realtime
+
+        silence = np.zeros(sample_rate * trailing_silence_ms // 1000, dtype=np.int16)
+        pcm = np.concatenate([np.asarray(pcm, dtype=np.int16), silence])
+        pad = -len(pcm) % self.frame_samples
+        self.pcm = np.concatenate([pcm, np.zeros(pad, dtype=np.int16)])
+
+        self.frames_sent = 0
+        self.late_frames = 0  # Frames sent more than one frame duration behind their real-time schedule
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / self.sample_rate
+
+    async def recv(self) -> AsyncIterator[PCMFrame]:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        for i in range(0, len(self.pcm), self.frame_samples):
+            if self.realtime:
+                due = start + self.frames_sent * self.frame_duration
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif -delay > self.frame_duration:
+                    self.late_frames += 1
+            else:
+                await asyncio.sleep(0)
+
+            self.frames_sent += 1
+            yield PCMFrame(self.pcm[i:i + self.frame_samples].tobytes(), self.sample_rate)
+
+class CollectingOutput:
+
+    """Session output that keeps count of the PCM frames the agent speaks instead of playing them."""
+
+    def __init__(self, keep_frames: bool = False):
+        self.keep_frames = keep_frames
+        self.frames: List[bytes] = []
+        self.frame_count = 0
+
+    async def capture_frame(self, frame: bytes):
+        self.frame_count += 1
+        if self.keep_frames:
+            self.frames.append(frame)
+
+class ConversationTrack(ReplayTrack):
+
+    """A participant holding a conversation: says the utterance, keeps sending silence until the agent has answered
+    (or gives up after max_wait seconds), pauses, and repeats for the given number of turns.
+    Frames more than drop_after_ms behind their real-time schedule are dropped, as a receiver's jitter buffer would."""
+
+    def __init__(self, pcm: np.ndarray, session, turns: int = 3, pause_ms: int = 500, max_wait: float = 15.0,
+                 drop_after_ms: int = 100, sample_rate: int = 16000, frame_ms: int = 20):
+        super().__init__(pcm, sample_rate=sample_rate, frame_ms=frame_ms, realtime=True, trailing_silence_ms=0)
+        self.session = session
+        self.turns = turns
+        self.pause_frames = pause_ms // frame_ms
+        self.max_wait = max_wait
+        self.drop_after = drop_after_ms / 1000
+        self.dropped_frames = 0
+        self.silence = bytes(self.frame_samples * 2)
+
+    def _utterance_frames(self):
+        for i in range(0, len(self.pcm), self.frame_samples):
+            yield self.pcm[i:i + self.frame_samples].tobytes()
+
+    async def recv(self) -> AsyncIterator[PCMFrame]:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        due_index = 0
+
+        async def paced(data: bytes):
+            nonlocal due_index
+            due = start + due_index * self.frame_duration
+            due_index += 1
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif -delay > self.drop_after:
+                self.dropped_frames += 1
+                return None
+            elif -delay > self.frame_duration:
+                self.late_frames += 1
+            self.frames_sent += 1
+            return PCMFrame(data, self.sample_rate)
+
+        for _ in range(self.turns):
+            answered = self.session.conversation_count + 1
+            for data in self._utterance_frames():
+                if (frame := await paced(data)) is not None:
+                    yield frame
+
+            # Keep the line open with silence while the agent detects the end of the turn and answers
+            waited = 0.0
+            started = False
+            while waited < self.max_wait:
+                if self.session.is_processing or self.session.is_speaking:
+                    started = True
+                elif started or self.session.conversation_count >= answered:
+                    break
+                if (frame := await paced(self.silence)) is not None:
+                    yield frame
+                waited += self.frame_duration
+
+            for _ in range(self.pause_frames):
+                if (frame := await paced(self.silence)) is not None:
+                    yield frame
+
+class FakeRoom:
+
+    """In-process stand-in for a LiveKit room served by one VoiceAgent: one ParticipantSession per participant,
+    all sharing the agent's turn limiter, each fed by a ConversationTrack."""
+
+    def __init__(self, name: str = "load-test", turn_limiter: asyncio.Semaphore = None, session_kwargs: dict = None):
+        self.name = name
+        self.turn_limiter = turn_limiter
+        self.session_kwargs = session_kwargs or {}
+        self.participants: Dict[str, tuple] = {}
+
+    def join(self, identity: str, pcm: np.ndarray, **track_kwargs):
+        from session import ParticipantSession
+
+        output = CollectingOutput()
+        session = ParticipantSession(f"{self.name}:{identity}", output, turn_limiter=self.turn_limiter, **self.session_kwargs)
+        track = ConversationTrack(pcm, session, **track_kwargs)
+        self.participants[identity] = (session, track, output)
+        return session, track
+
+    async def run(self, stagger: float = 1.0):
+        """Stream every participant's track into its session; starts are spread over stagger seconds."""
+        async def participant(index, session, track):
+            await asyncio.sleep(stagger * index / max(len(self.participants), 1))
+            await session.process_audio_stream(track)
+            while session.is_processing:
+                await asyncio.sleep(0.02)
+
+        await asyncio.gather(*(
+            participant(i, session, track) for i, (session, track, _) in enumerate(self.participants.values())
+        ))
+
+def backend_kwargs(name: str) -> dict:
+    """Keyword arguments for voice_agent_pipeline and ParticipantSession; the live backend uses their defaults
+    (which reach the mock servers when GROQ_API_URL / ELEVENLABS_API_URL point at them)."""
+    if name == "live":
+        return {"pipeline": {}, "session": {}}
+    llm, tts = SyntheticLLM(), SyntheticTTS()
+    return {
+        "pipeline": {"respond": llm.stream_response, "generate": llm.generate_response, "synthesize": tts.text_to_speech},
+        "session": {"respond": llm.stream_response, "synthesize": tts.stream_speech},
+    }
+
+def to_int16(audio: np.ndarray) -> np.ndarray:
+    """Float audio in [-1, 1] to int16 PCM."""
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
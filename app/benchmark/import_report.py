@@ -0,0 +1,89 @@
+# This module reports how long the entry-point modules take to import, each in a fresh interpreter with `python -X importtime`,
+# so a heavy dependency that creeps back into import time (a model load, an eager pandas or LiveKit import) shows up in review.
+# Per module it lists the total import time and the slowest packages it pulled in, and fails when a module exceeds its budget.
+#
+# Usage: python app/benchmark/import_report.py [--modules stt,session,ws_server] [--budget-ms 1500] [--top 10]
+#                                              [--output import_report.json]
+
+# Import necessary libraries
+import sys
+import os
+import json
+import argparse
+import subprocess
+from datetime import datetime
+from typing import Dict, List
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PIPELINE_DIR = os.path.join(APP_DIR, "pipeline")
+
+DEFAULT_MODULES = ("stt", "session", "voice_agent", "metrics_server", "ws_server", "livekit_backend")
+
+def measure(module: str) -> dict:
+    """Import one module in a new interpreter and parse its -X importtime trace (microseconds on stderr)."""
+    code = f"import sys; sys.path[:0] = [{PIPELINE_DIR!r}, {APP_DIR!r}]; import {module}"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+
+    imports: List[dict] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|", 2))
+        if not self_us.isdigit():
+            continue  # Header line
+        imports.append({"name": name.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000,
+                        "depth": (len(name) - len(name.lstrip())) // 2})
+
+    # The module itself is the last top-level entry of the trace
+    total = next((entry["cumulative_ms"] for entry in reversed(imports) if entry["name"] == module), None)
+    errors = [line for line in result.stderr.splitlines() if line and not line.startswith("import time:")]
+    return {
+        "module": module,
+        "ok": result.returncode == 0,
+        "total_ms": round(total, 1) if total is not None else None,
+        "imports": imports,
+        "error": errors[-1] if result.returncode != 0 and errors else None,
+    }
+
+def heaviest(imports: List[dict], module: str, top: int) -> List[Dict]:
+    """Top-level third-party packages and pipeline modules by cumulative time, other than the module itself."""
+    packages = [entry for entry in imports if "." not in entry["name"] and entry["name"] != module]
+    return sorted(({"name": e["name"], "cumulative_ms": round(e["cumulative_ms"], 1)} for e in packages),
+                  key=lambda e: e["cumulative_ms"], reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time report for the voice agent entry points")
+    parser.add_argument("--modules", default=",".join(DEFAULT_MODULES), help="Comma-separated pipeline modules to import")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="Import time above which a module fails the report")
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages listed per module")
+    parser.add_argument("--output", default="import_report.json")
+    args = parser.parse_args()
+
+    report = {"created": datetime.now().isoformat(timespec="seconds"), "budget_ms": args.budget_ms, "modules": []}
+    over_budget = []
+
+    for module in [name.strip() for name in args.modules.split(",") if name.strip()]:
+        result = measure(module)
+        entry = {key: result[key] for key in ("module", "ok", "total_ms", "error")}
+        entry["heaviest"] = heaviest(result["imports"], module, args.top)
+        report["modules"].append(entry)
+
+        if not result["ok"]:
+            print(f"{module}: import failed: {result['error']}")
+            continue
+        print(f"{module}: {result['total_ms']} ms")
+        for package in entry["heaviest"]:
+            print(f"    {package['cumulative_ms']:>9.1f} ms  {package['name']}")
+        if result["total_ms"] > args.budget_ms:
+            over_budget.append(module)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    if over_budget:
+        print(f"Over the {args.budget_ms} ms import budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
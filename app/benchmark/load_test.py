@@ -0,0 +1,192 @@
+# This module is the multi-participant load generator. It simulates N participants in a fake in-process room, each one
+# streaming recorded speech in real-time-paced 20 ms frames into its own ParticipantSession, exactly as the LiveKit
+# VoiceAgent would feed process_audio_stream. N is stepped up to find the point where one process stops meeting the latency target.
+# Per step it reports end-to-end latency percentiles, event-loop lag, late and dropped input frames, CPU and memory.
+#
+# Usage: python app/benchmark/load_test.py [--participants 1,2,4,8,16] [--turns 3] [--audio app/test/test_audio.wav]
+#                                          [--backend synthetic|live] [--output load_test_results.json]
+
+# Import necessary libraries
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+import logging
+import resource
+from datetime import datetime
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "pipeline")))
+
+from run_benchmark import peak_rss_mb  # Also applies the benchmark environment defaults
+import numpy as np
+from typing import List, Optional
+from config import settings
+from fakes import FakeRoom, backend_kwargs, to_int16
+
+logger = logging.getLogger(__name__)
+
+def current_rss_mb() -> Optional[float]:
+    """Resident set size right now (Linux /proc); None where unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError):
+        return None
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+class LoopLagMonitor:
+
+    """Measures how late the event loop wakes a sleeping task; sustained lag means frames and turns queue behind each other."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[float] = []
+        self.task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(loop.time() - start - self.interval, 0.0))
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> dict:
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        if not self.samples:
+            return {}
+        p50, p99 = np.percentile(self.samples, [50, 99])
+        return {"p50_ms": round(float(p50) * 1000, 1), "p99_ms": round(float(p99) * 1000, 1),
+                "max_ms": round(max(self.samples) * 1000, 1)}
+
+async def run_step(participants: int, pcm: np.ndarray, turns: int, session_kwargs: dict) -> dict:
+    """One load level: N participants talking at once for the given number of turns each."""
+    from latency import latency_stats
+
+    latency_stats.reset()
+    room = FakeRoom(f"load-{participants}", turn_limiter=asyncio.Semaphore(settings.MAX_CONCURRENT_TURNS), session_kwargs=session_kwargs)
+    for i in range(participants):
+        room.join(f"user-{i}", pcm, turns=turns)
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    cpu_start, wall_start = cpu_seconds(), time.perf_counter()
+
+    await room.run()
+
+    wall = time.perf_counter() - wall_start
+    cpu = cpu_seconds() - cpu_start
+    loop_lag = await monitor.stop()
+
+    sessions = [session for session, _, _ in room.participants.values()]
+    tracks = [track for _, track, _ in room.participants.values()]
+    latency = latency_stats.summary()
+
+    return {
+        "participants": participants,
+        "turns_completed": sum(session.conversation_count for session in sessions),
+        "turns_expected": participants * turns,
+        "wall_seconds": round(wall, 2),
+        "e2e_latency": latency.get("e2e_latency", {}),
+        "response_latency": latency.get("response_latency", {}),
+        "stages": latency,
+        "event_loop_lag": loop_lag,
+        "input_frames": sum(track.frames_sent for track in tracks),
+        "late_frames": sum(track.late_frames for track in tracks),
+        "dropped_frames": sum(track.dropped_frames for track in tracks),
+        "cpu_cores_used": round(cpu / wall, 2) if wall else 0.0,
+        "rss_mb": current_rss_mb(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def is_saturated(step: dict, target_ms: float, max_loop_lag_ms: float) -> bool:
+    """A step fails when p95 end-to-end latency misses the target, the loop stalls, input frames are dropped or turns go unanswered."""
+    e2e_p95 = step["e2e_latency"].get("p95_ms")
+    return (
+        e2e_p95 is None or e2e_p95 > target_ms
+        or step["event_loop_lag"].get("p99_ms", 0) > max_loop_lag_ms
+        or step["dropped_frames"] > 0
+        or step["turns_completed"] < step["turns_expected"]
+    )
+
+async def run(args) -> dict:
+    from http_client import http_clients
+    from stt_scheduler import stt_scheduler
+    import stt
+
+    pcm = to_int16(stt.get_engine().load_audio(args.audio))
+    backend = backend_kwargs(args.backend)["session"]
+    levels = [int(n) for n in args.participants.split(",")]
+
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "audio": args.audio,
+            "turns": args.turns,
+            "backend": args.backend,
+            "max_concurrent_turns": settings.MAX_CONCURRENT_TURNS,
+            "stt_workers": settings.STT_WORKERS,
+            "stt_model": settings.STT_MODEL_SIZE,
+            "cpu_count": os.cpu_count(),
+        },
+        "steps": [],
+        "saturated_at": None,
+    }
+
+    try:
+        for n in levels:
+            step = await run_step(n, pcm, args.turns, backend)
+            step["saturated"] = is_saturated(step, args.target_ms, args.max_loop_lag_ms)
+            results["steps"].append(step)
+            print(f"N={n}: e2e p50 {step['e2e_latency'].get('p50_ms')} ms, p95 {step['e2e_latency'].get('p95_ms')} ms, "
+                  f"loop lag p99 {step['event_loop_lag'].get('p99_ms')} ms, late/dropped {step['late_frames']}/{step['dropped_frames']}, "
+                  f"CPU {step['cpu_cores_used']} cores, RSS {step['rss_mb']} MB")
+
+            if step["saturated"]:
+                results["saturated_at"] = n
+                if not args.keep_going:
+                    break
+    finally:
+        await http_clients.aclose()
+        await stt_scheduler.aclose()
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic multi-participant load test for the voice agent")
+    parser.add_argument("--participants", default="1,2,4,8,16", help="Comma-separated participant counts to step through")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per participant at each step")
+    parser.add_argument("--audio", default="app/test/test_audio.wav", help="Utterance every participant says")
+    parser.add_argument("--backend", choices=("synthetic", "live"), default="synthetic", help="LLM/TTS backends")
+    parser.add_argument("--target-ms", type=float, default=2000, help="p95 end-to-end latency target")
+    parser.add_argument("--max-loop-lag-ms", type=float, default=50, help="p99 event-loop lag considered saturated")
+    parser.add_argument("--keep-going", action="store_true", help="Run every step even after saturation")
+    parser.add_argument("--output", default="load_test_results.json")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run(args))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    if results["saturated_at"] is None:
+        print(f"No saturation up to {results['steps'][-1]['participants']} participants")
+    else:
+        print(f"Saturated at {results['saturated_at']} participants")
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# This module runs local stand-ins for the Groq chat-completions API and the ElevenLabs text-to-speech API,
+# so benchmarks, load tests and CI exercise the real llm.py / tts.py client code without network access or API keys.
+# Both servers accept the same requests and answer in the same shapes: JSON or SSE for chat, MP3 or raw PCM (chunked) for speech.
+# Latency is shaped per request with a first-byte delay, a per-token / per-chunk delay, random jitter and an error rate.
+#
+# Usage: python app/benchmark/mock_servers.py [--groq-port 8081] [--elevenlabs-port 8082] [--first-token-ms 250] [--token-ms 15]
+#                                             [--first-byte-ms 200] [--chunk-ms 50] [--jitter-ms 30] [--error-rate 0.0]
+# then point the agent at them:
+#   GROQ_API_URL=http://127.0.0.1:8081/openai/v1/chat/completions ELEVENLABS_API_URL=http://127.0.0.1:8082
+# (the API keys are not checked, but must be set to any value since they are sent as headers)
+
+# Import necessary libraries
+import sys
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import logging
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from typing import AsyncIterator
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from fakes import DEFAULT_REPLY
+
+logger = logging.getLogger(__name__)
+
+# One silent MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, mono, all-zero side info. 1152 samples (~26 ms) per frame.
+SILENT_MP3_FRAME = b"\xff\xfb\x90\xc0" + bytes(413)
+MP3_FRAME_SECONDS = 1152 / 44100
+
+class LatencyProfile:
+
+    """Delays and failures injected by a mock server. All times in milliseconds."""
+
+    def __init__(self, first_byte_ms: float = 200, step_ms: float = 15, jitter_ms: float = 0,
+                 error_rate: float = 0.0, error_status: int = 500):
+        self.first_byte_ms = first_byte_ms
+        self.step_ms = step_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    def _delay(self, ms: float) -> float:
+        return max(ms + random.uniform(-self.jitter_ms, self.jitter_ms), 0) / 1000
+
+    async def first_byte(self):
+        await asyncio.sleep(self._delay(self.first_byte_ms))
+
+    async def step(self):
+        await asyncio.sleep(self._delay(self.step_ms))
+
+    def should_fail(self) -> bool:
+        return random.random() < self.error_rate
+
+def error_response(profile: LatencyProfile) -> JSONResponse:
+    return JSONResponse({"error": {"message": "Injected failure from mock server", "type": "mock_error"}}, status_code=profile.error_status)
+
+def create_groq_app(profile: LatencyProfile = None, reply: str = DEFAULT_REPLY) -> FastAPI:
+    """OpenAI-compatible chat completions at /openai/v1/chat/completions; the reply text is fixed."""
+    profile = profile or LatencyProfile(first_byte_ms=250, step_ms=15)
+    app = FastAPI(title="Mock Groq")
+    app.state.requests = 0
+
+    @app.api_route("/", methods=["GET", "HEAD"])
+    async def root():
+        return {"status": "ok"}
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        model = body.get("model", "mock")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        await profile.first_byte()
+        if profile.should_fail():
+            return error_response(profile)
+
+        if not body.get("stream"):
+            await asyncio.sleep(profile._delay(profile.step_ms) * (len(reply.split()) - 1))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            }
+
+        async def events() -> AsyncIterator[bytes]:
+            for i, word in enumerate(reply.split()):
+                if i:
+                    await profile.step()
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n".encode()
+            yield b"data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+def create_elevenlabs_app(profile: LatencyProfile = None, chars_per_second: float = 15, chunk_audio_ms: int = 100) -> FastAPI:
+    """ElevenLabs text-to-speech at /v1/text-to-speech/{voice_id}[/stream]. Returns silence sized like real speech
+    in the requested output_format (mp3_* or pcm_{rate}), sent as chunks of chunk_audio_ms of audio."""
+    profile = profile or LatencyProfile(first_byte_ms=200, step_ms=50)
+    app = FastAPI(title="Mock ElevenLabs")
+    app.state.requests = 0
+
+    @app.api_route("/", methods=["GET", "HEAD"])
+    async def root():
+        return {"status": "ok"}
+
+    async def synthesize(request: Request, voice_id: str, output_format: str):
+        body = await request.json()
+        app.state.requests += 1
+        seconds = max(len(body.get("text", "")), 1) / chars_per_second
+
+        await profile.first_byte()
+        if profile.should_fail():
+            return error_response(profile)
+
+        if output_format.startswith("pcm_"):
+            sample_rate = int(output_format.split("_")[1])
+            total = int(seconds * sample_rate) * 2
+            chunk_bytes = sample_rate * chunk_audio_ms // 1000 * 2
+            media_type = "audio/pcm"
+            chunks = [bytes(min(chunk_bytes, total - i)) for i in range(0, total, chunk_bytes)]
+        else:
+            frames = int(seconds / MP3_FRAME_SECONDS) + 1
+            frames_per_chunk = max(int(chunk_audio_ms / 1000 / MP3_FRAME_SECONDS), 1)
+            media_type = "audio/mpeg"
+            chunks = [SILENT_MP3_FRAME * min(frames_per_chunk, frames - i) for i in range(0, frames, frames_per_chunk)]
+
+        async def audio() -> AsyncIterator[bytes]:
+            for i, chunk in enumerate(chunks):
+                if i:
+                    await profile.step()
+                yield chunk
+
+        return StreamingResponse(audio(), media_type=media_type)
+
+    @app.post("/v1/text-to-speech/{voice_id}")
+    async def text_to_speech(voice_id: str, request: Request, output_format: str = "mp3_44100_128"):
+        return await synthesize(request, voice_id, output_format)
+
+    @app.post("/v1/text-to-speech/{voice_id}/stream")
+    async def text_to_speech_stream(voice_id: str, request: Request, output_format: str = "mp3_44100_128"):
+        return await synthesize(request, voice_id, output_format)
+
+    return app
+
+async def serve(app: FastAPI, host: str, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    await server.serve()
+
+async def serve_mocks(host: str = "127.0.0.1", groq_port: int = 8081, elevenlabs_port: int = 8082,
+                      groq_profile: LatencyProfile = None, elevenlabs_profile: LatencyProfile = None):
+    """Run both mock servers on the current event loop until cancelled."""
+    await asyncio.gather(
+        serve(create_groq_app(groq_profile), host, groq_port),
+        serve(create_elevenlabs_app(elevenlabs_profile), host, elevenlabs_port),
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock Groq and ElevenLabs servers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--groq-port", type=int, default=8081)
+    parser.add_argument("--elevenlabs-port", type=int, default=8082)
+    parser.add_argument("--first-token-ms", type=float, default=250, help="Groq delay before the first token")
+    parser.add_argument("--token-ms", type=float, default=15, help="Groq delay between tokens")
+    parser.add_argument("--first-byte-ms", type=float, default=200, help="ElevenLabs delay before the first audio chunk")
+    parser.add_argument("--chunk-ms", type=float, default=50, help="ElevenLabs delay between audio chunks")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Uniform +/- jitter added to every delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=500)
+    args = parser.parse_args()
+
+    groq_profile = LatencyProfile(args.first_token_ms, args.token_ms, args.jitter_ms, args.error_rate, args.error_status)
+    elevenlabs_profile = LatencyProfile(args.first_byte_ms, args.chunk_ms, args.jitter_ms, args.error_rate, args.error_status)
+
+    print(f"GROQ_API_URL=http://{args.host}:{args.groq_port}/openai/v1/chat/completions")
+    print(f"ELEVENLABS_API_URL=http://{args.host}:{args.elevenlabs_port}")
+    asyncio.run(serve_mocks(args.host, args.groq_port, args.elevenlabs_port, groq_profile, elevenlabs_profile))
+
+if __name__ == "__main__":
+    main()
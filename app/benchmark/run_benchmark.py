@@ -0,0 +1,234 @@
+# This module is the offline latency benchmark. It replays a directory of WAV files through voice_agent_pipeline
+# and through the LiveKit session logic (ParticipantSession fed by a replayed track), with playback disabled.
+# STT always runs the configured local engine; LLM and TTS are either synthetic in-process backends or the real clients.
+# Results (per-stage latency percentiles, throughput, peak RSS) are written as JSON and compared against a stored baseline.
+#
+# Usage: python app/benchmark/run_benchmark.py [--audio-dir app/test] [--backend synthetic|live] [--repeat 3]
+#                                              [--output benchmark_results.json] [--baseline app/benchmark/baseline.json]
+#                                              [--save-baseline] [--require-baseline] [--tolerance 0.15]
+#
+# No baseline is committed, since latencies depend on the machine: create one with --save-baseline on the machine that
+# runs the comparison. Without a baseline the run only reports its results; pass --require-baseline to make that an error.
+
+# Import necessary libraries
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+import logging
+import platform
+import resource
+import tempfile
+from datetime import datetime
+from pathlib import Path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "pipeline")))
+
+# Measure the uncached path and keep benchmark turns out of the production metrics log, unless overridden
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("TTS_CACHE_ENABLED", "false")
+os.environ.setdefault("METRICS_SERVER_ENABLED", "false")
+os.environ.setdefault("METRICS_LOG_PATH", os.path.join(tempfile.gettempdir(), "voice_agent_benchmark_metrics.jsonl"))
+
+from typing import List
+from config import settings
+from fakes import ReplayTrack, CollectingOutput, backend_kwargs, to_int16
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+COMPARED_STATS = ("p50_ms", "p95_ms")
+
+logger = logging.getLogger(__name__)
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process; ru_maxrss is KiB on Linux and bytes on macOS."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def find_audio(audio_dir: str) -> List[str]:
+    path = Path(audio_dir)
+    if path.is_file():
+        return [str(path)]
+    return sorted(str(p) for p in path.glob("*.wav"))
+
+async def bench_pipeline(files: List[str], repeat: int, backend: dict) -> dict:
+    """Each file is one turn through voice_agent_pipeline, one after another."""
+    from voice_agent import voice_agent_pipeline
+    from latency import latency_stats
+
+    latency_stats.reset()
+    turns = 0
+    audio_seconds = 0.0
+    start = time.perf_counter()
+
+    for _ in range(repeat):
+        for path in files:
+            await voice_agent_pipeline(path, stream=True, play=False, **backend)
+            audio_seconds += audio_duration(path)
+            turns += 1
+
+    return summarize(turns, audio_seconds, time.perf_counter() - start, latency_stats.summary())
+
+async def bench_session(files: List[str], repeat: int, backend: dict) -> dict:
+    """Each file is replayed in real time into a fresh ParticipantSession until its turn has been answered."""
+    from session import ParticipantSession
+    from latency import latency_stats
+    import stt
+
+    latency_stats.reset()
+    turns = 0
+    late_frames = 0
+    audio_seconds = 0.0
+    start = time.perf_counter()
+
+    pcm_by_file = {path: to_int16(stt.get_engine().load_audio(path)) for path in files}
+
+    for _ in range(repeat):
+        for path, pcm in pcm_by_file.items():
+            output = CollectingOutput()
+            session = ParticipantSession(f"bench-{Path(path).stem}", output, **backend)
+            track = ReplayTrack(pcm, trailing_silence_ms=settings.EOU_SILENCE_MS + 500)
+
+            await session.process_audio_stream(track)
+            while session.is_processing:
+                await asyncio.sleep(0.01)
+
+            audio_seconds += len(pcm) / 16000
+            late_frames += track.late_frames
+            turns += session.conversation_count
+
+    result = summarize(turns, audio_seconds, time.perf_counter() - start, latency_stats.summary())
+    result["late_input_frames"] = late_frames
+    return result
+
+def audio_duration(path: str) -> float:
+    import wave
+    try:
+        with wave.open(path, "rb") as f:
+            return f.getnframes() / f.getframerate()
+    except (wave.Error, EOFError):
+        return 0.0
+
+def summarize(turns: int, audio_seconds: float, wall_seconds: float, latency: dict) -> dict:
+    return {
+        "turns": turns,
+        "audio_seconds": round(audio_seconds, 3),
+        "wall_seconds": round(wall_seconds, 3),
+        "turns_per_second": round(turns / wall_seconds, 3) if wall_seconds else 0.0,
+        "audio_seconds_per_second": round(audio_seconds / wall_seconds, 3) if wall_seconds else 0.0,
+        "latency": latency,
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> List[dict]:
+    """Stages whose p50/p95 got slower than the baseline by more than tolerance (relative) and min_delta_ms (absolute)."""
+    regressions = []
+    for mode, current in results["modes"].items():
+        previous = baseline.get("modes", {}).get(mode)
+        if not previous:
+            continue
+
+        for stage, stats in current["latency"].items():
+            base_stats = previous["latency"].get(stage)
+            if not base_stats:
+                continue
+            for stat in COMPARED_STATS:
+                now_ms, base_ms = stats[stat], base_stats[stat]
+                if now_ms > base_ms * (1 + tolerance) and now_ms - base_ms > min_delta_ms:
+                    regressions.append({"mode": mode, "stage": stage, "stat": stat, "baseline_ms": base_ms, "current_ms": now_ms})
+
+        base_rate, rate = previous.get("turns_per_second", 0), current["turns_per_second"]
+        if base_rate and rate < base_rate * (1 - tolerance):
+            regressions.append({"mode": mode, "stage": "throughput", "stat": "turns_per_second", "baseline": base_rate, "current": rate})
+
+    return regressions
+
+async def run(args) -> dict:
+    from http_client import http_clients
+    from stt_scheduler import stt_scheduler
+
+    files = find_audio(args.audio_dir)
+    if not files:
+        raise SystemExit(f"No WAV files found in {args.audio_dir}")
+
+    backends = backend_kwargs(args.backend)
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "backend": args.backend,
+            "files": files,
+            "repeat": args.repeat,
+            "stt_engine": settings.STT_ENGINE,
+            "stt_model": settings.STT_MODEL_SIZE,
+            "stt_compute_type": settings.STT_COMPUTE_TYPE,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "modes": {},
+    }
+
+    try:
+        if args.mode in ("pipeline", "both"):
+            results["modes"]["pipeline"] = await bench_pipeline(files, args.repeat, backends["pipeline"])
+        if args.mode in ("session", "both"):
+            results["modes"]["session"] = await bench_session(files, args.repeat, backends["session"])
+    finally:
+        await http_clients.aclose()
+        await stt_scheduler.aclose()
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end latency benchmark for the voice agent")
+    parser.add_argument("--audio-dir", default="app/test", help="Directory of WAV files (or a single WAV file) to replay")
+    parser.add_argument("--backend", choices=("synthetic", "live"), default="synthetic", help="LLM/TTS backends")
+    parser.add_argument("--mode", choices=("pipeline", "session", "both"), default="both")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the corpus")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--require-baseline", action="store_true", help="Exit with an error when there is no baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown before a stage counts as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=20, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    has_baseline = os.path.exists(args.baseline)
+    if not has_baseline and not args.save_baseline:
+        message = f"No baseline at {args.baseline}, regressions will not be checked (create one with --save-baseline)"
+        if args.require_baseline:
+            print(f"Error: {message}", file=sys.stderr)
+            sys.exit(2)
+        print(f"Warning: {message}", file=sys.stderr)
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run(args))
+
+    if has_baseline and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        results["comparison"] = {"baseline": args.baseline, "created": baseline.get("created"), "regressions": regressions}
+    else:
+        regressions = []
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    for mode, result in results["modes"].items():
+        e2e = result["latency"].get("e2e_latency", {})
+        print(f"{mode}: {result['turns']} turns, {result['turns_per_second']} turns/s, "
+              f"e2e p50 {e2e.get('p50_ms')} ms, p95 {e2e.get('p95_ms')} ms")
+    print(f"Peak RSS: {results['peak_rss_mb']} MB, results written to {args.output}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) against {args.baseline}:")
+        for r in regressions:
+            print(f"  {r}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,108 @@ class Settings:
         "fr": os.getenv("ELEVENLABS_VOICE_ID_FR", "EXAMPLE_VOICE_ID_FR"),    # French voice
         # Add more languages and their voice IDs here
     }
-    GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/v1/")  # Default URL
+    GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")  # Chat-completions endpoint; point at a mock server for offline runs
+    GROQ_MODEL = os.getenv("GROQ_MODEL", "llama3-70b-8192")  # or mixtral-8x7b-32768
+    ELEVENLABS_API_URL = os.getenv("ELEVENLABS_API_URL", "https://api.elevenlabs.io")  # Base URL; /v1/text-to-speech/{voice_id} is appended
+
+    # Shared HTTP connection pool for the Groq and ElevenLabs clients
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))  # Seconds an idle connection is kept open
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+    HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"  # Requires the h2 package (httpx[http2])
+
+    # Speech-to-text engine: "faster-whisper" (CTranslate2) or "whisper" (openai-whisper, kept as a fallback)
+    STT_ENGINE = os.getenv("STT_ENGINE", "faster-whisper")
+    STT_MODEL_SIZE = os.getenv("STT_MODEL_SIZE", "base")
+    STT_DEVICE = os.getenv("STT_DEVICE", "cpu")
+    STT_COMPUTE_TYPE = os.getenv("STT_COMPUTE_TYPE", "int8")  # int8 on CPU, int8_float16 / float16 on GPU
+    STT_CPU_THREADS = int(os.getenv("STT_CPU_THREADS", "0"))  # 0 lets CTranslate2 pick
+    STT_BEAM_SIZE = int(os.getenv("STT_BEAM_SIZE", "1"))  # Greedy decoding is fastest for short utterances
+
+    # Spoken language per session: detected on the first turn, then passed to Whisper so later turns skip language ID
+    STT_LANGUAGE = os.getenv("STT_LANGUAGE", "")  # Force one ISO 639-1 code for every session; empty detects per session
+    LANGUAGE_PIN_MIN_PROBABILITY = float(os.getenv("LANGUAGE_PIN_MIN_PROBABILITY", "0.8"))  # Detection confidence needed to pin
+    LANGUAGE_REDETECT_LOGPROB = float(os.getenv("LANGUAGE_REDETECT_LOGPROB", "-1.0"))  # Pinned decodes below this are re-detected
+
+    # Streaming STT: re-decode the utterance while the user speaks so only a short tail is left at end-of-utterance
+    STT_STREAMING = os.getenv("STT_STREAMING", "true").lower() == "true"  # Streaming finals run one by one; set false to micro-batch whole utterances across sessions
+    STT_PARTIAL_INTERVAL_MS = int(os.getenv("STT_PARTIAL_INTERVAL_MS", "300"))
+
+    # STT scheduler shared by all sessions
+    STT_WORKERS = int(os.getenv("STT_WORKERS", "1"))  # Model threads; each runs one batch at a time
+    STT_BATCH_WINDOW_MS = int(os.getenv("STT_BATCH_WINDOW_MS", "30"))  # How long a final transcription waits for others to batch with; streaming finals are not batched
+    STT_MAX_BATCH_SIZE = int(os.getenv("STT_MAX_BATCH_SIZE", "8"))
+    STT_QUEUE_SIZE = int(os.getenv("STT_QUEUE_SIZE", "64"))
+
+    # Voice activity detection and end-of-utterance
+    VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "9"))  # Frame energy above the adaptive noise floor that counts as speech
+    VAD_MIN_ENERGY_DBFS = float(os.getenv("VAD_MIN_ENERGY_DBFS", "-55"))  # Absolute floor, so a silent line is never speech
+    VAD_HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "200"))  # Voiced-gap length bridged inside one speech segment
+    VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "60"))  # Voiced audio needed before speech is confirmed
+    EOU_SILENCE_MS = int(os.getenv("EOU_SILENCE_MS", "1000"))  # Silence after speech that ends the user's turn
+    SPECULATIVE_TURNS = os.getenv("SPECULATIVE_TURNS", "true").lower() == "true"  # Start STT + LLM on a short pause; speech only plays after the full EOU silence
+    SPECULATIVE_PAUSE_MS = int(os.getenv("SPECULATIVE_PAUSE_MS", "300"))  # Pause that starts a speculative turn
+    PREROLL_MS = int(os.getenv("PREROLL_MS", "300"))  # Audio kept from before speech onset so the first syllable is not clipped
+    MAX_UTTERANCE_SECONDS = float(os.getenv("MAX_UTTERANCE_SECONDS", "30"))  # Longer turns are closed early; matches Whisper's 30 s window
+
+    # LLM response cache
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+    LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+    LLM_CACHE_EXCLUDE = os.getenv("LLM_CACHE_EXCLUDE", r"\b(weather|today|tonight|tomorrow|now|time|date|news|latest|joke|random|story)\b")  # Prompts never cached
+
+    # Hedged LLM requests: when the primary model's first token is late, the same request also goes to a faster fallback model
+    LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+    LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "llama3-8b-8192")
+    LLM_HEDGE_DEADLINE_MS = int(os.getenv("LLM_HEDGE_DEADLINE_MS", "0"))  # Fixed deadline; 0 follows the rolling percentile below
+    LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "90"))  # Of the primary's recent first-token latencies
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))  # Until then the initial deadline applies
+    LLM_HEDGE_INITIAL_DEADLINE_MS = int(os.getenv("LLM_HEDGE_INITIAL_DEADLINE_MS", "800"))
+    LLM_HEDGE_MIN_DEADLINE_MS = int(os.getenv("LLM_HEDGE_MIN_DEADLINE_MS", "200"))  # Floor, so a fast stretch does not hedge every request
+    LLM_HEDGE_LOSER_GRACE_MS = int(os.getenv("LLM_HEDGE_LOSER_GRACE_MS", "0"))  # Opt-in: keep a primary that lost open (and billed) up to this long to measure the latency saved; 0 cancels it at once
+
+    # TTS audio cache
+    TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+    TTS_CACHE_MEMORY_MB = int(os.getenv("TTS_CACHE_MEMORY_MB", "64"))
+    TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+    TTS_CACHE_DISK_MB = int(os.getenv("TTS_CACHE_DISK_MB", "512"))
+    TTS_CACHE_MAX_TEXT_CHARS = int(os.getenv("TTS_CACHE_MAX_TEXT_CHARS", "200"))  # Longer phrases rarely repeat
+    TTS_PREWARM_PHRASES = os.getenv("TTS_PREWARM_PHRASES", "Hello! How can I help you today?|Sure, one moment.|Sorry, I didn't catch that. Could you say it again?")
+
+    # Append-only metrics log (JSON lines); export to Excel with `python app/pipeline/metrics_sink.py export`
+    METRICS_LOG_PATH = os.getenv("METRICS_LOG_PATH", "voice_agent_metrics.jsonl")
+
+    # Live latency metrics (p50/p95/p99 per stage) served over HTTP at /metrics
+    METRICS_SERVER_ENABLED = os.getenv("METRICS_SERVER_ENABLED", "true").lower() == "true"
+    METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+    METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "1000"))  # Most recent turns kept per stage histogram
+
+    # Outbound audio: format of the agent's published track and playout pacing
+    AGENT_AUDIO_SAMPLE_RATE = int(os.getenv("AGENT_AUDIO_SAMPLE_RATE", "48000"))  # WebRTC's native rate, so LiveKit does not resample again
+    AGENT_AUDIO_CHANNELS = int(os.getenv("AGENT_AUDIO_CHANNELS", "1"))
+    PLAYOUT_LOOKAHEAD_MS = int(os.getenv("PLAYOUT_LOOKAHEAD_MS", "60"))  # How far ahead of real time frames may be handed to the output
+
+    # WebSocket audio endpoint for clients without LiveKit: 16 kHz mono int16 PCM in, PCM at WS_OUTPUT_SAMPLE_RATE out
+    WS_HOST = os.getenv("WS_HOST", "0.0.0.0")
+    WS_PORT = int(os.getenv("WS_PORT", "8765"))
+    WS_MAX_SESSIONS = int(os.getenv("WS_MAX_SESSIONS", "50"))  # Connections beyond this are refused with close code 1013
+    WS_OUTPUT_SAMPLE_RATE = int(os.getenv("WS_OUTPUT_SAMPLE_RATE", "16000"))  # Default when the client does not ask for a rate
+    WS_SEND_QUEUE_MS = int(os.getenv("WS_SEND_QUEUE_MS", "500"))  # Outbound audio buffered per connection before playout waits
+    WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5"))  # A client that reads nothing for this long is disconnected
+
+    # LiveKit
+    LIVEKIT_API_KEY = os.getenv("LIVEKIT_API_KEY")
+    LIVEKIT_API_SECRET = os.getenv("LIVEKIT_API_SECRET")
+    LIVEKIT_API_URL = os.getenv("LIVEKIT_API_URL")
+    LIVEKIT_ROOM_NAME = os.getenv("LIVEKIT_ROOM_NAME")  # Comma-separated to serve several rooms from one process
+    LIVEKIT_PARTICIPANT_NAME = os.getenv("LIVEKIT_PARTICIPANT_NAME", "voice-agent")
+
+    # Concurrency limits for one agent process
+    MAX_ROOMS = int(os.getenv("MAX_ROOMS", "10"))
+    MAX_SESSIONS_PER_ROOM = int(os.getenv("MAX_SESSIONS_PER_ROOM", "4"))
+    MAX_CONCURRENT_TURNS = int(os.getenv("MAX_CONCURRENT_TURNS", "8"))  # Turns running STT/LLM/TTS at the same time
 
 settings = Settings()
@@ -0,0 +1,83 @@
+# This module provides a fixed-capacity ring buffer for one inbound audio stream.
+# Samples are written twice, at i % capacity and i % capacity + capacity, so any window of up to `capacity` samples
+# is one contiguous slice of the backing array and can be handed out as a zero-copy NumPy view.
+# Positions are absolute sample indices since the stream started, so a view stays addressable while newer audio arrives.
+
+# Import necessary libraries
+import numpy as np
+from typing import Optional, Tuple
+
+class AudioRingBuffer:
+
+    """Preallocated int16 ring buffer with an utterance window, a pre-roll and a maximum utterance length.
+    Memory is fixed at construction: 2 * capacity samples, and nothing is allocated per frame."""
+
+    def __init__(self, max_utterance_samples: int, preroll_samples: int = 0, headroom_samples: int = None):
+        self.max_utterance = max_utterance_samples
+        self.preroll = preroll_samples
+        # Headroom keeps a finished utterance readable while the next one is recorded and the turn waits for STT
+        headroom = max_utterance_samples + preroll_samples if headroom_samples is None else headroom_samples
+        self.capacity = max_utterance_samples + preroll_samples + headroom
+        self.data = np.zeros(2 * self.capacity, dtype=np.int16)
+
+        self.written = 0                          # Absolute index of the next sample
+        self.utterance_start: Optional[int] = None
+
+    @property
+    def oldest(self) -> int:
+        """Absolute index of the oldest sample still held."""
+        return max(self.written - self.capacity, 0)
+
+    def write(self, samples: np.ndarray):
+        """Append samples; the utterance window slides forward once it exceeds the maximum length."""
+        n = len(samples)
+        if n > self.capacity:
+            self.written += n - self.capacity
+            samples = samples[-self.capacity:]
+            n = self.capacity
+
+        pos = self.written % self.capacity
+        first = min(n, self.capacity - pos)
+        self.data[pos:pos + first] = samples[:first]
+        self.data[pos + self.capacity:pos + self.capacity + first] = samples[:first]
+        if first < n:
+            self.data[:n - first] = samples[first:]
+            self.data[self.capacity:self.capacity + n - first] = samples[first:]
+        self.written += n
+
+        if self.utterance_start is not None and self.written - self.utterance_start > self.max_utterance:
+            self.utterance_start = self.written - self.max_utterance
+
+    def view(self, start: int, end: Optional[int] = None) -> np.ndarray:
+        """Read-only, zero-copy view of samples [start, end) in absolute indices."""
+        end = self.written if end is None else end
+        if start < self.oldest or end > self.written or start > end:
+            raise IndexError(f"Samples [{start}, {end}) are not in the buffer (holds [{self.oldest}, {self.written}))")
+
+        offset = start % self.capacity
+        window = self.data[offset:offset + end - start]
+        window.flags.writeable = False
+        return window
+
+    def is_valid(self, start: int) -> bool:
+        """Whether samples from start onwards have not been overwritten yet."""
+        return start >= self.oldest
+
+    def begin_utterance(self):
+        """Open the utterance window, reaching back over the pre-roll so the first syllable is kept."""
+        if self.utterance_start is None:
+            self.utterance_start = max(self.written - self.preroll, self.oldest)
+
+    @property
+    def utterance_length(self) -> int:
+        return 0 if self.utterance_start is None else self.written - self.utterance_start
+
+    @property
+    def utterance_full(self) -> bool:
+        return self.utterance_length >= self.max_utterance
+
+    def end_utterance(self) -> Tuple[int, int]:
+        """Close the utterance window and return its absolute (start, end)."""
+        start = self.written if self.utterance_start is None else self.utterance_start
+        self.utterance_start = None
+        return start, self.written
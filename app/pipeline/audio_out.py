@@ -0,0 +1,225 @@
+# This module is the outbound audio engine: it converts TTS audio to the output's format and plays it out in real time.
+# Conversion (channel mapping and resampling) is vectorized NumPy and keeps its state across chunks, so chunk boundaries
+# are seamless. Downsampling low-pass filters first, so content above the output's Nyquist frequency does not alias. Output is cut into exact 20 ms packets and sent against a monotonic deadline clock with a small lookahead,
+# so a busy event loop delays individual sends without adding up to drift.
+
+# Import necessary libraries
+import sys
+import os
+import asyncio
+import logging
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from typing import AsyncIterator, Callable, List, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+def rechannel(samples: np.ndarray, channels: int) -> np.ndarray:
+    """Map (n, in_channels) audio to (n, channels): mono is duplicated, multi-channel is averaged down to mono first."""
+    if samples.shape[1] == channels:
+        return samples
+    mono = samples if samples.shape[1] == 1 else samples.mean(axis=1, keepdims=True)
+    return np.repeat(mono, channels, axis=1)
+
+def lowpass_taps(cutoff: float, transition: float, attenuation_db: float = 60.0) -> np.ndarray:
+    """Kaiser-windowed sinc low-pass FIR; cutoff and transition width are fractions of the sample rate."""
+    beta = 0.1102 * (attenuation_db - 8.7)
+    count = int(np.ceil((attenuation_db - 8) / (2.285 * 2 * np.pi * transition))) | 1  # Odd, so the delay is whole samples
+    n = np.arange(count) - (count - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(count, beta)
+    return (taps / taps.sum()).astype(np.float32)
+
+class StreamResampler:
+
+    """Linear-interpolation resampler for a stream of chunks. The last input sample and the fractional read position
+    carry over between chunks, so output is continuous across chunk boundaries.
+    When downsampling, input first goes through an anti-aliasing FIR whose history also carries over between chunks.
+    Its delay of half its length is cut from the start of the stream and released by drain() at the end, so the
+    output stays aligned with the input."""
+
+    def __init__(self, src_rate: int, dst_rate: int):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self.step = src_rate / dst_rate
+        self.tail: Optional[np.ndarray] = None  # Last input sample of the previous chunk, shape (1, channels)
+        self.position = 0.0                      # Next output position, relative to the start of the next buffer
+
+        # Pass band up to 80% of the output Nyquist frequency, stop band from the output Nyquist frequency on
+        self.taps = lowpass_taps(0.45 * dst_rate / src_rate, 0.1 * dst_rate / src_rate) if dst_rate < src_rate else None
+        self.history: Optional[np.ndarray] = None  # Last len(taps) - 1 input samples, shape (len(taps) - 1, channels)
+        self.delay = (len(self.taps) - 1) // 2 if self.taps is not None else 0
+        self.skip = self.delay                     # Filtered samples still to drop from the start of the stream
+
+    def _filter(self, samples: np.ndarray) -> np.ndarray:
+        if self.history is None:
+            self.history = np.zeros((len(self.taps) - 1, samples.shape[1]), dtype=np.float32)
+        buffer = np.concatenate([self.history, samples])
+        self.history = buffer[len(samples):]
+        out = np.stack([np.convolve(buffer[:, ch], self.taps, mode="valid") for ch in range(buffer.shape[1])], axis=1)
+        skipped = min(self.skip, len(out))
+        self.skip -= skipped
+        return out[skipped:]
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """samples: float32 (n, channels). Returns float32 (m, channels) at dst_rate."""
+        if self.src_rate == self.dst_rate or len(samples) == 0:
+            return samples
+
+        if self.taps is not None:
+            samples = self._filter(samples)
+            if len(samples) == 0:
+                return samples
+        buffer = samples if self.tail is None else np.concatenate([self.tail, samples])
+        last = len(buffer) - 1
+        if last < self.position:
+            self.position -= last
+            self.tail = buffer[-1:]
+            return np.zeros((0, samples.shape[1]), dtype=np.float32)
+
+        count = int((last - self.position) / self.step) + 1
+        positions = self.position + np.arange(count) * self.step
+        index = np.arange(len(buffer))
+        out = np.stack([np.interp(positions, index, buffer[:, ch]) for ch in range(buffer.shape[1])], axis=1)
+
+        # The last buffer sample becomes index 0 of the next buffer
+        self.position = positions[-1] + self.step - last
+        self.tail = buffer[-1:]
+        return out.astype(np.float32)
+
+    def drain(self) -> np.ndarray:
+        """The audio still held back by the anti-aliasing filter's delay, once the stream has ended."""
+        if self.history is None:
+            return np.zeros((0, 1), dtype=np.float32)
+        return self.process(np.zeros((self.delay, self.history.shape[1]), dtype=np.float32))
+
+class AudioConverter:
+
+    """Converts int16 PCM chunks from one (rate, channels) format to another and packetizes them into exact frames."""
+
+    def __init__(self, src_rate: int, dst_rate: int, src_channels: int = 1, dst_channels: int = 1, frame_ms: int = 20):
+        self.frame_bytes = dst_rate * frame_ms // 1000 * dst_channels * 2
+        if src_rate <= 0 or self.frame_bytes <= 0:
+            # A zero frame size would make push() loop forever
+            raise ValueError(f"Cannot convert {src_rate} Hz audio to {dst_channels} channel(s) at {dst_rate} Hz in {frame_ms} ms frames")
+        self.src_channels = src_channels
+        self.dst_channels = dst_channels
+        self.passthrough = src_rate == dst_rate and src_channels == dst_channels
+        self.resampler = StreamResampler(src_rate, dst_rate)
+        self.pending = bytearray()
+
+    def convert(self, data: bytes) -> bytes:
+        if self.passthrough:
+            return data
+        samples = np.frombuffer(data, dtype=np.int16).reshape(-1, self.src_channels).astype(np.float32)
+        return self._to_pcm(self.resampler.process(samples))
+
+    def _to_pcm(self, samples: np.ndarray) -> bytes:
+        samples = rechannel(samples, self.dst_channels)
+        return np.clip(np.rint(samples), -32768, 32767).astype(np.int16).tobytes()
+
+    def push(self, data: bytes) -> List[bytes]:
+        """Convert a chunk and return every complete output frame it finishes."""
+        return self._frames(self.convert(data))
+
+    def _frames(self, data: bytes) -> List[bytes]:
+        self.pending.extend(data)
+        frames = []
+        while len(self.pending) >= self.frame_bytes:
+            frames.append(bytes(self.pending[:self.frame_bytes]))
+            del self.pending[:self.frame_bytes]
+        return frames
+
+    def flush(self) -> List[bytes]:
+        """The remaining audio, the last partial frame padded with silence."""
+        frames = [] if self.passthrough else self._frames(self._to_pcm(self.resampler.drain()))
+        if self.pending:
+            frames.append(bytes(self.pending) + bytes(self.frame_bytes - len(self.pending)))
+            self.pending.clear()
+        return frames
+
+class AudioPlayout:
+
+    """Plays a stream of PCM chunks into an output with an async capture_frame(bytes), one frame per frame_ms.
+    Frame k is due at start + k * frame_ms on the loop's monotonic clock and may be sent up to lookahead_ms early,
+    which gives the sink a small buffer against event-loop stalls. If the stream underruns, the clock is re-anchored
+    instead of bursting to catch up."""
+
+    def __init__(self, output, src_rate: int, src_channels: int = 1, frame_ms: int = 20, lookahead_ms: int = None):
+        dst_rate = getattr(output, "sample_rate", src_rate)
+        dst_channels = getattr(output, "num_channels", src_channels)
+        self.output = output
+        self.converter = AudioConverter(src_rate, dst_rate, src_channels, dst_channels, frame_ms)
+        self.frame_duration = frame_ms / 1000
+        self.lookahead = (settings.PLAYOUT_LOOKAHEAD_MS if lookahead_ms is None else lookahead_ms) / 1000
+
+        self.frames_sent = 0
+        self.underruns = 0
+        self.max_late = 0.0
+
+    async def play(self, chunks: AsyncIterator[bytes], on_first_frame: Callable[[], None] = None):
+        """Play until the stream ends; barge-in stops playback by cancelling the caller's turn task."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(int(1 / self.frame_duration), 1))  # About one second of converted audio
+
+        failures = []
+
+        async def feed():
+            # No end marker on cancellation: nobody is reading and the queue may be full
+            try:
+                async for chunk in chunks:
+                    for frame in self.converter.push(chunk):
+                        await queue.put(frame)
+                for frame in self.converter.flush():
+                    await queue.put(frame)
+            except Exception as e:
+                failures.append(e)
+            await queue.put(None)
+
+        feeder = asyncio.create_task(feed())
+        loop = asyncio.get_running_loop()
+        start = None
+        index = 0
+
+        try:
+            while True:
+                frame = await queue.get()
+                if frame is None:
+                    if failures:
+                        raise failures[0]
+                    break
+
+                now = loop.time()
+                if start is None:
+                    start = now
+                due = start + index * self.frame_duration
+
+                if now > due + self.frame_duration:
+                    # Nothing was ready in time: restart the clock rather than send a burst of late frames
+                    self.underruns += 1
+                    self.max_late = max(self.max_late, now - due)
+                    start = now - index * self.frame_duration
+                elif due - now > self.lookahead:
+                    await asyncio.sleep(due - now - self.lookahead)
+
+                await self.output.capture_frame(frame)
+                index += 1
+                self.frames_sent += 1
+                if index == 1 and on_first_frame:
+                    on_first_frame()
+
+            # Let the last frames play out before reporting completion
+            if start is not None:
+                remaining = start + index * self.frame_duration - loop.time()
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+        finally:
+            feeder.cancel()
+            await asyncio.gather(feeder, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "frames_sent": self.frames_sent,
+            "underruns": self.underruns,
+            "max_late_ms": round(self.max_late * 1000, 1),
+        }
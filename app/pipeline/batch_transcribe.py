@@ -0,0 +1,177 @@
+# This module transcribes a backlog of recordings offline, fanned out over a process pool.
+# Each worker process loads the STT model once, in its initializer, and the CPU threads are split between the workers;
+# the parent process never imports stt, so it holds no model of its own. Results are appended to a JSONL file as each
+# file finishes, with per-file timings, and a rerun skips every file already transcribed, so an interrupted run resumes.
+#
+# Usage: python app/pipeline/batch_transcribe.py <directory | manifest> [--output transcripts.jsonl] [--workers N]
+#                                                [--language en] [--retry-failed]
+# A manifest is a text file with one audio path per line, or JSONL with {"path": ..., "language": ...} per line.
+
+# Import necessary libraries
+import sys
+import os
+import json
+import time
+import signal
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from typing import Dict, List, Optional, Set, Tuple
+from config import settings
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".ogg", ".m4a", ".opus", ".webm"}
+
+logger = logging.getLogger(__name__)
+
+def find_inputs(source: str, language: Optional[str] = None) -> List[Tuple[str, Optional[str]]]:
+    """(path, language) for every recording under a directory, or every entry of a manifest."""
+    path = Path(source)
+    if path.is_dir():
+        return [(str(p), language) for p in sorted(path.rglob("*")) if p.suffix.lower() in AUDIO_EXTENSIONS]
+
+    inputs = []
+    base = path.parent
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                entry = json.loads(line)
+                audio_path, entry_language = entry["path"], entry.get("language", language)
+            else:
+                audio_path, entry_language = line, language
+            # Relative manifest entries are relative to the manifest
+            inputs.append((str(base / audio_path) if not os.path.isabs(audio_path) else audio_path, entry_language))
+    return inputs
+
+def load_done(output_path: str, retry_failed: bool = False) -> Set[str]:
+    """Paths already in the output file; failed files count as done unless retry_failed is set."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A line cut short by an interrupted run
+            if retry_failed and "error" in record:
+                continue
+            done.add(record["path"])
+    return done
+
+def init_worker(cpu_threads: int):
+    """Load the STT model once per worker process, with its share of the CPU threads."""
+    # The parent handles Ctrl-C and shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    settings.STT_CPU_THREADS = cpu_threads
+    import stt
+    stt.get_engine()
+
+def transcribe_file(path: str, language: Optional[str] = None) -> Dict:
+    """Runs in a worker: decode and transcribe one file, with timings."""
+    import stt
+
+    record = {"path": path, "worker": os.getpid()}
+    try:
+        start = time.perf_counter()
+        engine = stt.get_engine()
+        audio = engine.load_audio(path)
+        loaded = time.perf_counter()
+        result = engine.transcribe(audio, language)
+        done = time.perf_counter()
+
+        audio_seconds = len(audio) / stt.WHISPER_SAMPLE_RATE
+        record.update({
+            "text": result["text"],
+            "language": result["language"],
+            "language_probability": result["language_probability"],
+            "audio_seconds": round(audio_seconds, 3),
+            "load_seconds": round(loaded - start, 3),
+            "transcribe_seconds": round(done - loaded, 3),
+            "real_time_factor": round((done - start) / audio_seconds, 4) if audio_seconds else None
+        })
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+def run(inputs: List[Tuple[str, Optional[str]]], output_path: str, workers: int) -> dict:
+    """Transcribe every input on a pool of workers, appending one JSON line per file as it finishes."""
+    cpu_count = os.cpu_count() or 1
+    cpu_threads = settings.STT_CPU_THREADS or max(cpu_count // workers, 1)
+    summary = {"files": 0, "failed": 0, "audio_seconds": 0.0, "transcribe_seconds": 0.0}
+
+    # spawn: workers must not inherit the parent's threads, and each builds its own model
+    context = multiprocessing.get_context("spawn")
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker, initargs=(cpu_threads,))
+    logger.info(f"Transcribing {len(inputs)} files with {workers} workers x {cpu_threads} threads")
+
+    start = time.perf_counter()
+    try:
+        with open(output_path, "a", encoding="utf-8") as out:
+            futures = [executor.submit(transcribe_file, path, language) for path, language in inputs]
+            for future in as_completed(futures):
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+
+                summary["files"] += 1
+                if "error" in record:
+                    summary["failed"] += 1
+                    logger.warning(f"Failed: {record['path']}: {record['error']}")
+                else:
+                    summary["audio_seconds"] += record["audio_seconds"]
+                    summary["transcribe_seconds"] += record["load_seconds"] + record["transcribe_seconds"]
+                    logger.info(f"[{summary['files']}/{len(inputs)}] {record['path']} "
+                                f"({record['audio_seconds']}s audio in {record['load_seconds'] + record['transcribe_seconds']:.2f}s)")
+    except KeyboardInterrupt:
+        logger.warning("Interrupted; rerun the same command to resume")
+    except BrokenProcessPool:
+        # Also raised when the model cannot be loaded in the workers
+        logger.error("A worker process died; rerun the same command to resume", exc_info=True)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    wall = time.perf_counter() - start
+    summary["wall_seconds"] = round(wall, 3)
+    summary["audio_seconds"] = round(summary["audio_seconds"], 3)
+    summary["transcribe_seconds"] = round(summary["transcribe_seconds"], 3)
+    summary["audio_seconds_per_second"] = round(summary["audio_seconds"] / wall, 3) if wall else 0.0
+    summary["workers"] = workers
+    summary["cpu_threads_per_worker"] = cpu_threads
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe a directory or manifest of recordings on a process pool")
+    parser.add_argument("source", help="Directory of recordings, or a manifest (one path per line, or JSONL with path/language)")
+    parser.add_argument("--output", default="transcripts.jsonl", help="JSONL results; existing entries are skipped")
+    parser.add_argument("--workers", type=int, default=max((os.cpu_count() or 1) // 2, 1),
+                        help="Worker processes, each with its own model")
+    parser.add_argument("--language", default=None, help="ISO language code for entries without one (default: detect)")
+    parser.add_argument("--retry-failed", action="store_true", help="Transcribe files that failed in a previous run again")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    inputs = find_inputs(args.source, args.language)
+    done = load_done(args.output, args.retry_failed)
+    pending = [(path, language) for path, language in inputs if path not in done]
+    if len(pending) < len(inputs):
+        logger.info(f"Skipping {len(inputs) - len(pending)} files already in {args.output}")
+    if not pending:
+        print("Nothing to transcribe")
+        return
+
+    summary = run(pending, args.output, max(min(args.workers, len(pending)), 1))
+    print(f"{summary['files']} files ({summary['failed']} failed), {summary['audio_seconds']}s of audio "
+          f"in {summary['wall_seconds']}s: {summary['audio_seconds_per_second']} audio-seconds per second")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# This module splits a stream of LLM tokens into speakable sentences and clauses so TTS can start before the full response is generated.
+
+# Import necessary libraries
+import re
+from typing import AsyncIterator, List, Optional
+
+# Sentence terminators always close a chunk; clause separators only close one once it is long enough to sound natural
+SENTENCE_END = re.compile(r"[.!?。！？…]+[\"')\]]*\s")
+CLAUSE_END = re.compile(r"[,;:—–]\s")
+# A period after one of these does not end the sentence ("Dr. Smith", "e.g. this")
+ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "approx"}
+
+class SentenceChunker:
+
+    """Accumulates streamed text and emits complete phrases as soon as they are available."""
+
+    def __init__(self, min_chars: int = 20, max_chars: int = 200):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add a piece of streamed text and return any phrases that are now complete."""
+        self.buffer += text
+        chunks = []
+
+        while True:
+            chunk = self._next_chunk()
+            if chunk is None:
+                break
+            if chunk:
+                chunks.append(chunk)
+
+        return chunks
+
+    def flush(self) -> List[str]:
+        """Return whatever text is left once the stream has ended."""
+        remainder = self.buffer.strip()
+        self.buffer = ""
+        return [remainder] if remainder else []
+
+    def _next_chunk(self) -> Optional[str]:
+        # Prefer a full sentence, even a short one ("Sure.")
+        for match in SENTENCE_END.finditer(self.buffer):
+            if not self._is_abbreviation(match.start()):
+                return self._cut(match.end())
+
+        # Fall back to a clause boundary once enough text has built up
+        if len(self.buffer) >= self.min_chars:
+            for match in CLAUSE_END.finditer(self.buffer):
+                if match.end() >= self.min_chars:
+                    return self._cut(match.end())
+
+        # Never hold back more than max_chars; split at the last space
+        if len(self.buffer) >= self.max_chars:
+            split_at = self.buffer.rfind(" ", 0, self.max_chars)
+            return self._cut(split_at + 1 if split_at > 0 else self.max_chars)
+
+        return None
+
+    def _is_abbreviation(self, index: int) -> bool:
+        """Whether the period at index closes an abbreviation rather than a sentence."""
+        if self.buffer[index] != ".":
+            return False
+        words = self.buffer[:index].split()
+        return bool(words) and words[-1].lower().lstrip("(\"'") in ABBREVIATIONS
+
+    def _cut(self, index: int) -> str:
+        chunk, self.buffer = self.buffer[:index].strip(), self.buffer[index:]
+        return chunk
+
+async def chunk_stream(tokens: AsyncIterator[str], min_chars: int = 20, max_chars: int = 200) -> AsyncIterator[str]:
+
+    """Turn an async stream of tokens into an async stream of speakable phrases."""
+
+    chunker = SentenceChunker(min_chars=min_chars, max_chars=max_chars)
+
+    async for token in tokens:
+        for chunk in chunker.feed(token):
+            yield chunk
+
+    for chunk in chunker.flush():
+        yield chunk
@@ -0,0 +1,81 @@
+# This module provides process-wide, keep-alive HTTP clients for the Groq and ElevenLabs APIs so each turn reuses open connections instead of paying DNS, TCP and TLS setup.
+
+# Import necessary libraries
+import sys
+import os
+import asyncio
+import logging
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx
+from typing import Dict
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+def http2_available() -> bool:
+    """Check whether the optional h2 package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class HTTPClientManager:
+
+    """Owns one pooled httpx.AsyncClient per upstream service, with warm-up and clean shutdown."""
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._warmup_urls: Dict[str, str] = {}
+
+    def register(self, name: str, warmup_url: str):
+        """Register a service and the URL used to open its connections during warm-up."""
+        self._warmup_urls[name] = warmup_url
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """Return the shared client for a service, creating it on first use."""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._create_client()
+            self._clients[name] = client
+        return client
+
+    def _create_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+        )
+        timeout = httpx.Timeout(settings.HTTP_READ_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT)
+
+        http2 = settings.HTTP2_ENABLED
+        if http2 and not http2_available():
+            logger.warning("HTTP2_ENABLED is set but the h2 package is not installed, falling back to HTTP/1.1")
+            http2 = False
+
+        return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+    async def warmup(self, connections: int = 2):
+        """Open connections to every registered service before the first user speaks.
+        Several requests are sent concurrently so more than one connection is ready for overlapping turns."""
+
+        async def touch(name, url):
+            try:
+                await self.get(name).head(url)
+            except httpx.HTTPError as e:
+                logger.warning(f"HTTP warm-up for {name} failed: {e}")
+
+        await asyncio.gather(*(
+            touch(name, url)
+            for name, url in self._warmup_urls.items()
+            for _ in range(connections)
+        ))
+        logger.info(f"HTTP connection pools warmed: {', '.join(self._warmup_urls) or 'none'}")
+
+    async def aclose(self):
+        """Close every client and its pooled connections."""
+        clients, self._clients = list(self._clients.values()), {}
+        await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+
+http_clients = HTTPClientManager()
@@ -0,0 +1,55 @@
+# This module tracks the spoken language of one session, so Whisper's language-identification pass runs once per session
+# instead of once per turn. The first turn is decoded without a language; once a detection is confident enough the
+# language is pinned and passed to every later decode. A pinned decode with a low mean token log-probability usually means
+# the speaker switched language, so that utterance is detected again and the pin follows the new result.
+
+# Import necessary libraries
+import sys
+import os
+import logging
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from typing import Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class SessionLanguage:
+
+    """Pinned language of one session, with the thresholds that decide when to pin it and when to detect it again."""
+
+    def __init__(self, forced: Optional[str] = None, min_probability: float = None, redetect_logprob: float = None):
+        self.forced = forced or settings.STT_LANGUAGE or None
+        self.min_probability = settings.LANGUAGE_PIN_MIN_PROBABILITY if min_probability is None else min_probability
+        self.redetect_logprob = settings.LANGUAGE_REDETECT_LOGPROB if redetect_logprob is None else redetect_logprob
+        self.pinned: Optional[str] = None
+
+        self.detections = 0    # Turns decoded with language identification
+        self.redetections = 0  # Pinned turns detected again after a low-confidence decode
+
+    @property
+    def language(self) -> Optional[str]:
+        """Language to pass to the STT engine; None means detect."""
+        return self.forced or self.pinned
+
+    def observe_detection(self, language: str, probability: Optional[float]):
+        """Record a detected language and pin it if the detection was confident. Engines that report no probability are trusted."""
+        self.detections += 1
+        if not language or language == "unknown":
+            return
+        if probability is None or probability >= self.min_probability:
+            if language != self.pinned:
+                logger.info(f"Language pinned to '{language}' (p={probability})")
+            self.pinned = language
+
+    def needs_redetect(self, avg_logprob: Optional[float]) -> bool:
+        """Whether a decode under the pinned language was poor enough to identify the language again."""
+        return (self.pinned is not None and not self.forced
+                and avg_logprob is not None and avg_logprob < self.redetect_logprob)
+
+    def unpin(self):
+        self.redetections += 1
+        self.pinned = None
+
+    def stats(self) -> dict:
+        return {"language": self.language, "detections": self.detections, "redetections": self.redetections}
@@ -0,0 +1,107 @@
+# This module measures per-stage turn latency with a monotonic clock and keeps rolling percentile histograms per stage.
+# A turn is timed from the moment the user stopped speaking (VAD speech end), which is what the 2 s response budget is about.
+
+# Import necessary libraries
+import sys
+import os
+import time
+import threading
+from collections import deque
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from typing import Dict, Optional
+from config import settings
+
+# Span name -> (start mark, end mark)
+SPANS = {
+    "eou_delay": ("speech_end", "eou"),                 # Silence waited before the turn was closed
+    "stt": ("stt_start", "stt_done"),                   # Final transcription, including scheduler wait
+    "ttft": ("llm_start", "llm_first_token"),           # LLM time to first token
+    "llm_total": ("llm_start", "llm_done"),             # Full LLM generation
+    "ttfb": ("tts_start", "tts_first_byte"),            # First TTS request to its first audio byte
+    "response_latency": ("eou", "first_audio"),         # Turn closed to first agent audio frame out
+    "e2e_latency": ("speech_end", "first_audio"),       # User stopped speaking to first agent audio frame out
+    "playback": ("first_audio", "playback_end"),        # How long the agent spoke
+}
+
+def now() -> float:
+    return time.perf_counter()
+
+class TurnTimer:
+
+    """Monotonic marks for one turn. Each mark keeps its first occurrence unless overwritten explicitly."""
+
+    def __init__(self, speech_end: Optional[float] = None):
+        self.marks: Dict[str, float] = {}
+        if speech_end is not None:
+            self.marks["speech_end"] = speech_end
+
+    def mark(self, name: str, at: Optional[float] = None, overwrite: bool = False) -> float:
+        at = now() if at is None else at
+        if overwrite or name not in self.marks:
+            self.marks[name] = at
+        return self.marks[name]
+
+    def span(self, name: str) -> Optional[float]:
+        start, end = SPANS[name]
+        if start in self.marks and end in self.marks:
+            return self.marks[end] - self.marks[start]
+        return None
+
+    def spans(self) -> Dict[str, float]:
+        """Every span whose two marks were recorded, in seconds."""
+        return {name: value for name in SPANS if (value := self.span(name)) is not None}
+
+class LatencyHistograms:
+
+    """Rolling window of the last N observations per span, summarized as p50/p95/p99."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.samples: Dict[str, deque] = {}
+        self.counts: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float):
+        with self.lock:
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.window)
+                self.counts[name] = 0
+            self.samples[name].append(seconds)
+            self.counts[name] += 1
+
+    def observe_turn(self, timer: TurnTimer):
+        for name, seconds in timer.spans().items():
+            self.observe(name, seconds)
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.counts.clear()
+
+    def percentile(self, name: str, q: float) -> Optional[float]:
+        with self.lock:
+            samples = list(self.samples.get(name, ()))
+        return float(np.percentile(samples, q)) if samples else None
+
+    def summary(self) -> Dict[str, dict]:
+        with self.lock:
+            snapshot = {name: (list(samples), self.counts[name]) for name, samples in self.samples.items()}
+
+        result = {}
+        for name, (samples, count) in snapshot.items():
+            if not samples:
+                continue
+            p50, p95, p99 = (float(v) for v in np.percentile(samples, [50, 95, 99]))
+            result[name] = {
+                "count": count,
+                "window": len(samples),
+                "p50_ms": round(p50 * 1000, 1),
+                "p95_ms": round(p95 * 1000, 1),
+                "p99_ms": round(p99 * 1000, 1),
+                "max_ms": round(max(samples) * 1000, 1),
+            }
+        return result
+
+latency_stats = LatencyHistograms(settings.METRICS_WINDOW)
@@ -1,13 +1,8 @@
+from __future__ import annotations  # Annotations name LiveKit types, which may be missing
+
 import asyncio
 import time
-import io
-import wave
-import pandas as pd
-from datetime import datetime
-from pathlib import Path
 import logging
-from collections import deque
-import numpy as np
 
 try:
     # Core imports
@@ -20,6 +15,7 @@ try:
         AudioTrack,        
         )
     from livekit.rtc.audio_source import AudioSource, AudioFrame 
+    from livekit.rtc.audio_stream import AudioStream
     from livekit.rtc._proto.track_pb2 import TrackKind
     # Track kind and publication imports
     from livekit.rtc.track_publication import (
@@ -32,63 +28,98 @@ try:
     from livekit.api import AccessToken, VideoGrants, SIPGrants
     from livekit.api.livekit_api import LiveKitAPI
 
-    print("✓ All LiveKit imports successful")
-    
+    LIVEKIT_IMPORT_ERROR = None
+
 except ImportError as e:
-    print(f"LiveKit import error: {e}")
-    print("Please install required packages:")
-    print("pip install livekit==1.0.8")
-    exit(1)
+    # Importing this module must not kill the process (tests, tools, the WebSocket server); the agent raises when it is used
+    LIVEKIT_IMPORT_ERROR = e
 
 
-from stt import transcribe_audio
-from llm import generate_response
-from tts import text_to_speech
+from session import ParticipantSession
+from http_client import http_clients
+from stt_scheduler import stt_scheduler
+from metrics_server import start_metrics_server
+from readiness import readiness, warm_up_process
+from latency import latency_stats
 from config import settings
 
 # LiveKit Configuration
 LIVEKIT_API_KEY = settings.LIVEKIT_API_KEY
 LIVEKIT_API_SECRET = settings.LIVEKIT_API_SECRET
 LIVEKIT_WS_URL = settings.LIVEKIT_API_URL
-ROOM_NAME = settings.LIVEKIT_ROOM_NAME
+ROOM_NAME = settings.LIVEKIT_ROOM_NAME  # One room, or a comma-separated list served by one process
 BOT_PARTICIPANT_NAME = settings.LIVEKIT_PARTICIPANT_NAME
 
-# Add after LiveKit Configuration section
-if not all([LIVEKIT_API_KEY, LIVEKIT_API_SECRET, LIVEKIT_WS_URL, ROOM_NAME, BOT_PARTICIPANT_NAME]):
-    missing = []
-    if not LIVEKIT_API_KEY: missing.append("LIVEKIT_API_KEY")
-    if not LIVEKIT_API_SECRET: missing.append("LIVEKIT_API_SECRET")
-    if not LIVEKIT_WS_URL: missing.append("LIVEKIT_API_URL")
-    if not ROOM_NAME: missing.append("LIVEKIT_ROOM_NAME")
-    if not BOT_PARTICIPANT_NAME: missing.append("LIVEKIT_PARTICIPANT_NAME")
-    raise ValueError(f"Missing required LiveKit configuration: {', '.join(missing)}")
+def check_livekit():
+    """Raise if the LiveKit packages or the LiveKit configuration are missing; checked when an agent is created, not at import."""
+    if LIVEKIT_IMPORT_ERROR is not None:
+        raise ImportError(f"LiveKit is not available ({LIVEKIT_IMPORT_ERROR}). Install it with: pip install livekit==1.0.8") from LIVEKIT_IMPORT_ERROR
+
+    if not all([LIVEKIT_API_KEY, LIVEKIT_API_SECRET, LIVEKIT_WS_URL, ROOM_NAME, BOT_PARTICIPANT_NAME]):
+        missing = []
+        if not LIVEKIT_API_KEY: missing.append("LIVEKIT_API_KEY")
+        if not LIVEKIT_API_SECRET: missing.append("LIVEKIT_API_SECRET")
+        if not LIVEKIT_WS_URL: missing.append("LIVEKIT_API_URL")
+        if not ROOM_NAME: missing.append("LIVEKIT_ROOM_NAME")
+        if not BOT_PARTICIPANT_NAME: missing.append("LIVEKIT_PARTICIPANT_NAME")
+        raise ValueError(f"Missing required LiveKit configuration: {', '.join(missing)}")
+
+class LiveKitAudioOutput:
+
+    """Session output that wraps raw PCM frames into AudioFrames for a LiveKit AudioSource."""
+
+    def __init__(self, audio_source, sample_rate: int = 16000, num_channels: int = 1):
+        self.audio_source = audio_source
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+
+    async def capture_frame(self, data: bytes):
+        frame = AudioFrame(
+            data=data,
+            sample_rate=self.sample_rate,
+            num_channels=self.num_channels,
+            samples_per_channel=len(data) // (2 * self.num_channels)
+        )
+        await self.audio_source.capture_frame(frame)
+
+    def clear_queue(self):
+        """Drop audio buffered in the source but not yet sent (used on barge-in)."""
+        if hasattr(self.audio_source, "clear_queue"):
+            self.audio_source.clear_queue()
+
+class LiveKitTrack:
+
+    """Inbound audio of one remote track, delivered by LiveKit already resampled to the session's rate as mono int16.
+    WebRTC audio usually arrives at 48 kHz; the VAD, the ring buffer and STT all count samples at the session's rate."""
+
+    def __init__(self, track, sample_rate: int = 16000, num_channels: int = 1):
+        self.stream = AudioStream(track, sample_rate=sample_rate, num_channels=num_channels)
+
+    async def recv(self):
+        try:
+            async for event in self.stream:
+                yield event.frame
+        finally:
+            await self.stream.aclose()
 
 class VoiceAgent:
-    def __init__(self):
+
+    """Agent for one LiveKit room. Each remote participant's audio track gets its own ParticipantSession and its own outbound track,
+    so several speakers are served concurrently."""
+
+    def __init__(self, room_name: str = ROOM_NAME, turn_limiter: asyncio.Semaphore = None):
+        check_livekit()
         self.room = Room()
-        self.audio_source = AudioSource(sample_rate=16000, num_channels=1)
-        self.local_track = LocalAudioTrack.create_audio_track("agent-audio", self.audio_source)
-
-        # Audio processing
-        self.audio_buffer = deque()
-        self.is_processing = False
-        self.is_speaking = False
-        self.stop_tts = False  
-        self.silence_threshold = 0.01
-        self.silence_duration_threshold = 1.0
-        self.last_audio_time = 0
-
-        # Session metrics
-        self.session_start_time = None
-        self.session_metrics = []
-        self.conversation_count = 0
-        self.total_audio_duration = 0
+        self.room_name = room_name
+        self.sample_rate = 16000  # Inbound audio is resampled to this rate by LiveKitTrack
+        self.turn_limiter = turn_limiter or asyncio.Semaphore(settings.MAX_CONCURRENT_TURNS)
 
-        # Excel logging
-        self.excel_filename = f"voice_agent_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        # (participant identity, track sid) -> (session, stream task, local track)
+        self.sessions = {}
+        self.session_start_time = None
 
         logging.basicConfig(level=logging.INFO)
-        self.logger = logging.getLogger(__name__)
+        self.logger = logging.getLogger(f"{__name__}.{room_name}")
 
     def generate_token(self, identity: str, room_name: str) -> str:
         """Generate LiveKit access token for the bot"""
@@ -119,11 +150,11 @@ class VoiceAgent:
 
     async def connect(self):
         """Connect to LiveKit room and set up event handlers"""
-        token = self.generate_token(identity=BOT_PARTICIPANT_NAME, room_name=ROOM_NAME)
+        token = self.generate_token(identity=BOT_PARTICIPANT_NAME, room_name=self.room_name)
 
         # Debug logging
         self.logger.info(f"Connecting with URL: {LIVEKIT_WS_URL}")
-        self.logger.info(f"Room name: {ROOM_NAME}")
+        self.logger.info(f"Room name: {self.room_name}")
         self.logger.info(f"Identity: {BOT_PARTICIPANT_NAME}")
         self.logger.info(f"Generated token: {token[:20]}... (truncated for security)")
         self.logger.info("Connecting to LiveKit...")
@@ -137,17 +168,14 @@ class VoiceAgent:
             connect_task = self.room.connect(url=url, token=token)
             await asyncio.wait_for(connect_task, timeout=30.0)
 
-            # Publish local track
-            await self.room.local_participant.publish_track(self.local_track)
-            
             self.session_start_time = time.time()
-            self.logger.info(f"Successfully connected to room '{ROOM_NAME}' as {BOT_PARTICIPANT_NAME}")
+            self.logger.info(f"Successfully connected to room '{self.room_name}' as {BOT_PARTICIPANT_NAME}")
 
             # Set up event handlers
             self.room.on("participant_connected", self.on_participant_connected)
             self.room.on("participant_disconnected", self.on_participant_disconnected)
             self.room.on("track_published", self.on_track_published)
-            
+
         except asyncio.TimeoutError:
             self.logger.error("Connection timeout")
             raise
@@ -160,239 +188,150 @@ class VoiceAgent:
 
     def on_participant_disconnected(self, participant):
         self.logger.info(f"Participant disconnected: {participant.identity}")
-        # Log session summary when participant leaves
-        asyncio.create_task(self.log_session_summary())
+        # Close the participant's sessions and log their summaries
+        for key in [key for key in self.sessions if key[0] == participant.identity]:
+            asyncio.create_task(self.close_session(key))
 
     async def on_track_published(self, publication: RemoteTrackPublication, participant):
         """Handle new audio track from participant"""
         if publication.kind == TrackKind.AUDIO:
             self.logger.info(f"Audio track published by {participant.identity}")
             track = publication.track
-            
+
             if track:
                 await track.start()
-                asyncio.create_task(self.process_audio_stream(track))
-
-    async def process_audio_stream(self, track):
-        """Process incoming audio stream in real-time"""
-        audio_frames = []
-        last_frame_time = time.time()
-
-        async for audio_frame in track.recv():
-            current_time = time.time()
-
-            # Handle interruption: If user speaks during TTS playback
-            if self.is_speaking:
-                self.logger.info("Interruption detected - stopping TTS playback")
-                self.stop_tts = True
-                # Wait until TTS streaming is halted before continuing
-                while self.is_speaking:
-                    await asyncio.sleep(0.01)
-
-            # Convert audio frame to numpy array
-            audio_data = np.frombuffer(audio_frame.data, dtype=np.int16)
-            audio_frames.append(audio_data)
-
-            # Voice activity detection
-            rms = np.sqrt(np.mean(audio_data.astype(float) ** 2))
-            if rms > self.silence_threshold:
-                last_frame_time = current_time
-
-            silence_duration = current_time - last_frame_time
-            if silence_duration > self.silence_duration_threshold and audio_frames and not self.is_processing:
-                self.is_processing = True
-                asyncio.create_task(self.process_voice_input(audio_frames.copy()))
-                audio_frames.clear()
-
-    async def process_voice_input(self, audio_frames):
-        """Process voice input through STT -> LLM -> TTS pipeline"""
+                await self.open_session(participant.identity, track)
+
+    async def open_session(self, identity: str, track):
+        """Create a session and a dedicated outbound track for one participant's audio track"""
+        key = (identity, getattr(track, "sid", None))
+        if key in self.sessions:
+            return
+
+        if len(self.sessions) >= settings.MAX_SESSIONS_PER_ROOM:
+            self.logger.warning(f"Session limit reached in room '{self.room_name}', ignoring track from {identity}")
+            return
+
+        # The published track uses the configured output format; TTS audio is converted to it during playout
+        audio_source = AudioSource(sample_rate=settings.AGENT_AUDIO_SAMPLE_RATE, num_channels=settings.AGENT_AUDIO_CHANNELS)
+        local_track = LocalAudioTrack.create_audio_track(f"agent-audio-{identity}", audio_source)
+        await self.room.local_participant.publish_track(local_track)
+
+        session = ParticipantSession(
+            session_id=f"{self.room_name}-{identity}",
+            output=LiveKitAudioOutput(audio_source, settings.AGENT_AUDIO_SAMPLE_RATE, settings.AGENT_AUDIO_CHANNELS),
+            sample_rate=self.sample_rate,
+            turn_limiter=self.turn_limiter
+        )
+        task = asyncio.create_task(session.process_audio_stream(LiveKitTrack(track, self.sample_rate)))
+        self.sessions[key] = (session, task, local_track)
+        self.logger.info(f"Session opened for {identity} ({len(self.sessions)} active in room)")
+
+    async def close_session(self, key):
+        """Stop a session, unpublish its outbound track and log its summary"""
+        entry = self.sessions.pop(key, None)
+        if entry is None:
+            return
+
+        session, task, local_track = entry
+        # Stop reading audio, then the running turn, so nothing is still writing to the track when it is unpublished
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await session.close()
         try:
-            conversation_start = time.time()
-            metrics = {"conversation_id": self.conversation_count + 1}
-
-            # Convert audio frames to WAV
-            audio_data = np.concatenate(audio_frames)
-            temp_audio_path = f"temp_audio_{int(time.time())}.wav"
-            with wave.open(temp_audio_path, 'wb') as wav_file:
-                wav_file.setnchannels(1)
-                wav_file.setsampwidth(2)
-                wav_file.setframerate(16000)
-                wav_file.writeframes(audio_data.tobytes())
-
-            # Duration
-            audio_duration = len(audio_data) / 16000
-            self.total_audio_duration += audio_duration
-            metrics["audio_duration"] = round(audio_duration, 3)
-
-            # STT
-            stt_start = time.time()
-            transcribed_text, eou_time, detected_language = await asyncio.to_thread(
-                transcribe_audio, temp_audio_path
-            )
-            stt_end = time.time()
-
-            if not transcribed_text.strip():
-                self.logger.info("No speech detected, skipping processing")
-                self.is_processing = False
-                Path(temp_audio_path).unlink(missing_ok=True)
-                return
-
-            metrics["eou_delay"] = round(eou_time, 3)
-            metrics["stt_latency"] = round(stt_end - stt_start, 3)
-            metrics["transcription"] = transcribed_text
-            metrics["detected_language"] = detected_language
-
-            self.logger.info(f"STT: {transcribed_text}")
-
-            # LLM
-            llm_start = time.time()
-            llm_response = await generate_response(transcribed_text)
-            llm_end = time.time()
-
-            metrics["ttft"] = round(llm_end - llm_start, 3)
-            metrics["llm_response"] = llm_response
-
-            self.logger.info(f"LLM: {llm_response}")
-
-            # TTS
-            tts_start = time.time()
-            self.stop_tts = False  # Reset before playback
-            tts_output_path = await text_to_speech(llm_response, language=detected_language)
-            tts_end = time.time()
-
-            metrics["ttfb"] = round(tts_end - tts_start, 3)
-            metrics["total_latency"] = round(tts_end - conversation_start, 3)
-
-            # Play TTS
-            await self.stream_audio_to_room(tts_output_path)
-
-            # Metrics
-            metrics["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.session_metrics.append(metrics)
-            self.conversation_count += 1
-
-            self.logger.info(f"Metrics - EOU: {metrics['eou_delay']}s, TTFT: {metrics['ttft']}s, "
-                            f"TTFB: {metrics['ttfb']}s, Total: {metrics['total_latency']}s")
-
-            if metrics['total_latency'] > 2.0:
-                self.logger.warning(f"Latency exceeded 2s: {metrics['total_latency']}s")
-
-            # Cleanup
-            Path(temp_audio_path).unlink(missing_ok=True)
-            Path(tts_output_path).unlink(missing_ok=True)
-
+            await self.room.local_participant.unpublish_track(local_track.sid)
         except Exception as e:
-            self.logger.error(f"Error processing voice input: {e}")
-        finally:
-            self.is_processing = False
-            self.last_audio_time = time.time()
-            self.stop_tts = False
-            self.logger.info("Processing complete, ready for next input")
+            self.logger.warning(f"Failed to unpublish track for {key[0]}: {e}")
+        await session.log_session_summary()
 
+    async def disconnect(self):
+        """Close every session and leave the room"""
+        await asyncio.gather(*(self.close_session(key) for key in list(self.sessions)))
+        await self.room.disconnect()
+
+    async def run(self):
+        """Main run loop"""
+        await warm_up_process()
+        if not readiness.ready:
+            raise RuntimeError(f"Warm-up failed: {readiness.errors}")
+        await self.connect()
 
-    async def stream_audio_to_room(self, audio_file_path):
-        """Stream TTS audio back to the LiveKit room"""
         try:
-            self.is_speaking = True
-            self.stop_tts = False  # Reset flag before streaming
+            # Keep the agent running
+            while True:
+                await asyncio.sleep(1)
 
-            with wave.open(audio_file_path, 'rb') as wav_file:
-                sample_rate = wav_file.getframerate()
-                num_channels = wav_file.getnchannels()
-                chunk_size = int(sample_rate * 0.02)
+        except KeyboardInterrupt:
+            self.logger.info("Shutting down voice agent...")
+        finally:
+            await self.disconnect()
+            await http_clients.aclose()
+            await stt_scheduler.aclose()
 
-                while True:
-                    if self.stop_tts:  # Interruption check
-                        self.logger.info("TTS playback interrupted by new speech input.")
-                        break
+class VoiceAgentManager:
 
-                    audio_data = wav_file.readframes(chunk_size)
-                    if not audio_data:
-                        break
+    """Serves many rooms from one process. The STT model and HTTP pools are module-level and shared by every agent;
+    the turn limiter is shared too, so the number of concurrent STT/LLM/TTS turns is capped per process."""
 
-                    audio_array = np.frombuffer(audio_data, dtype=np.int16)
+    def __init__(self, room_names=None):
+        check_livekit()
+        if room_names is None:
+            room_names = [name.strip() for name in ROOM_NAME.split(",") if name.strip()]
+        self.room_names = room_names
+        self.turn_limiter = asyncio.Semaphore(settings.MAX_CONCURRENT_TURNS)
+        self.agents = {}
 
-                    frame = AudioFrame(
-                        data=audio_array.tobytes(),
-                        sample_rate=sample_rate,
-                        num_channels=num_channels,
-                        samples_per_channel=len(audio_array) // num_channels
-                    )
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
 
-                    await self.audio_source.capture_frame(frame)
-                    await asyncio.sleep(0.02)
+    async def join(self, room_name: str) -> VoiceAgent:
+        """Join a room, unless it is already served or the room limit is reached"""
+        if room_name in self.agents:
+            return self.agents[room_name]
+        if len(self.agents) >= settings.MAX_ROOMS:
+            raise RuntimeError(f"Room limit reached ({settings.MAX_ROOMS}), cannot join '{room_name}'")
 
-            self.logger.info("Finished streaming TTS audio")
+        agent = VoiceAgent(room_name, turn_limiter=self.turn_limiter)
+        await agent.connect()
+        self.agents[room_name] = agent
+        return agent
 
-        except Exception as e:
-            self.logger.error(f"Error streaming audio: {e}")
+    async def leave(self, room_name: str):
+        agent = self.agents.pop(room_name, None)
+        if agent:
+            await agent.disconnect()
 
-        finally:
-            self.is_speaking = False
+    async def run(self):
+        """Warm the STT model, the HTTP pools and the TTS cache, then join every configured room and keep serving until cancelled.
+        Rooms are joined only once the process is warm; /ready on the metrics server reports progress meanwhile."""
+        metrics_server = start_metrics_server()
 
-    async def log_session_summary(self):
-        """Log session metrics to Excel file"""
         try:
-            if not self.session_metrics:
-                self.logger.info("No metrics to log")
-                return
-            
-            # Create detailed metrics DataFrame
-            df_metrics = pd.DataFrame(self.session_metrics)
-            
-            # Create session summary
-            session_duration = time.time() - self.session_start_time if self.session_start_time else 0
-            avg_latency = df_metrics['total_latency'].mean() if not df_metrics.empty else 0
-            avg_eou_delay = df_metrics['eou_delay'].mean() if not df_metrics.empty else 0
-            avg_ttft = df_metrics['ttft'].mean() if not df_metrics.empty else 0
-            avg_ttfb = df_metrics['ttfb'].mean() if not df_metrics.empty else 0
-            
-            session_summary = {
-                'Session Start': [datetime.fromtimestamp(self.session_start_time).strftime("%Y-%m-%d %H:%M:%S")],
-                'Session Duration (s)': [round(session_duration, 3)],
-                'Total Conversations': [self.conversation_count],
-                'Total Audio Duration (s)': [round(self.total_audio_duration, 3)],
-                'Average EOU Delay (s)': [round(avg_eou_delay, 3)],
-                'Average TTFT (s)': [round(avg_ttft, 3)],
-                'Average TTFB (s)': [round(avg_ttfb, 3)],
-                'Average Total Latency (s)': [round(avg_latency, 3)],
-                'Latency Target Met': ['Yes' if avg_latency < 2.0 else 'No'],
-                'Max Latency (s)': [round(df_metrics['total_latency'].max(), 3) if not df_metrics.empty else 0],
-                'Min Latency (s)': [round(df_metrics['total_latency'].min(), 3) if not df_metrics.empty else 0]
-            }
-            
-            df_summary = pd.DataFrame(session_summary)
-            
-            # Write to Excel with multiple sheets
-            with pd.ExcelWriter(self.excel_filename, engine='openpyxl') as writer:
-                df_summary.to_excel(writer, sheet_name='Session Summary', index=False)
-                df_metrics.to_excel(writer, sheet_name='Detailed Metrics', index=False)
-            
-            self.logger.info(f"Metrics logged to {self.excel_filename}")
-            self.logger.info(f"Session Summary - Duration: {session_duration:.1f}s, "
-                           f"Conversations: {self.conversation_count}, "
-                           f"Avg Latency: {avg_latency:.3f}s")
-            
-        except Exception as e:
-            self.logger.error(f"Error logging to Excel: {e}")
+            await warm_up_process()
+            if not readiness.ready:
+                raise RuntimeError(f"Warm-up failed, not joining any room: {readiness.errors}")
+
+            results = await asyncio.gather(*(self.join(name) for name in self.room_names), return_exceptions=True)
+            for name, result in zip(self.room_names, results):
+                if isinstance(result, Exception):
+                    self.logger.error(f"Failed to join room '{name}': {result}")
 
-    async def run(self):
-        """Main run loop"""
-        await self.connect()
-        
-        try:
-            # Keep the agent running
             while True:
                 await asyncio.sleep(1)
-                
         except KeyboardInterrupt:
-            self.logger.info("Shutting down voice agent...")
-            await self.log_session_summary()
-            await self.room.disconnect()
+            self.logger.info("Shutting down voice agents...")
+        finally:
+            await asyncio.gather(*(self.leave(name) for name in list(self.agents)), return_exceptions=True)
+            if metrics_server:
+                await metrics_server.aclose()
+            self.logger.info(f"Latency percentiles: {latency_stats.summary()}")
+            self.logger.info(f"STT scheduler stats: {stt_scheduler.stats()}")
+            await http_clients.aclose()
+            await stt_scheduler.aclose()
 
 async def main():
-    agent = VoiceAgent()
-    await agent.run()
+    manager = VoiceAgentManager()
+    await manager.run()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
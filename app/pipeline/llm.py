@@ -1,37 +1,146 @@
 # Import necessary libraries
 import sys
 import os
+import json
+from urllib.parse import urlsplit
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
-import httpx
+from typing import AsyncIterator
 from config import settings
+from http_client import http_clients
+from llm_cache import response_cache
+from llm_hedge import hedged_call, hedged_stream
 
 # Define constants for the Groq API
 GROQ_API_KEY = settings.GROQ_API_KEY
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
-GROQ_MODEL = "llama3-70b-8192"  # or mixtral-8x7b-32768
+GROQ_API_URL = settings.GROQ_API_URL
+GROQ_MODEL = settings.GROQ_MODEL
+# Requests whose first token is late are also sent to this model; the first to answer is used
+FALLBACK_MODEL = settings.LLM_FALLBACK_MODEL if settings.LLM_HEDGE_ENABLED and settings.LLM_FALLBACK_MODEL != GROQ_MODEL else None
+SYSTEM_PROMPT = "You are a friendly and helpful voice assistant."
+TEMPERATURE = 0.7
 
-async def generate_response(user_input: str) -> str:
+# Requests reuse the process-wide keep-alive pool; the base URL is touched during warm-up
+http_clients.register("groq", "{0.scheme}://{0.netloc}/".format(urlsplit(GROQ_API_URL)))
+
+def build_request(user_input: str, stream: bool = False, model: str = GROQ_MODEL):
+
+    '''Build the headers and payload for a Groq chat-completions request.'''
 
-    '''Generate a response from the Groq API based on user input.'''
-    
     headers = {
         "Authorization": f"Bearer {GROQ_API_KEY}",
         "Content-Type": "application/json"
     }
 
     payload = {
-        "model": GROQ_MODEL,
+        "model": model,
         "messages": [
-            {"role": "system", "content": "You are a friendly and helpful voice assistant."},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": user_input}
         ],
-        "temperature": 0.7
+        "temperature": TEMPERATURE
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(GROQ_API_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        data = response.json()
+    if stream:
+        payload["stream"] = True
+
+    return headers, payload
+
+def cache_key(user_input: str, use_cache: bool):
+
+    '''Return the response-cache key for a prompt, or None when the prompt must not be cached.'''
+
+    if not use_cache or not response_cache.is_cacheable(user_input):
+        return None
+    return response_cache.make_key(user_input, SYSTEM_PROMPT, GROQ_MODEL, TEMPERATURE)
+
+async def generate_response(user_input: str, use_cache: bool = True) -> str:
+
+    '''Generate a response from the Groq API based on user input.
+    Repeated prompts are answered from the response cache; pass use_cache=False for prompts that must always reach the model.'''
+
+    key = cache_key(user_input, use_cache)
+    if key:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+
+    outcome = {}
+    text = await hedged_call(
+        lambda: _complete(user_input, GROQ_MODEL),
+        FALLBACK_MODEL and (lambda: _complete(user_input, FALLBACK_MODEL)),
+        outcome=outcome
+    )
+
+    # Cache entries are keyed by the primary model, so fallback answers are not cached
+    if key and outcome.get("winner") == "primary":
+        response_cache.put(key, text)
+    return text
+
+async def _complete(user_input: str, model: str) -> str:
+
+    '''Send one non-streaming chat-completions request.'''
+
+    headers, payload = build_request(user_input, model=model)
+
+    client = http_clients.get("groq")
+    response = await client.post(GROQ_API_URL, headers=headers, json=payload)
+    response.raise_for_status()
+    data = response.json()
 
     return data["choices"][0]["message"]["content"].strip()
+
+async def stream_response(user_input: str, use_cache: bool = True) -> AsyncIterator[str]:
+
+    '''Stream the Groq response token by token by reading the chat-completions SSE stream.
+    A cached response is yielded at once; a fresh one is cached only if the stream completes.
+    If the first token is late, the request is hedged to the fallback model and the first model to answer is streamed.'''
+
+    key = cache_key(user_input, use_cache)
+    if key:
+        cached = response_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    tokens = []
+    outcome = {}
+    stream = hedged_stream(
+        lambda: _stream_tokens(user_input, GROQ_MODEL),
+        FALLBACK_MODEL and (lambda: _stream_tokens(user_input, FALLBACK_MODEL)),
+        outcome=outcome
+    )
+    try:
+        async for token in stream:
+            tokens.append(token)
+            yield token
+    finally:
+        await stream.aclose()
+
+    if key and outcome.get("winner") == "primary":
+        response_cache.put(key, "".join(tokens).strip())
+
+async def _stream_tokens(user_input: str, model: str = GROQ_MODEL) -> AsyncIterator[str]:
+
+    '''Read the SSE stream of one chat-completions request.'''
+
+    headers, payload = build_request(user_input, stream=True, model=model)
+
+    client = http_clients.get("groq")
+    async with client.stream("POST", GROQ_API_URL, headers=headers, json=payload) as response:
+        response.raise_for_status()
+
+        async for line in response.aiter_lines():
+            # SSE events arrive as "data: {...}" lines, terminated by "data: [DONE]"
+            if not line.startswith("data:"):
+                continue
+
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+
+            delta = json.loads(data)["choices"][0].get("delta", {})
+            token = delta.get("content")
+            if token:
+                yield token
@@ -0,0 +1,81 @@
+# This module caches LLM responses for repeated questions, so frequent turns skip the Groq round trip and its cost.
+# Keys combine the normalized user text with the system prompt, model and temperature; entries expire after a TTL and are evicted least-recently-used first.
+
+# Import necessary libraries
+import sys
+import os
+import re
+import time
+import hashlib
+import json
+from collections import OrderedDict
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from typing import Optional
+from config import settings
+
+def normalize_prompt(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace, so "What are your hours?" and "what are your hours" share a key."""
+    text = re.sub(r"[^\w\s']", " ", text.lower())
+    return " ".join(text.split())
+
+class ResponseCache:
+
+    """Size-bounded LRU of LLM responses with a time-to-live."""
+
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None):
+        self.max_entries = settings.LLM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.ttl = settings.LLM_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.exclude = re.compile(settings.LLM_CACHE_EXCLUDE, re.IGNORECASE) if settings.LLM_CACHE_EXCLUDE else None
+
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+
+    def make_key(self, user_input: str, system_prompt: str, model: str, temperature: float) -> str:
+        material = json.dumps([normalize_prompt(user_input), system_prompt, model, temperature])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, user_input: str) -> bool:
+        """Prompts whose answers change over time (weather, "today", jokes...) match LLM_CACHE_EXCLUDE and are never cached."""
+        if not settings.LLM_CACHE_ENABLED:
+            return False
+        if self.exclude and self.exclude.search(user_input):
+            self.skipped += 1
+            return False
+        return True
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        response, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self.entries[key]
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return response
+
+    def put(self, key: str, response: str):
+        self.entries[key] = (response, time.monotonic() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self.entries)
+        }
+
+response_cache = ResponseCache()
@@ -0,0 +1,213 @@
+# This module hedges LLM requests against tail latency. A request goes to the primary model first; if nothing has come
+# back by the hedge deadline, the same request is also sent to a fallback model, whichever produces its first token first
+# is used, and the other request is cancelled. A primary that fails before the deadline fails over to the fallback at once.
+# The deadline is fixed (LLM_HEDGE_DEADLINE_MS) or follows a rolling percentile of the primary's first-token latency, so only
+# the slowest few percent of requests are hedged. A primary that lost is cancelled at once, and its elapsed time goes into the
+# percentile window as a lower bound; the latency saved is then only known as a lower bound too. Opting in to
+# LLM_HEDGE_LOSER_GRACE_MS keeps it open until its first token instead, at the cost of the extra request, to measure it.
+
+# Import necessary libraries
+import sys
+import os
+import asyncio
+import logging
+from collections import deque
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# The event loop only keeps weak references to tasks, so detached loser measurements are held here until they finish
+_background_tasks = set()
+
+class HedgeStats:
+
+    """Rolling first-response latency of the primary model, the deadline derived from it, and how hedging went."""
+
+    def __init__(self, name: str, window: int = None):
+        self.name = name
+        self.primary_latency = deque(maxlen=window or settings.METRICS_WINDOW)  # Seconds to the primary's first token
+        self.saved = deque(maxlen=window or settings.METRICS_WINDOW)            # Seconds saved per measured fallback win
+        self.saved_lower_bound = deque(maxlen=window or settings.METRICS_WINDOW)  # ... at least, where the primary was cancelled unanswered
+
+        self.requests = 0
+        self.hedged = 0                    # Requests that also went to the fallback model
+        self.failovers = 0                 # ... because the primary failed before the deadline
+        self.fallback_wins = 0
+        self.primary_wins_after_hedge = 0  # Hedges that only added load
+        self.unmeasured_wins = 0           # Fallback wins where the primary did not answer within the grace period
+
+    def deadline(self) -> float:
+        """Seconds to wait for the primary before hedging."""
+        if settings.LLM_HEDGE_DEADLINE_MS > 0:
+            return settings.LLM_HEDGE_DEADLINE_MS / 1000
+        if len(self.primary_latency) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return settings.LLM_HEDGE_INITIAL_DEADLINE_MS / 1000
+        percentile = float(np.percentile(self.primary_latency, settings.LLM_HEDGE_PERCENTILE))
+        return max(percentile, settings.LLM_HEDGE_MIN_DEADLINE_MS / 1000)
+
+    def stats(self) -> dict:
+        saved, lower_bound = list(self.saved), list(self.saved_lower_bound)
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+            "failovers": self.failovers,
+            "fallback_wins": self.fallback_wins,
+            "primary_wins_after_hedge": self.primary_wins_after_hedge,
+            "deadline_ms": round(self.deadline() * 1000, 1),
+            "saved_ms": {
+                "measured": len(saved),
+                "unmeasured": self.unmeasured_wins,
+                "mean": round(float(np.mean(saved)) * 1000, 1) if saved else None,
+                "p50": round(float(np.percentile(saved, 50)) * 1000, 1) if saved else None,
+                "total": round(sum(saved) * 1000, 1),
+            },
+            # The primary was still silent when it was cancelled, so these only say it would have taken at least this much longer
+            "saved_lower_bound_ms": {
+                "count": len(lower_bound),
+                "mean": round(float(np.mean(lower_bound)) * 1000, 1) if lower_bound else None,
+                "total": round(sum(lower_bound) * 1000, 1),
+            },
+        }
+
+# Streams are timed to the first token, one-shot completions to the whole response
+stream_hedge_stats = HedgeStats("stream")
+completion_hedge_stats = HedgeStats("completion")
+
+async def _close(stream):
+    aclose = getattr(stream, "aclose", None)
+    if aclose:
+        try:
+            await aclose()
+        except Exception as e:
+            logger.debug(f"Error closing a cancelled LLM stream: {e}")
+
+async def _cancel(task: asyncio.Task, stream):
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await _close(stream)
+
+async def _measure_loser(task: asyncio.Task, stream, started: float, winner_latency: float, stats: HedgeStats):
+    """Keep the losing primary open until its first token or the grace period, then close it."""
+    loop = asyncio.get_running_loop()
+    grace = settings.LLM_HEDGE_LOSER_GRACE_MS / 1000
+    done, _ = await asyncio.wait({task}, timeout=max(started + winner_latency + grace - loop.time(), 0))
+    if done and task.exception() is None:
+        latency = loop.time() - started
+        stats.primary_latency.append(latency)
+        stats.saved.append(latency - winner_latency)
+    else:
+        stats.unmeasured_wins += 1
+        if not done:
+            # Still silent: the censored value keeps the percentile from drifting down while hedges win
+            elapsed = loop.time() - started
+            stats.primary_latency.append(elapsed)
+            stats.saved_lower_bound.append(elapsed - winner_latency)
+    await _cancel(task, stream)
+
+async def hedged_stream(primary: Callable[[], AsyncIterator[str]], fallback: Optional[Callable[[], AsyncIterator[str]]] = None,
+                        stats: HedgeStats = stream_hedge_stats, outcome: dict = None) -> AsyncIterator[str]:
+    """
+    Yields the tokens of whichever model answers first.
+    Args:
+        primary, fallback: Zero-argument callables that start a request and return its async token iterator.
+        outcome: Optional dict that receives "winner" ("primary" or "fallback") and "hedged".
+    """
+    loop = asyncio.get_running_loop()
+    outcome = {} if outcome is None else outcome
+    started = loop.time()
+    stats.requests += 1
+
+    streams = {"primary": primary()}
+    firsts = {"primary": asyncio.ensure_future(streams["primary"].__anext__())}
+    hedge_at = started + stats.deadline()
+    error = None
+    winner = None
+
+    try:
+        while winner is None:
+            pending = [task for task in firsts.values() if not task.done()]
+            timeout = max(hedge_at - loop.time(), 0) if fallback and "fallback" not in firsts else None
+            if pending:
+                await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            for name, task in firsts.items():
+                if not task.done():
+                    continue
+                failure = task.exception()
+                if failure is None or isinstance(failure, StopAsyncIteration):
+                    winner = name
+                    break
+                error = failure
+
+            if winner is None:
+                primary_failed = firsts["primary"].done()
+                if fallback and "fallback" not in firsts and (primary_failed or loop.time() >= hedge_at):
+                    # Deadline passed (or the primary failed): race the fallback model
+                    stats.hedged += 1
+                    if primary_failed:
+                        stats.failovers += 1
+                        logger.warning(f"Primary LLM request failed ({error}), failing over to the fallback model")
+                    outcome["hedged"] = True
+                    streams["fallback"] = fallback()
+                    firsts["fallback"] = asyncio.ensure_future(streams["fallback"].__anext__())
+                elif all(task.done() for task in firsts.values()):
+                    raise error
+
+        latency = loop.time() - started
+        outcome["winner"] = winner
+        if winner == "primary":
+            stats.primary_latency.append(latency)
+            if "fallback" in firsts:
+                stats.primary_wins_after_hedge += 1
+                await _cancel(firsts.pop("fallback"), streams.pop("fallback"))
+        else:
+            stats.fallback_wins += 1
+            loser, loser_stream = firsts.pop("primary"), streams.pop("primary")
+            if loser.done() or settings.LLM_HEDGE_LOSER_GRACE_MS <= 0:
+                stats.unmeasured_wins += 1
+                if not loser.done():
+                    # Censored at the time it lost, so the percentile does not drift down while hedges win
+                    elapsed = loop.time() - started
+                    stats.primary_latency.append(elapsed)
+                    stats.saved_lower_bound.append(elapsed - latency)
+                await _cancel(loser, loser_stream)
+            else:
+                task = asyncio.create_task(_measure_loser(loser, loser_stream, started, latency, stats))
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+
+        first = firsts[winner]
+        if isinstance(first.exception(), StopAsyncIteration):
+            return
+        yield first.result()
+        async for token in streams[winner]:
+            yield token
+    finally:
+        # Also reached when the consumer stops early, e.g. on barge-in
+        for name, task in firsts.items():
+            if not task.done():
+                await _cancel(task, streams[name])
+            else:
+                await _close(streams[name])
+
+async def _once(call: Callable[[], Awaitable[str]]) -> AsyncIterator[str]:
+    yield await call()
+
+async def hedged_call(primary: Callable[[], Awaitable[str]], fallback: Optional[Callable[[], Awaitable[str]]] = None,
+                      stats: HedgeStats = completion_hedge_stats, outcome: dict = None) -> str:
+    """Like hedged_stream for one-shot requests: primary and fallback return coroutines of the whole response."""
+    stream = hedged_stream(lambda: _once(primary), fallback and (lambda: _once(fallback)), stats, outcome)
+    try:
+        async for result in stream:
+            return result
+        return ""
+    finally:
+        await stream.aclose()
+
+def hedge_stats() -> dict:
+    return {"stream": stream_hedge_stats.stats(), "completion": completion_hedge_stats.stats()}
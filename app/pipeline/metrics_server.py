@@ -0,0 +1,105 @@
+# This module serves live pipeline metrics over HTTP so the 2s response target can be watched while the agent runs.
+# GET /metrics returns the rolling p50/p95/p99 per latency stage together with the STT scheduler, cache, speculative-turn
+# and LLM hedging counters.
+# GET /health is a liveness probe; GET /ready answers 503 until the STT model and HTTP pools are warm.
+
+# Import necessary libraries
+import sys
+import os
+import asyncio
+import logging
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from typing import Optional
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from config import settings
+from latency import latency_stats
+from stt_scheduler import stt_scheduler
+from tts_cache import tts_cache
+from llm_cache import response_cache
+from llm_hedge import hedge_stats
+from session import speculation_stats
+from readiness import readiness
+
+logger = logging.getLogger(__name__)
+
+LATENCY_TARGET_SECONDS = 2.0
+# How long shutdown waits for uvicorn to close its socket and open connections before cancelling it
+SHUTDOWN_TIMEOUT_SECONDS = 5.0
+
+def add_health_routes(app: FastAPI):
+    """Liveness and readiness probes, shared by every HTTP server of the process."""
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/ready")
+    async def ready():
+        return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="Voice Agent Metrics")
+    add_health_routes(app)
+
+    @app.get("/metrics")
+    async def metrics():
+        latency = latency_stats.summary()
+        e2e = latency.get("e2e_latency")
+        return {
+            "latency": latency,
+            "target_ms": LATENCY_TARGET_SECONDS * 1000,
+            "target_met_p95": e2e["p95_ms"] <= LATENCY_TARGET_SECONDS * 1000 if e2e else None,
+            "stt_scheduler": stt_scheduler.stats(),
+            "tts_cache": tts_cache.stats(),
+            "llm_cache": response_cache.stats(),
+            "llm_hedge": hedge_stats(),
+            "speculation": speculation_stats.stats(),
+            "readiness": readiness.status(),
+        }
+
+    return app
+
+def create_server(host: str = None, port: int = None):
+    """The uvicorn server for the metrics app, not yet started."""
+    import uvicorn
+
+    config = uvicorn.Config(
+        create_app(),
+        host=host or settings.METRICS_HOST,
+        port=port or settings.METRICS_PORT,
+        log_level="warning"
+    )
+    return uvicorn.Server(config)
+
+async def serve_metrics(host: str = None, port: int = None):
+    """Run the metrics server on the current event loop until cancelled."""
+    server = create_server(host, port)
+    logger.info(f"Metrics available at http://{server.config.host}:{server.config.port}/metrics")
+    await server.serve()
+
+class MetricsServer:
+
+    """Handle on the background metrics server, so shutdown lets uvicorn close its socket instead of cancelling it mid-request."""
+
+    def __init__(self, host: str = None, port: int = None):
+        self.server = create_server(host, port)
+        logger.info(f"Metrics available at http://{self.server.config.host}:{self.server.config.port}/metrics")
+        self.task = asyncio.create_task(self.server.serve())
+
+    async def aclose(self):
+        """Ask uvicorn to exit and wait for it; cancelled only if it has not finished within SHUTDOWN_TIMEOUT_SECONDS."""
+        self.server.should_exit = True
+        done, _ = await asyncio.wait({self.task}, timeout=SHUTDOWN_TIMEOUT_SECONDS)
+        if not done:
+            logger.warning("Metrics server did not shut down in time, cancelling it")
+            self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+
+def start_metrics_server() -> Optional[MetricsServer]:
+    """Start the metrics server in the background when METRICS_SERVER_ENABLED is set."""
+    if not settings.METRICS_SERVER_ENABLED:
+        return None
+    return MetricsServer()
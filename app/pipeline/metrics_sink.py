@@ -0,0 +1,153 @@
+# This module records per-turn and per-session metrics as append-only JSON lines.
+# record() only enqueues, so the pipeline never waits on disk; a background thread appends batches to the log file.
+# The Excel summary is produced on demand with the export command instead of rewriting a workbook on every turn.
+
+# Import necessary libraries
+import sys
+import os
+import json
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from typing import List, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class MetricsWriter:
+
+    """Batched JSONL writer running on a daemon thread. Each record costs one queue put on the caller's side."""
+
+    def __init__(self, path: str = None, flush_interval: float = 1.0, batch_size: int = 256, max_pending: int = 10000):
+        self.path = path or settings.METRICS_LOG_PATH
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queue: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize=max_pending)
+        self.thread: Optional[threading.Thread] = None
+        self.start_lock = threading.Lock()
+        self.dropped = 0
+        self.written = 0
+
+    def record(self, record: dict):
+        """Enqueue one record; adds a timestamp if missing and never blocks."""
+        record.setdefault("timestamp", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_started(self):
+        if self.thread is None:
+            with self.start_lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+                    self.thread.start()
+                    atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            self._write([record for record in batch if record is not None])
+            if stop:
+                return
+
+    def _write(self, records: List[dict]):
+        if not records:
+            return
+        lines = "".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records)
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            self.written += len(records)
+        except OSError as e:
+            logger.error(f"Failed to append metrics to {self.path}: {e}")
+
+    def close(self):
+        """Flush pending records and stop the writer thread."""
+        if self.thread is None or not self.thread.is_alive():
+            return
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+metrics_writer = MetricsWriter()
+
+def read_records(path: str) -> List[dict]:
+    """Load every record from a metrics log, skipping a truncated last line."""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning("Skipping malformed metrics line")
+    return records
+
+def export_excel(log_path: str = None, excel_path: str = None) -> str:
+    """
+    Builds the Excel summary from the metrics log.
+    Sheets: 'Session Summary' (averages per session), 'Detailed Metrics' (one row per turn) and 'Sessions' (session records).
+    """
+    import pandas as pd
+
+    log_path = log_path or settings.METRICS_LOG_PATH
+    excel_path = excel_path or f"voice_agent_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+    records = read_records(log_path)
+    df_turns = pd.DataFrame([r for r in records if r.get("type") == "turn"])
+    df_sessions = pd.DataFrame([r for r in records if r.get("type") == "session"])
+
+    if not df_turns.empty:
+        latency = "total_latency"
+        grouped = df_turns.groupby("session_id")
+        df_summary = pd.DataFrame({
+            "Total Conversations": grouped.size(),
+            "Average EOU Delay (s)": grouped["eou_delay"].mean().round(3),
+            "Average TTFT (s)": grouped["ttft"].mean().round(3),
+            "Average TTFB (s)": grouped["ttfb"].mean().round(3),
+            "Average Total Latency (s)": grouped[latency].mean().round(3),
+            "Max Latency (s)": grouped[latency].max().round(3),
+            "Min Latency (s)": grouped[latency].min().round(3),
+        }).reset_index()
+        df_summary["Latency Target Met"] = df_summary["Average Total Latency (s)"].map(lambda v: "Yes" if v < 2.0 else "No")
+    else:
+        df_summary = pd.DataFrame()
+
+    with pd.ExcelWriter(excel_path, engine="openpyxl") as writer:
+        df_summary.to_excel(writer, sheet_name="Session Summary", index=False)
+        df_turns.to_excel(writer, sheet_name="Detailed Metrics", index=False)
+        df_sessions.to_excel(writer, sheet_name="Sessions", index=False)
+
+    return excel_path
+
+if __name__ == "__main__":
+    # Export command: python app/pipeline/metrics_sink.py export [metrics.jsonl] [output.xlsx]
+    if len(sys.argv) < 2 or sys.argv[1] != "export":
+        print("Usage: python app/pipeline/metrics_sink.py export [metrics.jsonl] [output.xlsx]")
+        sys.exit(1)
+
+    log_arg = sys.argv[2] if len(sys.argv) > 2 else None
+    excel_arg = sys.argv[3] if len(sys.argv) > 3 else None
+    print(f"Metrics exported to {export_excel(log_arg, excel_arg)}")
@@ -0,0 +1,114 @@
+# This module tracks whether this process is warm enough to take calls. Startup work (loading and warming the STT model,
+# opening the HTTP pools, pre-synthesizing common phrases) runs in the background and each component reports when it is done;
+# the process is ready once every required component is. /ready on the metrics and WebSocket servers reports this state,
+# so an orchestrator only routes traffic to warm instances, and the agents only accept rooms or connections once ready.
+
+# Import necessary libraries
+import sys
+import os
+import time
+import asyncio
+import logging
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# The TTS phrase cache only speeds up common replies, so the process does not wait for it to report ready
+REQUIRED_COMPONENTS = ("stt", "http")
+
+class Readiness:
+
+    """Startup state of this process: which components are warm, how long each took, and which failed."""
+
+    def __init__(self, components: Iterable[str] = REQUIRED_COMPONENTS):
+        self.pending = set(components)
+        self.warmup_seconds: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.started = time.perf_counter()
+        self.ready_after: Optional[float] = None
+        self._event: Optional[asyncio.Event] = None
+
+    @property
+    def ready(self) -> bool:
+        return not self.pending and not self.errors
+
+    def _get_event(self) -> asyncio.Event:
+        if self._event is None:
+            self._event = asyncio.Event()
+            if self.ready:
+                self._event.set()
+        return self._event
+
+    def mark_ready(self, component: str, seconds: float = None):
+        self.pending.discard(component)
+        if seconds is not None:
+            self.warmup_seconds[component] = round(seconds, 3)
+        if self.ready and self.ready_after is None:
+            self.ready_after = time.perf_counter() - self.started
+            logger.info(f"Ready to accept sessions after {self.ready_after:.2f}s")
+            if self._event is not None:
+                self._event.set()
+
+    def mark_failed(self, component: str, error: Exception):
+        self.pending.discard(component)
+        self.errors[component] = f"{type(error).__name__}: {error}"
+        logger.error(f"Warm-up of {component} failed: {error}")
+        # Waiters are released so they can see the failure instead of hanging
+        if self._event is not None:
+            self._event.set()
+
+    async def wait(self, timeout: float = None) -> bool:
+        """Wait until every component reported in; True if the process is ready."""
+        try:
+            await asyncio.wait_for(self._get_event().wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.ready
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "pending": sorted(self.pending),
+            "errors": self.errors,
+            "warmup_seconds": self.warmup_seconds,
+            "ready_after_seconds": round(self.ready_after, 3) if self.ready_after is not None else None,
+            "uptime_seconds": round(time.perf_counter() - self.started, 3),
+        }
+
+readiness = Readiness()
+
+async def warm_up_process(phrases: Iterable[str] = None):
+    """Warm every component concurrently: the STT model loads and runs one inference on a worker thread while the
+    HTTP pools connect and common phrases are synthesized into the TTS cache."""
+    from http_client import http_clients
+    from tts_cache import prewarm, configured_phrases
+
+    loop = asyncio.get_running_loop()
+
+    async def warm_stt():
+        try:
+            import stt
+            readiness.mark_ready("stt", await loop.run_in_executor(None, stt.warm_up))
+        except Exception as e:
+            readiness.mark_failed("stt", e)
+
+    async def warm_http():
+        start = time.perf_counter()
+        try:
+            await http_clients.warmup()
+            readiness.mark_ready("http", time.perf_counter() - start)
+        except Exception as e:
+            readiness.mark_failed("http", e)
+
+    async def warm_tts_cache():
+        start = time.perf_counter()
+        try:
+            await prewarm(configured_phrases() if phrases is None else phrases)
+            readiness.warmup_seconds["tts_cache"] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            logger.warning(f"TTS cache pre-warm failed: {e}")
+
+    await asyncio.gather(warm_stt(), warm_http(), warm_tts_cache())
@@ -0,0 +1,513 @@
+# This module holds the conversation state and turn logic for one remote participant's audio track.
+# It has no LiveKit dependency: audio arrives from any track object with an async recv() iterator and leaves through an output with an async capture_frame(bytes),
+# so the same session logic serves LiveKit rooms and other transports.
+
+# Import necessary libraries
+import asyncio
+import time
+import logging
+import numpy as np
+from datetime import datetime
+
+from stt_scheduler import stt_scheduler
+from streaming_stt import StreamingTranscriber
+from vad import VoiceActivityDetector
+from audio_buffer import AudioRingBuffer
+from audio_out import AudioPlayout
+from llm import stream_response
+from tts_cache import stream_speech_cached
+from chunker import chunk_stream
+from metrics_sink import metrics_writer
+from latency import TurnTimer, latency_stats, now
+from language import SessionLanguage
+from config import settings
+
+class SpeculationStats:
+
+    """Process-wide counters for speculative turns: how often the provisional end of utterance held, and the work thrown away when it did not."""
+
+    def __init__(self):
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted_seconds = 0.0      # Wall time speculative turns ran before being discarded
+        self.wasted_stt = 0            # Discarded turns that had finished STT
+        self.wasted_llm_requests = 0   # Discarded turns that had already sent the LLM request
+
+    def stats(self) -> dict:
+        decided = self.hits + self.misses
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / decided, 3) if decided else 0.0,
+            "wasted_seconds": round(self.wasted_seconds, 3),
+            "wasted_stt": self.wasted_stt,
+            "wasted_llm_requests": self.wasted_llm_requests
+        }
+
+speculation_stats = SpeculationStats()
+
+class ParticipantSession:
+
+    """Per-participant, per-track conversation state: VAD, streaming STT, the current turn and its metrics.
+    respond (text -> async tokens) and synthesize (text, language, sample_rate -> async PCM frames) default to Groq and the cached ElevenLabs stream."""
+
+    def __init__(self, session_id: str, output, sample_rate: int = 16000, turn_limiter: asyncio.Semaphore = None,
+                 respond=stream_response, synthesize=stream_speech_cached):
+        self.session_id = session_id
+        self.output = output
+        self.sample_rate = sample_rate
+        self.respond = respond
+        self.synthesize = synthesize
+        # Shared across sessions so the number of turns running STT/LLM/TTS at once stays bounded
+        self.turn_limiter = turn_limiter or asyncio.Semaphore(settings.MAX_CONCURRENT_TURNS)
+
+        # Audio processing
+        self.is_processing = False
+        self.is_speaking = False
+        self.turn_task = None        # The running turn: STT -> LLM -> TTS -> playout, cancelled as a whole on barge-in
+        self.cancelling = False
+        self.interruptions = 0
+        self.silence_duration_threshold = settings.EOU_SILENCE_MS / 1000
+        self.speculative_pause = settings.SPECULATIVE_PAUSE_MS / 1000 if settings.SPECULATIVE_TURNS else None
+        self.preroll_samples = sample_rate * settings.PREROLL_MS // 1000  # Audio kept from before speech onset so the first syllable is not clipped
+        self.max_utterance_samples = int(sample_rate * settings.MAX_UTTERANCE_SECONDS)
+        self.last_audio_time = 0
+        self.language = SessionLanguage()  # Detected once, then passed to STT so later turns skip language ID
+        self.deferred_language_updates = []  # Language observations of the uncommitted speculative turn
+
+        # Session metrics; turns go to the append-only metrics log, only running totals are kept here
+        self.session_start_time = time.time()
+        self.metric_totals = {"eou_delay": 0.0, "ttft": 0.0, "ttfb": 0.0, "total_latency": 0.0}
+        self.max_latency = 0.0
+        self.min_latency = None
+        self.conversation_count = 0
+        self.total_audio_duration = 0
+
+        self.logger = logging.getLogger(f"{__name__}.{session_id}")
+
+    async def process_audio_stream(self, track):
+        """Process incoming audio stream in real-time.
+        Frames are copied into one preallocated ring buffer; utterances are handed on as views of it."""
+        buffer = AudioRingBuffer(self.max_utterance_samples, self.preroll_samples)
+        vad = VoiceActivityDetector(sample_rate=self.sample_rate)
+
+        # Streaming STT: partial hypotheses are decoded while the user is still speaking
+        transcriber = StreamingTranscriber(sample_rate=self.sample_rate, language=self.language.language) if settings.STT_STREAMING else None
+        partial_task = None
+        last_partial_time = 0.0
+        partial_interval = settings.STT_PARTIAL_INTERVAL_MS / 1000
+        fed_until = 0
+
+        # Turn started on a provisional end of utterance: (task, commit event, timer)
+        speculation = None
+
+        try:
+            async for audio_frame in track.recv():
+                # View the frame bytes as samples and copy them into the ring buffer
+                audio_data = np.frombuffer(audio_frame.data, dtype=np.int16)
+                buffer.write(audio_data)
+
+                # Voice activity detection
+                event = vad.process(audio_data)
+                if event == "speech_start":
+                    self.logger.debug(f"Speech started at {vad.speech_start_time:.2f}s")
+                elif event == "speech_end":
+                    self.logger.debug(f"Speech ended at {vad.speech_end_time:.2f}s")
+
+                # Handle interruption: If user speaks during TTS playback
+                if self.is_speaking and vad.in_speech:
+                    self.interrupt()
+
+                # The user kept talking after a short pause: the speculative turn answered an unfinished utterance
+                if speculation and vad.in_speech:
+                    self.discard_speculation(speculation)
+                    speculation = None
+
+                if not vad.has_speech:
+                    # Nothing said yet: the ring buffer retains the pre-roll on its own
+                    continue
+                if buffer.utterance_start is None and transcriber and not transcriber.decodes:
+                    # The previous turn may have pinned the language after this transcriber was created
+                    transcriber.language = self.language.language
+                buffer.begin_utterance()
+
+                # Feed the streaming transcriber from speech onset, pre-roll included
+                if transcriber:
+                    transcriber.insert_audio(buffer.view(max(fed_until, buffer.utterance_start)))
+                    fed_until = buffer.written
+
+                silence_duration = vad.silence_duration()
+
+                # Re-decode the rolling window every partial_interval while speech is ongoing
+                if (transcriber and not speculation and silence_duration <= self.silence_duration_threshold
+                        and vad.stream_time - last_partial_time >= partial_interval
+                        and (partial_task is None or partial_task.done())):
+                    last_partial_time = vad.stream_time
+                    partial_task = asyncio.create_task(self.update_partial_transcript(transcriber))
+
+                # After a short pause, start STT and the LLM request on the utterance so far; TTS waits for the commit
+                if (self.speculative_pause is not None and not speculation and not self.is_processing
+                        and not vad.in_speech and self.speculative_pause <= silence_duration <= self.silence_duration_threshold):
+                    timer = TurnTimer(speech_end=now() - silence_duration)
+                    commit = asyncio.Event()
+                    task = asyncio.create_task(self.handle_utterance(
+                        buffer, buffer.utterance_start, buffer.written, transcriber, partial_task, timer, commit))
+                    speculation = (task, commit, timer)
+                    speculation_stats.started += 1
+
+                # A turn that reaches the maximum utterance length is closed as if the user had paused
+                end_of_turn = silence_duration > self.silence_duration_threshold or buffer.utterance_full
+                if end_of_turn and not self.is_processing:
+                    # The turn is timed from the last voiced frame: the observed silence is back-dated onto the monotonic clock
+                    eou_at = now()
+                    if speculation:
+                        # The pause held: release the speculative turn to speak
+                        task, commit, timer = speculation
+                        speculation = None
+                        timer.mark("eou", eou_at)
+                        commit.set()
+                        self.apply_deferred_language_updates()
+                        speculation_stats.hits += 1
+                        self.is_processing = not task.done()
+                        self.turn_task = task
+                    else:
+                        self.is_processing = True
+                        timer = TurnTimer(speech_end=eou_at - silence_duration)
+                        timer.mark("eou", eou_at)
+                        start, end = buffer.utterance_start, buffer.written
+                        self.turn_task = asyncio.create_task(self.handle_utterance(buffer, start, end, transcriber, partial_task, timer))
+
+                    buffer.end_utterance()
+                    vad.reset_utterance()
+                    if transcriber:
+                        transcriber = StreamingTranscriber(sample_rate=self.sample_rate, language=self.language.language)
+                        partial_task = None
+        finally:
+            if speculation:
+                self.discard_speculation(speculation)
+
+    def discard_speculation(self, speculation):
+        """Cancel a speculative turn and account for the work it had already done"""
+        task, _, timer = speculation
+        task.cancel()
+        # The utterance goes on, so what its first part said about the language does not count
+        self.deferred_language_updates.clear()
+        speculation_stats.misses += 1
+        speculation_stats.wasted_seconds += now() - timer.marks["speech_end"]
+        if "stt_done" in timer.marks:
+            speculation_stats.wasted_stt += 1
+        if "llm_start" in timer.marks:
+            speculation_stats.wasted_llm_requests += 1
+        self.logger.debug("Speech resumed, speculative turn discarded")
+
+    async def update_partial_transcript(self, transcriber):
+        """Decode the current window on the STT workers and log the partial hypothesis"""
+        try:
+            partial = await stt_scheduler.run_partial(transcriber.process)
+            if partial:
+                self.logger.debug(f"Partial STT: {partial}")
+        except Exception as e:
+            self.logger.error(f"Error decoding partial transcript: {e}")
+
+    async def handle_utterance(self, buffer, start, end, transcriber=None, partial_task=None, timer=None, commit=None):
+        """Run one turn as soon as a slot under the shared concurrency limit is free.
+        The utterance is read from the ring buffer in place; the buffer's headroom keeps it intact while the turn waits.
+        A speculative turn gets a commit event and does not synthesize speech until it is set."""
+        try:
+            async with self.turn_limiter:
+                if not buffer.is_valid(start):
+                    self.logger.warning("Utterance was overwritten while waiting for a turn slot, skipping it")
+                    return
+                await self.process_voice_input(buffer.view(start, end), transcriber, partial_task, timer, commit)
+        finally:
+            # Also reached when the turn is cancelled before it got a slot; a discarded speculative turn never set the flag
+            if commit is None or commit.is_set():
+                self.is_processing = False
+
+    async def process_voice_input(self, audio_data, transcriber=None, partial_task=None, timer=None, commit=None):
+        """Process voice input through STT -> LLM -> TTS pipeline.
+        With a streaming transcriber only the audio after its last committed words still has to be decoded.
+        All stages are timed on the turn's monotonic TurnTimer. With a commit event (speculative turn), STT and the LLM
+        run right away but speech is only synthesized once the event is set."""
+        try:
+            if timer is None:
+                timer = TurnTimer()
+                timer.mark("eou")
+            metrics = {"conversation_id": self.conversation_count + 1}
+
+            # Duration
+            audio_duration = len(audio_data) / self.sample_rate
+            self.total_audio_duration += audio_duration
+            metrics["audio_duration"] = round(audio_duration, 3)
+
+            # STT
+            timer.mark("stt_start")
+            transcribed_text, detected_language = await self.transcribe(audio_data, transcriber, partial_task, timer, commit)
+            timer.mark("stt_done")
+
+            if not transcribed_text.strip():
+                self.logger.info("No speech detected, skipping processing")
+                return
+
+            metrics["stt_latency"] = round(timer.span("stt"), 3)
+            metrics["transcription"] = transcribed_text
+            metrics["detected_language"] = detected_language
+
+            self.logger.info(f"STT: {transcribed_text}")
+
+            # LLM -> TTS, streamed phrase by phrase
+            timer.mark("llm_start")
+            llm_response = await self.speak_streamed_response(transcribed_text, detected_language, timer, commit)
+            timer.mark("playback_end")
+            metrics["eou_delay"] = round(timer.span("eou_delay") or 0.0, 3)
+
+            # A turn that never produced audio counts its latency up to the end of processing
+            timer.mark("first_audio", timer.marks["playback_end"])
+            metrics["ttft"] = round(timer.span("ttft") or 0.0, 3)        # LLM request to first token
+            metrics["ttfb"] = round(timer.span("ttfb") or 0.0, 3)        # First TTS request to its first audio byte
+            metrics["total_latency"] = round(timer.span("response_latency"), 3)  # End of utterance to first audio frame out
+            metrics["e2e_latency"] = round(timer.span("e2e_latency") or 0.0, 3)  # Last voiced frame to first audio frame out
+            metrics["llm_response"] = llm_response
+            latency_stats.observe_turn(timer)
+
+            self.logger.info(f"LLM: {llm_response}")
+
+            # Metrics
+            metrics["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            metrics_writer.record({"type": "turn", "session_id": self.session_id, **metrics})
+            for name in self.metric_totals:
+                self.metric_totals[name] += metrics[name]
+            self.max_latency = max(self.max_latency, metrics["total_latency"])
+            self.min_latency = metrics["total_latency"] if self.min_latency is None else min(self.min_latency, metrics["total_latency"])
+            self.conversation_count += 1
+
+            self.logger.info(f"Metrics - EOU: {metrics['eou_delay']}s, TTFT: {metrics['ttft']}s, "
+                            f"TTFB: {metrics['ttfb']}s, Total: {metrics['total_latency']}s")
+
+            if metrics['total_latency'] > 2.0:
+                self.logger.warning(f"Latency exceeded 2s: {metrics['total_latency']}s")
+
+        except Exception as e:
+            self.logger.error(f"Error processing voice input: {e}")
+        finally:
+            if commit is None or commit.is_set():
+                self.is_processing = False
+            self.last_audio_time = time.time()
+            self.logger.info("Processing complete, ready for next input")
+
+
+    async def transcribe(self, audio_data, transcriber=None, partial_task=None, timer=None, commit=None):
+        """Final transcription of one utterance, under the session's pinned language once there is one.
+        Returns (text, language)."""
+        language = self.language.language
+        if transcriber:
+            if partial_task:
+                await partial_task
+            # A speculative turn may be discarded, so it leaves the transcriber's state for the continuing utterance
+            text, detected_language = await stt_scheduler.run(transcriber.finalize, commit is None)
+            detected, probability, avg_logprob = transcriber.detected, transcriber.language_probability, transcriber.avg_logprob
+        else:
+            # The end-of-utterance delay is only measured when the turn did not come with its speech end
+            measure_eou = timer is not None and "speech_end" not in timer.marks
+            result = await stt_scheduler.transcribe(audio_data, self.sample_rate, language, measure_eou=measure_eou)
+            text, detected_language = result["text"], result["language"]
+            detected, probability, avg_logprob = language is None, result["language_probability"], result["avg_logprob"]
+            if measure_eou:
+                timer.mark("speech_end", timer.marks["eou"] - result["eou_time"])
+
+        if detected:
+            self.update_language(commit, self.language.observe_detection, detected_language, probability)
+        elif text.strip() and self.language.needs_redetect(avg_logprob):
+            # A poor decode under the pinned language usually means the speaker switched language
+            self.logger.info(f"Low-confidence decode in '{language}' (avg logprob {avg_logprob:.2f}), detecting the language again")
+            self.update_language(commit, self.language.unpin)
+            result = await stt_scheduler.transcribe(audio_data, self.sample_rate)
+            text, detected_language = result["text"], result["language"]
+            self.update_language(commit, self.language.observe_detection, detected_language, result["language_probability"])
+
+        return text, detected_language
+
+    def update_language(self, commit, update, *args):
+        """Apply a language observation of this turn now, or, while the turn is speculative, once it is committed.
+        A discarded speculative turn heard only part of an utterance, so its observations are dropped."""
+        if commit is None or commit.is_set():
+            update(*args)
+        else:
+            self.deferred_language_updates.append((update, args))
+
+    def apply_deferred_language_updates(self):
+        for update, args in self.deferred_language_updates:
+            update(*args)
+        self.deferred_language_updates.clear()
+
+    async def speak_streamed_response(self, text, language, timer, commit=None):
+        """Stream the LLM response and the TTS audio of each phrase straight to the session output.
+        Each phrase is synthesized into an in-memory frame queue as soon as it is complete, so the next
+        phrase downloads while the current one plays."""
+        phrases = []
+        queue = asyncio.Queue()
+        fetch_tasks = []
+        frame_queues = []
+
+        async def tokens():
+            async for token in self.respond(text):
+                timer.mark("llm_first_token")
+                yield token
+            timer.mark("llm_done")
+
+        async def fetch(phrase, frames):
+            try:
+                if commit is not None:
+                    await commit.wait()
+                timer.mark("tts_start")
+                async for frame in self.synthesize(phrase, language=language, sample_rate=self.sample_rate):
+                    timer.mark("tts_first_byte")
+                    await frames.put(frame)
+            finally:
+                await frames.put(None)
+
+        async def produce():
+            try:
+                async for phrase in chunk_stream(tokens()):
+                    phrases.append(phrase)
+                    frames = asyncio.Queue()
+                    task = asyncio.create_task(fetch(phrase, frames))
+                    fetch_tasks.append(task)
+                    frame_queues.append(frames)
+                    await queue.put((frames, task))
+            except Exception:
+                # A failed LLM stream fails the turn: drop the phrases still waiting to be played. A download cancelled
+                # before it started never ends its queue itself, so the end marker is added here
+                for task, frames in zip(fetch_tasks, frame_queues):
+                    task.cancel()
+                    frames.put_nowait(None)
+                raise
+            finally:
+                await queue.put(None)
+
+        async def frames_in_order():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                frames, task = item
+                while True:
+                    frame = await frames.get()
+                    if frame is None:
+                        break
+                    yield frame
+                # A download ends its queue as it finishes, so one still running here was cancelled
+                if not task.done() or task.cancelled() or task.exception() is not None:
+                    return
+
+        producer = asyncio.create_task(produce())
+        try:
+            await self.stream_audio_to_room(frames_in_order(), timer)
+        finally:
+            # The LLM stream and every TTS download are children of this turn: cancel them and wait until their
+            # HTTP streams are closed, so a cancelled turn leaves nothing running
+            children = [producer, *fetch_tasks]
+            for task in children:
+                task.cancel()
+            results = await asyncio.gather(*children, return_exceptions=True)
+
+        # Only reached when the turn itself was not cancelled: a failed LLM stream or TTS download fails the turn
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise errors[0]
+        return " ".join(phrases)
+
+    async def stream_audio_to_room(self, frames, timer=None):
+        """Play TTS audio to the session output in real time, converted to the output's format in exact 20 ms frames"""
+        playout = AudioPlayout(self.output, src_rate=self.sample_rate)
+        try:
+            self.is_speaking = True
+
+            await playout.play(
+                frames,
+                on_first_frame=(lambda: timer.mark("first_audio")) if timer is not None else None
+            )
+            if playout.frames_sent:
+                self.logger.info(f"Finished streaming TTS audio ({playout.frames_sent} frames)")
+            else:
+                self.logger.debug("No TTS audio to stream")
+            self.logger.debug(f"Playout stats: {playout.stats()}")
+
+        except Exception as e:
+            self.logger.error(f"Error streaming audio: {e}")
+
+        finally:
+            self.is_speaking = False
+
+    def interrupt(self):
+        """Barge-in: cancel the running turn's whole task tree (STT wait, LLM stream, TTS downloads, playout) and drop
+        audio already queued at the output. Returns at once; the time until the tree has unwound is recorded as barge_in_cancel."""
+        task = self.turn_task
+        if task is None or task.done() or self.cancelling:
+            return
+
+        self.logger.info("Interruption detected - cancelling the current turn")
+        self.cancelling = True
+        self.interruptions += 1
+        started = now()
+        task.cancel()
+
+        # Frames handed to the output ahead of real time would otherwise keep playing over the user
+        clear_queue = getattr(self.output, "clear_queue", None)
+        if clear_queue:
+            clear_queue()
+
+        def finished(_):
+            self.cancelling = False
+            latency = now() - started
+            latency_stats.observe("barge_in_cancel", latency)
+            metrics_writer.record({
+                "type": "interruption",
+                "session_id": self.session_id,
+                "conversation_id": self.conversation_count + 1,
+                "cancel_latency": round(latency, 4)
+            })
+            self.logger.info(f"Turn cancelled in {latency * 1000:.1f} ms")
+
+        task.add_done_callback(finished)
+
+    async def close(self):
+        """Cancel the running turn and wait until its STT, LLM and TTS work has unwound; called when the participant leaves."""
+        task = self.turn_task
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def log_session_summary(self):
+        """Append the session summary to the metrics log"""
+        if not self.conversation_count:
+            self.logger.info("No metrics to log")
+            return
+
+        session_duration = time.time() - self.session_start_time
+        averages = {name: total / self.conversation_count for name, total in self.metric_totals.items()}
+
+        metrics_writer.record({
+            "type": "session",
+            "session_id": self.session_id,
+            "session_start": datetime.fromtimestamp(self.session_start_time).strftime("%Y-%m-%d %H:%M:%S"),
+            "session_duration": round(session_duration, 3),
+            "total_conversations": self.conversation_count,
+            "total_audio_duration": round(self.total_audio_duration, 3),
+            "interruptions": self.interruptions,
+            "language": self.language.language,
+            "language_detections": self.language.detections,
+            "avg_eou_delay": round(averages["eou_delay"], 3),
+            "avg_ttft": round(averages["ttft"], 3),
+            "avg_ttfb": round(averages["ttfb"], 3),
+            "avg_total_latency": round(averages["total_latency"], 3),
+            "latency_target_met": averages["total_latency"] < 2.0,
+            "max_latency": round(self.max_latency, 3),
+            "min_latency": round(self.min_latency, 3)
+        })
+
+        self.logger.info(f"Session Summary - Duration: {session_duration:.1f}s, "
+                         f"Conversations: {self.conversation_count}, "
+                         f"Avg Latency: {averages['total_latency']:.3f}s")
@@ -0,0 +1,139 @@
+# This module implements incremental transcription: the utterance is re-decoded every few hundred milliseconds while the user is still speaking,
+# words that two consecutive hypotheses agree on are committed, and the audio behind them is dropped so end-of-utterance only has a short tail left to decode.
+
+# Import necessary libraries
+import sys
+import os
+import re
+import threading
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+import numpy as np
+from typing import List, Optional, Tuple
+
+import stt
+from stt import to_whisper_audio, WHISPER_SAMPLE_RATE
+
+# (start_seconds, end_seconds, word) in stream time
+Word = Tuple[float, float, str]
+
+def normalize_word(word: str) -> str:
+    """Compare words without case or punctuation, since Whisper often re-punctuates as context grows."""
+    return re.sub(r"[^\w']", "", word.lower())
+
+def words_to_text(words: List[Word]) -> str:
+    return "".join(word for _, _, word in words).strip()
+
+class StreamingTranscriber:
+
+    """Rolling-window transcriber with local-agreement commits.
+    insert_audio() is cheap and called from the event loop; process() and finalize() run the model and belong in a worker thread.
+    Decodes are serialized: a discarded speculative turn's finalize() may still be running when the next partial starts."""
+
+    def __init__(self, sample_rate: int = WHISPER_SAMPLE_RATE, language: Optional[str] = None,
+                 min_trim_seconds: float = 1.0, prompt_words: int = 30):
+        self.sample_rate = sample_rate
+        self.language = language
+        self.min_trim_seconds = min_trim_seconds
+        self.prompt_words = prompt_words
+
+        self.lock = threading.Lock()         # Guards the audio window, which insert_audio() touches between decodes
+        self.decode_lock = threading.Lock()  # Held across a whole decode and the hypothesis update that follows it
+        self.pending: List[np.ndarray] = []               # Audio inserted since the last decode
+        self.buffer = np.zeros(0, dtype=np.float32)       # Uncommitted audio, 16 kHz float32
+        self.buffer_offset = 0.0                          # Stream time of buffer[0]
+        self.committed: List[Word] = []
+        self.hypothesis: List[Word] = []
+        self.decodes = 0
+        self.detected = False                              # Whether the language was identified rather than given
+        self.language_probability: Optional[float] = None  # Confidence of that detection
+        self.avg_logprob: Optional[float] = None           # Of the latest decode
+
+    def insert_audio(self, audio: np.ndarray):
+        """Queue new PCM samples; they are merged into the window on the next decode."""
+        with self.lock:
+            self.pending.append(to_whisper_audio(audio, self.sample_rate))
+
+    def buffered_seconds(self) -> float:
+        with self.lock:
+            pending = sum(len(chunk) for chunk in self.pending)
+            return (len(self.buffer) + pending) / WHISPER_SAMPLE_RATE
+
+    def process(self) -> str:
+        """Re-decode the current window and return the partial transcript (committed text plus the unconfirmed tail)."""
+        with self.decode_lock:
+            words = self._decode()
+
+            # Local agreement: commit the longest prefix both the previous and the new hypothesis share
+            agreed = 0
+            for previous, current in zip(self.hypothesis, words):
+                if normalize_word(previous[2]) != normalize_word(current[2]):
+                    break
+                agreed += 1
+
+            if agreed:
+                self.committed.extend(words[:agreed])
+                self._trim(self.committed[-1][1])
+            self.hypothesis = words[agreed:]
+
+            return words_to_text(self.committed + self.hypothesis)
+
+    def finalize(self, reset: bool = True) -> Tuple[str, str]:
+        """Decode the remaining tail and return (full_transcript, language).
+        The transcriber is reset afterwards unless reset=False, which leaves it ready to continue the same utterance."""
+        with self.decode_lock:
+            words = self._decode()
+            text = words_to_text(self.committed + words)
+            language = self.language or "unknown"
+            if reset:
+                self._reset()
+            return text, language
+
+    def reset(self):
+        with self.decode_lock:
+            self._reset()
+
+    def _reset(self):
+        with self.lock:
+            self.pending.clear()
+            self.buffer = np.zeros(0, dtype=np.float32)
+            self.buffer_offset = 0.0
+        self.committed = []
+        self.hypothesis = []
+
+    def _decode(self) -> List[Word]:
+        with self.lock:
+            if self.pending:
+                self.buffer = np.concatenate([self.buffer] + self.pending)
+                self.pending.clear()
+            window, offset = self.buffer, self.buffer_offset
+
+        if not len(window):
+            return []
+
+        prompt = words_to_text(self.committed[-self.prompt_words:]) or None
+        result = stt.get_engine().transcribe(window, self.language, word_timestamps=True, prompt=prompt)
+        self.decodes += 1
+        self.avg_logprob = result.get("avg_logprob")
+
+        # Pin the language after the first decode so partials do not flip between languages mid-utterance
+        if self.language is None:
+            self.language = result["language"]
+            self.detected = True
+            self.language_probability = result["language_probability"]
+
+        # Shift to stream time and drop words whose midpoint falls in audio we already committed
+        committed_end = self.committed[-1][1] if self.committed else 0.0
+        return [
+            (offset + start, offset + end, word)
+            for start, end, word in result["words"]
+            if offset + (start + end) / 2 > committed_end
+        ]
+
+    def _trim(self, until: float):
+        """Drop committed audio from the window once enough of it has built up."""
+        with self.lock:
+            cut = int((until - self.buffer_offset) * WHISPER_SAMPLE_RATE)
+            if cut >= self.min_trim_seconds * WHISPER_SAMPLE_RATE:
+                self.buffer = self.buffer[cut:]
+                self.buffer_offset += cut / WHISPER_SAMPLE_RATE
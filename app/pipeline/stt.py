@@ -1,27 +1,314 @@
+# This module wraps the speech-to-text engines. The model is not loaded at import: get_engine() builds it on first use,
+# and warm_up() loads it and runs one inference ahead of the first turn (the agents call it in the background at startup).
+
 # Import necessary libraries
-import whisper
-from typing import Tuple, Optional
+import sys
+import os
+import time
+import logging
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+import numpy as np
+from typing import List, Tuple, Optional, Union
+from config import settings
+from vad import find_speech_end
+
+logger = logging.getLogger(__name__)
+
+# Whisper models expect 16 kHz mono float32 audio
+WHISPER_SAMPLE_RATE = 16000
+
+# Whisper encodes fixed 30 s windows, so only utterances up to that length can share a batch
+BATCH_MAX_SAMPLES = 30 * WHISPER_SAMPLE_RATE
+
+def to_whisper_audio(audio: np.ndarray, sample_rate: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """
+    Converts an int16 or float PCM buffer to the 16 kHz mono float32 array Whisper decodes.
+    Args:
+        audio: PCM samples, int16 in [-32768, 32767] or float in [-1, 1]. 2-D input is (samples, channels).
+        sample_rate: Sample rate of the input buffer.
+    Returns:
+        A contiguous float32 array at 16 kHz.
+    """
+    audio = np.asarray(audio)
+    if audio.ndim == 2:
+        audio = audio.mean(axis=1)
+
+    if audio.dtype == np.int16:
+        audio = audio.astype(np.float32) / 32768.0
+    else:
+        audio = audio.astype(np.float32, copy=False)
+
+    if sample_rate != WHISPER_SAMPLE_RATE and len(audio):
+        # Linear interpolation onto the 16 kHz time grid
+        target_length = int(round(len(audio) * WHISPER_SAMPLE_RATE / sample_rate))
+        positions = np.arange(target_length, dtype=np.float64) * (sample_rate / WHISPER_SAMPLE_RATE)
+        audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+    return np.ascontiguousarray(audio)
+
+def mean_logprob(values: List[float]) -> Optional[float]:
+    return float(np.mean(values)) if values else None
+
+class STTEngine:
+
+    """Interface shared by the speech-to-text engines."""
+
+    name = "base"
+
+    def transcribe(self, audio: Union[str, np.ndarray], language: Optional[str] = None,
+                   word_timestamps: bool = False, prompt: Optional[str] = None) -> dict:
+        """
+        Transcribes an audio file path or a 16 kHz float32 array.
+        Args:
+            word_timestamps: Also return per-word (start, end, word) tuples, in seconds from the start of the audio.
+            prompt: Optional text that preceded this audio, used as decoding context.
+        Returns:
+            {"text": str, "language": str, "language_probability": float or None, "words": list, "avg_logprob": float or None}
+            language_probability is the detection confidence (None when the language was given); avg_logprob is the
+            decoder's mean token log-probability, a transcription confidence.
+        """
+        raise NotImplementedError
+
+    def transcribe_batch(self, audios: List[np.ndarray], languages: List[Optional[str]]) -> List[dict]:
+        """
+        Transcribes several 16 kHz float32 arrays. Engines without batched decoding run them one after another.
+        Returns:
+            One result dict per input, in order.
+        """
+        return [self.transcribe(audio, language) for audio, language in zip(audios, languages)]
+
+    def load_audio(self, audio_path: str) -> np.ndarray:
+        """Decodes an audio file to a 16 kHz mono float32 array."""
+        raise NotImplementedError
+
+class WhisperEngine(STTEngine):
+
+    """openai-whisper running in PyTorch; kept as a fallback and for comparison."""
+
+    name = "whisper"
+
+    def __init__(self, model_size: str = "base"):
+        import whisper
+        self.model = whisper.load_model(model_size)
+
+    def transcribe(self, audio: Union[str, np.ndarray], language: Optional[str] = None,
+                   word_timestamps: bool = False, prompt: Optional[str] = None) -> dict:
+        options = {}
+        if language:
+            options["language"] = language
+        if word_timestamps:
+            options["word_timestamps"] = True
+        if prompt:
+            options["initial_prompt"] = prompt
+
+        result = self.model.transcribe(audio, **options)
+        words = [
+            (word["start"], word["end"], word["word"])
+            for segment in result.get("segments", [])
+            for word in segment.get("words", [])
+        ]
+        return {
+            "text": result["text"].strip(),
+            "language": result.get("language", "unknown"),
+            "language_probability": None,
+            "words": words,
+            "avg_logprob": mean_logprob([segment["avg_logprob"] for segment in result.get("segments", [])])
+        }
+
+    def load_audio(self, audio_path: str) -> np.ndarray:
+        import whisper
+        return whisper.load_audio(audio_path, sr=WHISPER_SAMPLE_RATE)
+
+class FasterWhisperEngine(STTEngine):
+
+    """faster-whisper on CTranslate2, with int8 quantized inference on CPU."""
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size: str = "base", device: str = "cpu", compute_type: str = "int8",
+                 cpu_threads: int = 0, beam_size: int = 1, num_workers: int = 1):
+        from faster_whisper import WhisperModel
+
+        if device == "cpu" and "float16" in compute_type:
+            logger.warning(f"Compute type {compute_type} is not supported on CPU, using int8")
+            compute_type = "int8"
 
-# Load the base Whisper model
-model = whisper.load_model("base")
+        # One model replica per worker thread; with a single replica, concurrent calls queue inside CTranslate2
+        self.model = WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads,
+                                  num_workers=max(num_workers, 1))
+        self.beam_size = beam_size
+
+    def transcribe(self, audio: Union[str, np.ndarray], language: Optional[str] = None,
+                   word_timestamps: bool = False, prompt: Optional[str] = None) -> dict:
+        segments, info = self.model.transcribe(
+            audio, language=language, beam_size=self.beam_size,
+            word_timestamps=word_timestamps, initial_prompt=prompt
+        )
+        # Segments are generated lazily; iterating them runs the decode
+        segments = list(segments)
+        words = [
+            (word.start, word.end, word.word)
+            for segment in segments
+            for word in (segment.words or [])
+        ]
+        return {
+            "text": "".join(segment.text for segment in segments).strip(),
+            "language": info.language,
+            "language_probability": None if language else info.language_probability,
+            "words": words,
+            "avg_logprob": mean_logprob([segment.avg_logprob for segment in segments])
+        }
+
+    def transcribe_batch(self, audios: List[np.ndarray], languages: List[Optional[str]]) -> List[dict]:
+        """Encodes and decodes utterances of up to 30 s as one CTranslate2 batch; longer audio goes through transcribe()."""
+        if len(audios) == 1 or any(len(audio) > BATCH_MAX_SAMPLES for audio in audios):
+            return super().transcribe_batch(audios, languages)
+
+        try:
+            return self._decode_batch(audios, languages)
+        except Exception as e:
+            logger.warning(f"Batched decode failed, transcribing one by one: {e}")
+            return super().transcribe_batch(audios, languages)
+
+    def _decode_batch(self, audios: List[np.ndarray], languages: List[Optional[str]]) -> List[dict]:
+        from faster_whisper.audio import pad_or_trim
+        from faster_whisper.tokenizer import Tokenizer
+
+        features = np.stack([pad_or_trim(self.model.feature_extractor(audio)) for audio in audios])
+        encoder_output = self.model.encode(features)
+        multilingual = self.model.model.is_multilingual
+
+        # Detect the language only for the items that did not come with one
+        probabilities = [None] * len(audios)
+        if multilingual and any(language is None for language in languages):
+            detected = self.model.model.detect_language(encoder_output)
+            languages = list(languages)
+            for index, language in enumerate(languages):
+                if language is None:
+                    token, probability = detected[index][0]
+                    languages[index] = token[2:-2]
+                    probabilities[index] = probability
+
+        tokenizers = [
+            Tokenizer(self.model.hf_tokenizer, multilingual, task="transcribe", language=language or "en")
+            for language in languages
+        ]
+        prompts = [list(tokenizer.sot_sequence) + [tokenizer.no_timestamps] for tokenizer in tokenizers]
+
+        results = self.model.model.generate(
+            encoder_output, prompts,
+            beam_size=self.beam_size, max_length=448, suppress_blank=True, suppress_tokens=[-1], return_scores=True
+        )
+
+        return [
+            {
+                "text": tokenizer.decode([token for token in result.sequences_ids[0] if token < tokenizer.eot]).strip(),
+                "language": language or "en",
+                "language_probability": probability,
+                "words": [],
+                # With the default length penalty the score is the mean token log-probability
+                "avg_logprob": result.scores[0] if result.scores else None
+            }
+            for result, tokenizer, language, probability in zip(results, tokenizers, languages, probabilities)
+        ]
+
+    def load_audio(self, audio_path: str) -> np.ndarray:
+        from faster_whisper import decode_audio
+        return decode_audio(audio_path, sampling_rate=WHISPER_SAMPLE_RATE)
+
+def create_engine(name: Optional[str] = None) -> STTEngine:
+    """
+    Builds the configured STT engine, falling back to openai-whisper if faster-whisper is unavailable.
+    Args:
+        name: "faster-whisper" or "whisper"; defaults to settings.STT_ENGINE.
+    """
+    name = name or settings.STT_ENGINE
+
+    if name == FasterWhisperEngine.name:
+        try:
+            return FasterWhisperEngine(
+                model_size=settings.STT_MODEL_SIZE,
+                device=settings.STT_DEVICE,
+                compute_type=settings.STT_COMPUTE_TYPE,
+                cpu_threads=settings.STT_CPU_THREADS,
+                beam_size=settings.STT_BEAM_SIZE,
+                num_workers=settings.STT_WORKERS
+            )
+        except ImportError:
+            logger.warning("faster-whisper is not installed, falling back to openai-whisper")
+    elif name != WhisperEngine.name:
+        raise ValueError(f"Unknown STT engine: {name}")
+
+    return WhisperEngine(settings.STT_MODEL_SIZE)
+
+# The configured STT engine, created on first use
+_engine: Optional[STTEngine] = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> STTEngine:
+    """The process-wide STT engine; the first call loads the model."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine()
+    return _engine
+
+def __getattr__(name: str):
+    # Keeps stt.engine working for existing callers without loading the model at import
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def warm_up(seconds: float = 1.0) -> float:
+    """
+    Loads the engine and decodes a short silent buffer, so the first real turn does not pay for model loading
+    or the backend's lazy initialisation.
+    Returns:
+        Seconds taken.
+    """
+    start = time.perf_counter()
+    get_engine().transcribe(np.zeros(int(WHISPER_SAMPLE_RATE * seconds), dtype=np.float32), "en")
+    elapsed = time.perf_counter() - start
+    logger.info(f"STT engine warm in {elapsed:.2f}s")
+    return elapsed
+
+def measure_eou_time(audio: np.ndarray) -> float:
+    """
+    Measures the end-of-utterance delay of a 16 kHz buffer: the seconds of audio after the VAD-detected end of speech.
+    Returns 0.0 when no speech is detected.
+    """
+    speech_end = find_speech_end(audio, WHISPER_SAMPLE_RATE)
+    if speech_end is None:
+        return 0.0
+    return max(len(audio) / WHISPER_SAMPLE_RATE - speech_end, 0.0)
 
 def transcribe_audio(audio_path: str, language: Optional[str] = None) -> Tuple[str, float, str]:
     """
-    Transcribes the given audio file using Whisper.
+    Transcribes the given audio file using the configured STT engine.
     Args:
         audio_path: Path to audio file.
         language: Optional ISO language code (e.g., 'en', 'fr', 'hi').
     Returns:
-        (transcribed_text, fake_eou_time, detected_language)
+        (transcribed_text, eou_time, detected_language), where eou_time is the trailing audio after the detected end of speech
     """
-    options = {}
-    if language:
-        options["language"] = language
+    # Decode once and reuse the array for both VAD and transcription
+    return transcribe_pcm(get_engine().load_audio(audio_path), WHISPER_SAMPLE_RATE, language)
 
-    result = model.transcribe(audio_path, **options)
-    text = result["text"].strip()
-    detected_language = result.get("language", "unknown")
-
-    fake_eou_time = 0.0  # You can improve later with real timestamps
+def transcribe_pcm(audio: np.ndarray, sample_rate: int = WHISPER_SAMPLE_RATE, language: Optional[str] = None) -> Tuple[str, float, str]:
+    """
+    Transcribes an in-memory PCM buffer, without temp files or an ffmpeg subprocess.
+    Args:
+        audio: int16 or float32 PCM samples.
+        sample_rate: Sample rate of the buffer (resampled to 16 kHz if needed).
+        language: Optional ISO language code (e.g., 'en', 'fr', 'hi').
+    Returns:
+        (transcribed_text, eou_time, detected_language), where eou_time is the trailing audio after the detected end of speech
+    """
+    audio = to_whisper_audio(audio, sample_rate)
+    result = get_engine().transcribe(audio, language)
 
-    return text, fake_eou_time, detected_language
+    return result["text"], measure_eou_time(audio), result["language"]
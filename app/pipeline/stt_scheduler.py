@@ -0,0 +1,195 @@
+# This module schedules STT work from every session onto a small, fixed pool of model threads.
+# Final transcriptions that arrive within a short window are decoded as one batch; streaming partial decodes share the same workers at lower priority.
+# Only whole-utterance finals (STT_STREAMING=false, the re-detect pass, transcribe_pcm) are batched. A streaming session
+# finalizes through its own transcriber, which decodes with word timestamps and the committed text as prompt, so those
+# finals run as single calls; they are short tails, since most of the utterance was decoded while the user spoke.
+
+# Import necessary libraries
+import sys
+import os
+import time
+import asyncio
+import itertools
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+import numpy as np
+from typing import Callable, Optional, Tuple
+from config import settings
+
+import stt
+from stt import to_whisper_audio, measure_eou_time, WHISPER_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first
+PRIORITY_FINAL = 0
+PRIORITY_PARTIAL = 1
+
+class STTScheduler:
+
+    """Bounded priority queue in front of the STT engine.
+    Final transcriptions are micro-batched; other jobs (streaming partial/finalize decodes) run one at a time on the same workers."""
+
+    def __init__(self, batch_window_ms: int = None, max_batch_size: int = None, max_queue: int = None, workers: int = None):
+        self.batch_window = (settings.STT_BATCH_WINDOW_MS if batch_window_ms is None else batch_window_ms) / 1000
+        self.max_batch_size = settings.STT_MAX_BATCH_SIZE if max_batch_size is None else max_batch_size
+        self.max_queue = settings.STT_QUEUE_SIZE if max_queue is None else max_queue
+        self.workers = settings.STT_WORKERS if workers is None else workers
+
+        self.queue: Optional[asyncio.PriorityQueue] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.worker_tasks = []
+        self.sequence = itertools.count()
+
+        # Stats
+        self.submitted = 0
+        self.dropped = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.max_queue_depth = 0
+        self.wait_times = deque(maxlen=1000)
+
+    def _ensure_started(self):
+        if self.queue is None:
+            self.queue = asyncio.PriorityQueue(maxsize=self.max_queue)
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="stt")
+            self.worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _submit(self, priority: int, kind: str, payload, wait: bool = True):
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        item = (priority, next(self.sequence), kind, payload, time.monotonic(), future)
+
+        if wait:
+            # Blocks when the queue is full, pushing back on new turns instead of piling up threads
+            await self.queue.put(item)
+        else:
+            self.queue.put_nowait(item)
+
+        self.submitted += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        return await future
+
+    async def transcribe_pcm(self, audio: np.ndarray, sample_rate: int = WHISPER_SAMPLE_RATE, language: Optional[str] = None) -> Tuple[str, float, str]:
+        """Queued, batchable equivalent of stt.transcribe_pcm."""
+        result = await self.transcribe(audio, sample_rate, language, measure_eou=True)
+        return result["text"], result["eou_time"], result["language"]
+
+    async def transcribe(self, audio: np.ndarray, sample_rate: int = WHISPER_SAMPLE_RATE, language: Optional[str] = None,
+                         measure_eou: bool = False) -> dict:
+        """Like transcribe_pcm, returning the engine's full result (with its confidences).
+        With measure_eou the result also has "eou_time"; the VAD pass runs on a thread while the audio waits for its batch."""
+        audio = to_whisper_audio(audio, sample_rate)
+        if not measure_eou:
+            return await self._submit(PRIORITY_FINAL, "transcribe", (audio, language))
+        result, eou_time = await asyncio.gather(
+            self._submit(PRIORITY_FINAL, "transcribe", (audio, language)),
+            asyncio.to_thread(measure_eou_time, audio)
+        )
+        return {**result, "eou_time": eou_time}
+
+    async def run(self, func: Callable, *args, priority: int = PRIORITY_FINAL):
+        """Run an arbitrary model call (e.g. a streaming transcriber decode) on the STT workers."""
+        return await self._submit(priority, "call", (func, args))
+
+    async def run_partial(self, func: Callable, *args):
+        """Like run(), at low priority; skipped (returns None) when the queue is full, since a later partial supersedes it."""
+        try:
+            return await self._submit(PRIORITY_PARTIAL, "call", (func, args), wait=False)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return None
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.queue.get()
+            batch = [item]
+
+            # Give other sessions a short window to join a batch of final transcriptions
+            if item[2] == "transcribe":
+                deadline = loop.time() + self.batch_window
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+
+            # Anything that is not batchable is run separately after the batch
+            transcribe_items = [entry for entry in batch if entry[2] == "transcribe"]
+            call_items = [entry for entry in batch if entry[2] == "call"]
+
+            now = time.monotonic()
+            for entry in batch:
+                self.wait_times.append(now - entry[4])
+
+            if transcribe_items:
+                await self._run_batch(loop, transcribe_items)
+            for entry in call_items:
+                await self._run_call(loop, entry)
+
+            for _ in batch:
+                self.queue.task_done()
+
+    async def _run_batch(self, loop, items):
+        audios = [entry[3][0] for entry in items]
+        languages = [entry[3][1] for entry in items]
+        self.batches += 1
+        self.batched_items += len(items)
+
+        try:
+            results = await loop.run_in_executor(self.executor, stt.get_engine().transcribe_batch, audios, languages)
+        except Exception as e:
+            for entry in items:
+                if not entry[5].done():
+                    entry[5].set_exception(e)
+            return
+
+        for entry, result in zip(items, results):
+            if not entry[5].done():
+                entry[5].set_result(result)
+
+    async def _run_call(self, loop, entry):
+        func, args = entry[3]
+        future = entry[5]
+        if future.cancelled():
+            return
+        try:
+            result = await loop.run_in_executor(self.executor, func, *args)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        """Queue depth, wait-time percentiles and batching efficiency."""
+        waits = np.array(self.wait_times) if self.wait_times else np.zeros(1)
+        return {
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "submitted": self.submitted,
+            "dropped_partials": self.dropped,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_items / self.batches, 2) if self.batches else 0.0,
+            "wait_p50_ms": round(float(np.percentile(waits, 50)) * 1000, 1),
+            "wait_p95_ms": round(float(np.percentile(waits, 95)) * 1000, 1),
+        }
+
+    async def aclose(self):
+        for task in self.worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self.worker_tasks, return_exceptions=True)
+        if self.executor:
+            self.executor.shutdown(wait=False)
+        self.queue, self.executor, self.worker_tasks = None, None, []
+
+stt_scheduler = STTScheduler()
@@ -1,39 +1,50 @@
 # This module provides text-to-speech functionality using the ElevenLabs API.
 # Import necessary libraries
-import httpx
 import uuid
 import os
 import sys
 from pathlib import Path
+from typing import AsyncIterator
 
 # Add the project root to Python path
 project_root = Path(__file__).parent.parent.parent
 sys.path.append(str(project_root))
+sys.path.append(str(Path(__file__).parent))
 from app.config import settings
+from http_client import http_clients
 
 # Define the ElevenLabs API key and voice ID
 # Ensure you have the ElevenLabs API key set in your environment or config
 ELEVENLABS_API_KEY = settings.ELEVENLABS_API_KEY #"sk_2ded8236624072a34c94c5b6aeec710da4994820994bb742"
-ELEVENLABS_VOICE_ID = "21m00Tcm4TlvDq8ikWAM"  # premade "Rachel"
+ELEVENLABS_VOICE_ID = settings.ELEVENLABS_VOICE_ID  # Used for languages without a configured voice
+ELEVENLABS_API_URL = settings.ELEVENLABS_API_URL.rstrip("/")
 
-# Map language codes (ISO 639-1) to ElevenLabs voice IDs (add more as needed)
-VOICE_MAP = {
-    "en": "21m00Tcm4TlvDq8ikWAM",  # Rachel (English)
-    "es": "EXAMPLE_VOICE_ID_ES",    # Spanish voice (replace with actual)
-    "fr": "EXAMPLE_VOICE_ID_FR",    # French voice
-    # Add more languages and their voice IDs here
-}
+# Map language codes (ISO 639-1) to ElevenLabs voice IDs; configured with ELEVENLABS_VOICE_ID_<LANG>
+VOICE_MAP = settings.ELEVENLABS_VOICE_MAP
 
-async def text_to_speech(text: str, language: str = "en", output_path: str = None) -> str:
+# Requests reuse the process-wide keep-alive pool; the base URL is touched during warm-up
+http_clients.register("elevenlabs", f"{ELEVENLABS_API_URL}/")
 
-    """ Function to convert text to speech using ElevenLabs API.    """
+# Raw PCM formats offered by the ElevenLabs streaming endpoint
+PCM_SAMPLE_RATES = (16000, 22050, 24000, 44100)
 
-    # Validate input parameters
-    output_path = output_path or f"tts_output_{uuid.uuid4().hex[:6]}.mp3"
-    voice_id = VOICE_MAP.get(language, VOICE_MAP["en"])
+def voice_for(language: str) -> str:
+
+    """ The configured voice for a language; placeholder entries fall back to the default voice."""
+
+    voice_id = VOICE_MAP.get(language)
+    if not voice_id or voice_id.startswith("EXAMPLE_"):
+        return ELEVENLABS_VOICE_ID
+    return voice_id
+
+def build_request(text: str, language: str = "en"):
+
+    """ Build the URL, headers and payload for an ElevenLabs text-to-speech request."""
 
-    # Construct the API request URL and headers
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{ELEVENLABS_VOICE_ID}"
+    voice_id = voice_for(language)
+
+    # Construct the API request URL and headers; the voice is selected by the URL
+    url = f"{ELEVENLABS_API_URL}/v1/text-to-speech/{voice_id}"
     headers = {
         "xi-api-key": ELEVENLABS_API_KEY,
         "Content-Type": "application/json"
@@ -46,21 +57,62 @@ async def text_to_speech(text: str, language: str = "en", output_path: str = Non
     payload = {
         "text": text,
         "model_id": model_id,
-        "voice_id": voice_id,
         "voice_settings": {
             "stability": 0.75,
             "similarity_boost": 0.75
         }
     }
 
-    timeout = httpx.Timeout(30.0)
+    return url, headers, payload
+
+async def text_to_speech(text: str, language: str = "en", output_path: str = None, timer=None) -> str:
+
+    """ Function to convert text to speech using ElevenLabs API.
+    The response body is written as it arrives; an optional latency.TurnTimer gets tts_start and tts_first_byte marks."""
+
+    # Validate input parameters
+    output_path = output_path or f"tts_output_{uuid.uuid4().hex[:6]}.mp3"
+    url, headers, payload = build_request(text, language)
 
     # Make the API request to convert text to speech
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.post(url, json=payload, headers=headers)
+    client = http_clients.get("elevenlabs")
+    if timer is not None:
+        timer.mark("tts_start")
+    async with client.stream("POST", url, json=payload, headers=headers) as response:
         response.raise_for_status()
 
         with open(output_path, "wb") as f:
-            f.write(response.content)
+            async for chunk in response.aiter_bytes():
+                if timer is not None:
+                    timer.mark("tts_first_byte")
+                f.write(chunk)
 
     return output_path
+
+async def stream_speech(text: str, language: str = "en", sample_rate: int = 16000, frame_ms: int = 20) -> AsyncIterator[bytes]:
+
+    """ Stream synthesized speech as raw 16-bit mono PCM frames of exactly frame_ms, yielded as soon as the bytes arrive.
+    Nothing is written to disk and playback can start on the first frame."""
+
+    if sample_rate not in PCM_SAMPLE_RATES:
+        raise ValueError(f"Unsupported PCM sample rate {sample_rate}, expected one of {PCM_SAMPLE_RATES}")
+
+    url, headers, payload = build_request(text, language)
+    params = {"output_format": f"pcm_{sample_rate}"}
+    frame_bytes = sample_rate * frame_ms // 1000 * 2
+
+    pending = bytearray()
+
+    client = http_clients.get("elevenlabs")
+    async with client.stream("POST", f"{url}/stream", params=params, json=payload, headers=headers) as response:
+        response.raise_for_status()
+
+        async for chunk in response.aiter_bytes():
+            pending.extend(chunk)
+            while len(pending) >= frame_bytes:
+                yield bytes(pending[:frame_bytes])
+                del pending[:frame_bytes]
+
+    # Pad the final partial frame with silence so every frame has the same duration
+    if pending:
+        yield bytes(pending) + bytes(frame_bytes - len(pending))
@@ -0,0 +1,240 @@
+# This module caches synthesized speech so repeated phrases (greetings, "one moment", error prompts, common answers) skip the ElevenLabs round trip.
+# Entries are content-addressed by normalized text, voice, model, voice settings and output format. Decoded PCM frames live in an in-memory LRU,
+# backed by a size-bounded directory on disk.
+
+# Import necessary libraries
+import sys
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from typing import AsyncIterator, Iterable, List, Optional
+from config import settings
+from tts import build_request, stream_speech
+
+logger = logging.getLogger(__name__)
+
+FRAME_MS = 20
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalize and collapse whitespace; case and punctuation are kept since they change the delivery."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+def make_key(text: str, voice_id: str, model_id: str, voice_settings: dict, output_format: str) -> str:
+    """Content address of one synthesized phrase."""
+    material = json.dumps(
+        [normalize_text(text), voice_id, model_id, voice_settings, output_format],
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class TTSCache:
+
+    """Two-tier cache of PCM frames: in-memory LRU first, then a size-bounded disk directory evicted least-recently-used first."""
+
+    def __init__(self, memory_bytes: int = None, disk_dir: str = None, disk_bytes: int = None):
+        self.memory_limit = settings.TTS_CACHE_MEMORY_MB * 1024 * 1024 if memory_bytes is None else memory_bytes
+        self.disk_limit = settings.TTS_CACHE_DISK_MB * 1024 * 1024 if disk_bytes is None else disk_bytes
+        self.disk_dir = Path(settings.TTS_CACHE_DIR if disk_dir is None else disk_dir)
+
+        # Disk reads and writes run in worker threads: the memory tier and the counters are guarded by a lock,
+        # and the disk tier by its own so a slow write never holds up a memory lookup on the event loop
+        self.lock = threading.Lock()
+        self.disk_lock = threading.Lock()
+        self.memory: "OrderedDict[str, List[bytes]]" = OrderedDict()
+        self.memory_size = 0
+        self.disk_size: Optional[int] = None  # Scanned lazily on first write
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.pcm"
+
+    def get_from_memory(self, key: str) -> Optional[List[bytes]]:
+        """Memory-tier lookup only; cheap enough to call from the event loop."""
+        with self.lock:
+            frames = self.memory.get(key)
+            if frames is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+            return frames
+
+    def get(self, key: str, frame_bytes: int) -> Optional[List[bytes]]:
+        """Return the cached frames for a key, promoting disk hits into memory."""
+        frames = self.get_from_memory(key)
+        if frames is not None:
+            return frames
+
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # Mark as recently used for disk eviction
+        except OSError:
+            with self.lock:
+                self.misses += 1
+            return None
+
+        frames = [data[i:i + frame_bytes] for i in range(0, len(data), frame_bytes)]
+        self._remember(key, frames)
+        with self.lock:
+            self.hits += 1
+            self.disk_hits += 1
+        return frames
+
+    def put(self, key: str, frames: List[bytes]):
+        """Store frames in both tiers."""
+        self._remember(key, frames)
+
+        path = self._path(key)
+        data = b"".join(frames)
+        try:
+            with self.disk_lock:
+                if self.disk_size is None:
+                    self.disk_size = sum(p.stat().st_size for p in self.disk_dir.glob("*/*.pcm"))
+                path.parent.mkdir(parents=True, exist_ok=True)
+                previous = path.stat().st_size if path.exists() else 0
+                tmp_path = path.with_suffix(".tmp")
+                tmp_path.write_bytes(data)
+                tmp_path.replace(path)
+                self.disk_size += len(data) - previous
+                self._evict_disk()
+        except OSError as e:
+            logger.warning(f"Failed to write TTS cache entry: {e}")
+
+    def _remember(self, key: str, frames: List[bytes]):
+        size = sum(len(frame) for frame in frames)
+        if size > self.memory_limit:
+            return
+
+        with self.lock:
+            old = self.memory.pop(key, None)
+            if old is not None:
+                self.memory_size -= sum(len(frame) for frame in old)
+
+            self.memory[key] = frames
+            self.memory_size += size
+
+            while self.memory_size > self.memory_limit:
+                _, evicted = self.memory.popitem(last=False)
+                self.memory_size -= sum(len(frame) for frame in evicted)
+
+    def _evict_disk(self):
+        """Delete least-recently-used files until the directory is within its budget; called with disk_lock held."""
+        if self.disk_size <= self.disk_limit:
+            return
+
+        entries = sorted(
+            (p.stat().st_mtime, p.stat().st_size, p) for p in self.disk_dir.glob("*/*.pcm")
+        )
+        for _, size, path in entries:
+            if self.disk_size <= self.disk_limit:
+                break
+            try:
+                path.unlink()
+                self.disk_size -= size
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory_size,
+            "disk_bytes": self.disk_size or 0
+        }
+
+tts_cache = TTSCache()
+
+def cache_key_for(text: str, language: str, sample_rate: int) -> str:
+    url, _, payload = build_request(text, language)
+    voice_id = url.rstrip("/").rsplit("/", 1)[-1]
+    return make_key(text, voice_id, payload["model_id"], payload["voice_settings"], f"pcm_{sample_rate}")
+
+async def stream_speech_cached(text: str, language: str = "en", sample_rate: int = 16000) -> AsyncIterator[bytes]:
+
+    """ Same frames as tts.stream_speech, served from the cache when possible.
+    On a miss the frames are streamed through as they arrive and stored once the phrase completes."""
+
+    cacheable = settings.TTS_CACHE_ENABLED and len(text) <= settings.TTS_CACHE_MAX_TEXT_CHARS
+    if not cacheable:
+        async for frame in stream_speech(text, language=language, sample_rate=sample_rate):
+            yield frame
+        return
+
+    key = cache_key_for(text, language, sample_rate)
+    frame_bytes = sample_rate * FRAME_MS // 1000 * 2
+
+    frames = tts_cache.get_from_memory(key)
+    if frames is None:
+        frames = await asyncio.to_thread(tts_cache.get, key, frame_bytes)
+
+    if frames is not None:
+        for frame in frames:
+            yield frame
+        return
+
+    collected = []
+    async for frame in stream_speech(text, language=language, sample_rate=sample_rate):
+        collected.append(frame)
+        yield frame
+
+    # Only complete phrases reach this point; interrupted streams are never cached
+    await asyncio.to_thread(tts_cache.put, key, collected)
+
+async def prewarm(phrases: Iterable[str], language: str = "en", sample_rate: int = 16000) -> int:
+
+    """ Synthesize and cache every phrase that is not cached yet. Returns the number of phrases synthesized."""
+
+    synthesized = 0
+
+    for phrase in phrases:
+        phrase = normalize_text(phrase)
+        if not phrase:
+            continue
+
+        misses = tts_cache.misses
+        try:
+            async for _ in stream_speech_cached(phrase, language=language, sample_rate=sample_rate):
+                pass
+        except Exception as e:
+            logger.warning(f"Failed to pre-warm TTS phrase '{phrase}': {e}")
+            continue
+        synthesized += tts_cache.misses - misses
+
+    logger.info(f"TTS cache pre-warmed: {synthesized} phrase(s) synthesized")
+    return synthesized
+
+def configured_phrases() -> List[str]:
+    """Phrases listed in TTS_PREWARM_PHRASES, separated by '|'."""
+    return [phrase.strip() for phrase in settings.TTS_PREWARM_PHRASES.split("|") if phrase.strip()]
+
+if __name__ == "__main__":
+    # Pre-warm command: python app/pipeline/tts_cache.py [language] [phrases file, one phrase per line]
+    from http_client import http_clients
+
+    language_arg = sys.argv[1] if len(sys.argv) > 1 else "en"
+    if len(sys.argv) > 2:
+        phrase_list = Path(sys.argv[2]).read_text(encoding="utf-8").splitlines()
+    else:
+        phrase_list = configured_phrases()
+
+    async def main():
+        try:
+            await prewarm(phrase_list, language=language_arg)
+        finally:
+            await http_clients.aclose()
+        print(tts_cache.stats())
+
+    asyncio.run(main())
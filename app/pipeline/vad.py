@@ -0,0 +1,167 @@
+# This module provides voice activity detection for 16-bit PCM audio.
+# Each frame is classified with vectorized energy and spectral features against an adaptive noise floor, and speech start/end timestamps are reported in stream time
+# so end-of-utterance delay can be measured instead of guessed.
+
+# Import necessary libraries
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from typing import List, Optional, Tuple
+from config import settings
+
+# Speech energy is concentrated in the telephone band
+SPEECH_BAND_HZ = (300.0, 3400.0)
+EPSILON = 1e-10
+
+def frame_features(frames: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Computes per-frame features for a 2-D block of frames in one vectorized pass.
+    Args:
+        frames: (n_frames, frame_length) int16 or float array.
+        sample_rate: Sample rate of the audio.
+    Returns:
+        (energy_dbfs, speech_band_ratio, spectral_flatness), each of shape (n_frames,)
+    """
+    x = frames.astype(np.float32)
+    if frames.dtype == np.int16:
+        x /= 32768.0
+
+    energy_db = 10.0 * np.log10(np.mean(x * x, axis=1) + EPSILON)
+
+    window = np.hanning(x.shape[1]).astype(np.float32)
+    power = np.abs(np.fft.rfft(x * window, axis=1)) ** 2 + EPSILON
+    freqs = np.fft.rfftfreq(x.shape[1], d=1.0 / sample_rate)
+    band = (freqs >= SPEECH_BAND_HZ[0]) & (freqs <= SPEECH_BAND_HZ[1])
+
+    band_ratio = power[:, band].sum(axis=1) / power.sum(axis=1)
+    # Geometric over arithmetic mean: close to 1 for noise, low for harmonic speech
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+
+    return energy_db, band_ratio, flatness
+
+class VoiceActivityDetector:
+
+    """Streaming VAD with adaptive noise floor, onset confirmation and hangover.
+    Timestamps are in seconds of audio processed (stream time), so they do not depend on when frames happen to arrive."""
+
+    def __init__(self, sample_rate: int = 16000, threshold_db: float = None, min_energy_dbfs: float = None,
+                 hangover_ms: int = None, min_speech_ms: int = None, noise_adapt_rate: float = 0.05):
+        self.sample_rate = sample_rate
+        self.threshold_db = settings.VAD_THRESHOLD_DB if threshold_db is None else threshold_db
+        self.min_energy_dbfs = settings.VAD_MIN_ENERGY_DBFS if min_energy_dbfs is None else min_energy_dbfs
+        self.hangover = (settings.VAD_HANGOVER_MS if hangover_ms is None else hangover_ms) / 1000
+        self.min_speech = (settings.VAD_MIN_SPEECH_MS if min_speech_ms is None else min_speech_ms) / 1000
+        self.noise_adapt_rate = noise_adapt_rate
+
+        self.noise_floor_db: Optional[float] = None
+        self.stream_time = 0.0
+        self.reset_utterance()
+
+    def reset_utterance(self):
+        """Forget the current utterance but keep the learned noise floor."""
+        self.in_speech = False
+        self.has_speech = False
+        self.onset_time: Optional[float] = None
+        self.speech_start_time: Optional[float] = None
+        self.speech_end_time: Optional[float] = None
+
+    def is_voiced(self, energy_db: float, band_ratio: float, flatness: float) -> bool:
+        """Classify one frame from its features and update the noise floor on non-speech frames."""
+        if self.noise_floor_db is None:
+            self.noise_floor_db = energy_db
+
+        voiced = (
+            energy_db > self.noise_floor_db + self.threshold_db
+            and energy_db > self.min_energy_dbfs
+            and (band_ratio > 0.4 or flatness < 0.3)
+        )
+
+        if not voiced:
+            # Follow drops in the floor quickly and rises slowly, so speech does not drag it up
+            rate = 0.5 if energy_db < self.noise_floor_db else self.noise_adapt_rate
+            self.noise_floor_db += rate * (energy_db - self.noise_floor_db)
+
+        return voiced
+
+    def process(self, frame: np.ndarray) -> Optional[str]:
+        """
+        Feeds one frame of PCM audio.
+        Returns:
+            "speech_start" or "speech_end" when the state changes, otherwise None.
+        """
+        frame = np.asarray(frame)
+        if not len(frame):
+            return None
+
+        energy_db, band_ratio, flatness = frame_features(frame.reshape(1, -1), self.sample_rate)
+        voiced = self.is_voiced(float(energy_db[0]), float(band_ratio[0]), float(flatness[0]))
+        return self.advance(voiced, len(frame) / self.sample_rate)
+
+    def advance(self, voiced: bool, duration: float) -> Optional[str]:
+        """Moves stream time forward by one classified frame and updates the speech state."""
+        frame_start = self.stream_time
+        self.stream_time += duration
+
+        if voiced:
+            self.speech_end_time = self.stream_time
+            if self.onset_time is None:
+                self.onset_time = frame_start
+
+            # Confirm speech only after min_speech of voiced audio, so clicks do not open an utterance
+            if not self.in_speech and self.stream_time - self.onset_time >= self.min_speech:
+                self.in_speech = True
+                self.has_speech = True
+                self.speech_start_time = self.onset_time
+                return "speech_start"
+            return None
+
+        if not self.in_speech:
+            self.onset_time = None
+        elif self.stream_time - self.speech_end_time >= self.hangover:
+            self.in_speech = False
+            self.onset_time = None
+            return "speech_end"
+
+        return None
+
+    def silence_duration(self) -> float:
+        """Seconds of audio received since the last voiced frame of the current utterance."""
+        if self.speech_end_time is None:
+            return 0.0
+        return self.stream_time - self.speech_end_time
+
+def detect_speech_segments(audio: np.ndarray, sample_rate: int = 16000, frame_ms: int = 20) -> List[Tuple[float, float]]:
+    """
+    Runs the detector over a whole buffer, computing all frame features in one vectorized pass.
+    Returns:
+        List of (speech_start, speech_end) times in seconds.
+    """
+    audio = np.asarray(audio)
+    frame_length = sample_rate * frame_ms // 1000
+    n_frames = len(audio) // frame_length
+    if not n_frames:
+        return []
+
+    frames = audio[:n_frames * frame_length].reshape(n_frames, frame_length)
+    features = np.stack(frame_features(frames, sample_rate), axis=1)
+
+    vad = VoiceActivityDetector(sample_rate=sample_rate)
+    segments = []
+    frame_seconds = frame_length / sample_rate
+
+    for energy_db, band_ratio, flatness in features:
+        event = vad.advance(vad.is_voiced(energy_db, band_ratio, flatness), frame_seconds)
+        if event == "speech_end":
+            segments.append((vad.speech_start_time, vad.speech_end_time))
+
+    if vad.in_speech:
+        segments.append((vad.speech_start_time, vad.speech_end_time))
+
+    return segments
+
+def find_speech_end(audio: np.ndarray, sample_rate: int = 16000) -> Optional[float]:
+    """Returns the time in seconds at which the last speech segment in the buffer ends, or None if there is no speech."""
+    segments = detect_speech_segments(audio, sample_rate)
+    return segments[-1][1] if segments else None
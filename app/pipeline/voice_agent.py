@@ -1,121 +1,193 @@
 # This module implements a voice agent pipeline that processes audio input, transcribes it, generates a response using an LLM, and converts the response to speech using TTS. It also measures various latencies in the process.
 
 # Import necessary libraries
-import time
 import asyncio
 import sys
 from pathlib import Path
 
-import pandas as pd
-from datetime import datetime
-import os
-
 # Add the project root to Python path
 project_root = Path(__file__).parent.parent.parent
 sys.path.append(str(project_root))
 
 # Import pipeline components
 from stt import transcribe_audio
-from llm import generate_response
+from llm import generate_response, stream_response
 from tts import text_to_speech
+from chunker import chunk_stream
+from http_client import http_clients
+from metrics_sink import metrics_writer
+from latency import TurnTimer, latency_stats
 
-def log_metrics_to_excel(log_path: str, transcript: str, response: str, detected_language: str, metrics: dict):
-    
-    """ Log metrics to an Excel file with retry logic for writing."""
-
-    log_data = {
-        "Timestamp": [datetime.now().strftime("%Y-%m-%d %H:%M:%S")],
-        "Transcript": [transcript],
-        "Response": [response],
-        "Detected Language": [detected_language],
-        "EOU Delay (s)": [metrics.get("EOU Delay")],
-        "TTFT (s)": [metrics.get("TTFT")],
-        "TTFB (s)": [metrics.get("TTFB")],
-        "Total Latency (s)": [metrics.get("Total Latency")]
-    }
+def log_metrics(transcript: str, response: str, detected_language: str, metrics: dict, session_id: str = "cli"):
 
-    df_new = pd.DataFrame(log_data)
+    """ Append one turn to the metrics log. The write happens on a background thread, so this returns immediately.
+    Run `python app/pipeline/metrics_sink.py export` for the Excel summary."""
+
+    metrics_writer.record({
+        "type": "turn",
+        "session_id": session_id,
+        "transcription": transcript,
+        "llm_response": response,
+        "detected_language": detected_language,
+        "eou_delay": metrics.get("EOU Delay"),
+        "ttft": metrics.get("TTFT"),
+        "ttfb": metrics.get("TTFB"),
+        "total_latency": metrics.get("Total Latency")
+    })
+
+
+def play_audio(audio_path: str):
+
+    """ Play an audio file with pygame and block until playback finishes."""
+
+    import pygame
+
+    pygame.mixer.init()
+    pygame.mixer.music.load(audio_path)
+    pygame.mixer.music.play()
+
+    while pygame.mixer.music.get_busy():
+        pygame.time.Clock().tick(10)
+
+
+def seconds(span) -> str:
+
+    """ Format a timer span for the metrics printout; spans whose marks were never reached print as n/a. """
+
+    return f"{span:.3f} sec" if span is not None else "n/a"
 
-    try:
-        if os.path.exists(log_path):
-            df_existing = pd.read_excel(log_path)
-            df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-        else:
-            df_combined = df_new
-    except Exception as e:
-        print(f"Failed reading or combining Excel: {e}")
-        return
-
-    # === Retry logic when writing ===
-    for attempt in range(3):  # Try up to 3 times
-        try:
-            df_combined.to_excel(log_path, index=False, engine="openpyxl")
-            print(f"Metrics logged to {log_path}")
-            break  # success: exit loop
-        except PermissionError:
-            print(f"Excel file is locked. Retrying in 3 seconds... (Attempt {attempt + 1}/3)")
-            time.sleep(3)
-        except Exception as e:
-            print(f"Unexpected error during Excel write: {e}")
-            break
 
+async def stream_response_to_speech(transcript: str, language: str, timer: TurnTimer, play: bool = True,
+                                    respond=stream_response, synthesize=text_to_speech) -> tuple:
 
+    """ Stream the LLM response and start TTS on each phrase as soon as it is complete.
+    Phrases are synthesized ahead while the previous one plays, so the first audio does not wait for the full answer.
+    respond and synthesize default to the Groq and ElevenLabs clients and can be swapped, e.g. by the benchmark."""
 
-async def voice_agent_pipeline(audio_path: str, language: str = "en"):
+    phrases = []
+    audio_paths = []
+    queue = asyncio.Queue()
+
+    async def tokens():
+        async for token in respond(transcript):
+            timer.mark("llm_first_token")
+            yield token
+
+    async def produce():
+        try:
+            async for phrase in chunk_stream(tokens()):
+                phrases.append(phrase)
+                await queue.put(asyncio.create_task(synthesize(phrase, language=language, timer=timer)))
+        finally:
+            timer.mark("llm_done")
+            await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            tts_task = await queue.get()
+            if tts_task is None:
+                break
+            if producer.done() and not producer.cancelled() and producer.exception():
+                tts_task.cancel()
+                await asyncio.gather(tts_task, return_exceptions=True)
+                break
+
+            audio_path = await tts_task
+            timer.mark("first_audio")
+            audio_paths.append(audio_path)
+            print(f"TTS audio saved at: {audio_path}")
+
+            # Play in a thread so the LLM stream and the next TTS request keep running
+            if play:
+                await asyncio.to_thread(play_audio, audio_path)
+    finally:
+        # Stop the LLM stream and any synthesis still queued, and wait for them to unwind
+        producer.cancel()
+        children = [producer]
+        while not queue.empty():
+            task = queue.get_nowait()
+            if task is not None:
+                task.cancel()
+                children.append(task)
+        results = await asyncio.gather(*children, return_exceptions=True)
+
+    # A failed LLM stream fails the turn instead of returning a partial or empty answer
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        raise errors[0]
+
+    timer.mark("playback_end")
+    return " ".join(phrases), audio_paths
+
+
+async def voice_agent_pipeline(audio_path: str, language: str = "en", stream: bool = True, play: bool = True,
+                               respond=stream_response, generate=generate_response, synthesize=text_to_speech):
 
     """ Voice Agent Pipeline: Processes audio input, transcribes it, generates a response, and converts it to speech.
-    This function orchestrates the entire voice agent pipeline, measuring latencies and handling audio processing."""
+    This function orchestrates the entire voice agent pipeline, measuring latencies and handling audio processing.
+    With stream=True the LLM response is streamed and spoken phrase by phrase. play=False skips pygame playback;
+    respond/generate/synthesize replace the streaming LLM, blocking LLM and file TTS calls.
+    The input file is a finished utterance, so the turn clock starts when STT starts and speech end is back-dated by the trailing silence."""
 
     print("Starting voice agent pipeline...")
 
     # 1. STT - transcribe user speech with language parameter
-    start_stt = time.time()
+    timer = TurnTimer()
+    timer.mark("eou")
+    timer.mark("stt_start")
     transcript, eou_time, detected_language = await asyncio.to_thread(transcribe_audio, audio_path, language)
-    stt_end = time.time()
+    timer.mark("stt_done")
+    timer.mark("speech_end", timer.marks["eou"] - eou_time)
     print(f"STT Transcript: {transcript}")
     print(f"EOU time (sec): {eou_time}")
     print(f"Detected Language: {detected_language}")
 
     # Calculate EOU delay (silence detection latency)
-    eou_delay = eou_time  # assuming returned EOU is delay after end of utterance
-
-    # 2. LLM - generate response
-    start_llm = time.time()
-    response = await generate_response(transcript)
-    llm_end = time.time()
-    print(f"LLM Response: {response}")
-
-    # 3. TTS - convert LLM response to speech
-    start_tts = time.time()
-    audio_output_path = await text_to_speech(response, language=detected_language)
-    tts_end = time.time()
-    print(f"TTS audio saved at: {audio_output_path}")
-
-    # Optional: Playback the generated TTS audio
-    import pygame
-
-    pygame.mixer.init()
-    pygame.mixer.music.load(audio_output_path)
-    pygame.mixer.music.play()
-
-    while pygame.mixer.music.get_busy():
-        pygame.time.Clock().tick(10)
-
+    eou_delay = eou_time  # audio after the VAD-detected end of speech, i.e. the wait an end-of-utterance detector pays
+
+    if stream:
+        # 2 + 3. LLM streamed into TTS phrase by phrase
+        timer.mark("llm_start")
+        response, audio_paths = await stream_response_to_speech(transcript, detected_language, timer, play, respond, synthesize)
+        print(f"LLM Response: {response}")
+        audio_output_path = audio_paths[0] if audio_paths else None
+    else:
+        # 2. LLM - generate response; without streaming the first token arrives with the whole answer
+        timer.mark("llm_start")
+        response = await generate(transcript)
+        timer.mark("llm_first_token")
+        timer.mark("llm_done")
+        print(f"LLM Response: {response}")
+
+        # 3. TTS - convert LLM response to speech
+        audio_output_path = await synthesize(response, language=detected_language, timer=timer)
+        timer.mark("first_audio")
+        print(f"TTS audio saved at: {audio_output_path}")
+        audio_paths = [audio_output_path]
+
+        # Optional: Playback the generated TTS audio
+        if play:
+            await asyncio.to_thread(play_audio, audio_output_path)
+        timer.mark("playback_end")
 
     # Calculate Metrics
-    ttft = start_llm - stt_end          # Time from STT done to LLM start (approx)
-    ttfb = start_tts - llm_end          # Time from LLM done to TTS start (approx)
-    total_latency = tts_end - start_stt # Total time from STT start to TTS done
+    timer.mark("first_audio", timer.marks["playback_end"])
+    ttft = timer.span("ttft")                       # LLM request to first token
+    ttfb = timer.span("ttfb") or 0.0                # First TTS request to its first audio byte
+    total_latency = timer.span("response_latency")  # End of input to first audio played
+    latency_stats.observe_turn(timer)
 
     print("\n=== Metrics ===")
     print(f"EOU Delay: {eou_delay:.3f} sec")
-    print(f"TTFT (STT->LLM): {ttft:.3f} sec")
-    print(f"TTFB (LLM->TTS): {ttfb:.3f} sec")
-    print(f"Total Latency (STT->TTS done): {total_latency:.3f} sec")
-
-    # Log metrics to Excel
-    log_metrics_to_excel(
-        log_path="session_metrics.xlsx",
+    print(f"STT: {seconds(timer.span('stt'))}")
+    print(f"TTFT: {seconds(ttft)}")
+    print(f"TTFB: {ttfb:.3f} sec")
+    print(f"Total Latency (input end -> first audio): {seconds(total_latency)}")
+    print(f"End-to-end (speech end -> first audio): {seconds(timer.span('e2e_latency'))}")
+
+    # Log metrics
+    log_metrics(
         transcript=transcript,
         response=response,
         detected_language=detected_language,
@@ -132,12 +204,14 @@ async def voice_agent_pipeline(audio_path: str, language: str = "en"):
         "detected_language": detected_language,
         "response": response,
         "audio_path": audio_output_path,
+        "audio_paths": audio_paths,
         "metrics": {
             "EOU Delay": eou_delay,
             "TTFT": ttft,
             "TTFB": ttfb,
             "Total Latency": total_latency
-        }
+        },
+        "spans": timer.spans()
     }
 
 
@@ -145,4 +219,11 @@ if __name__ == "__main__":
     audio_file = sys.argv[1] if len(sys.argv) > 1 else "app/test/test_audio.wav"
     # Optionally, accept language arg too
     language_arg = sys.argv[2] if len(sys.argv) > 2 else "en"
-    asyncio.run(voice_agent_pipeline(audio_file, language=language_arg))
\ No newline at end of file
+
+    async def main():
+        try:
+            await voice_agent_pipeline(audio_file, language=language_arg)
+        finally:
+            await http_clients.aclose()
+
+    asyncio.run(main())
\ No newline at end of file
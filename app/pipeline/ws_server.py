@@ -0,0 +1,272 @@
+# This module serves the voice agent over a plain WebSocket, for clients that do not join a LiveKit room.
+# Each connection is one ParticipantSession running the same VAD -> STT -> LLM -> TTS turn logic as the LiveKit agent:
+# the client streams 16 kHz mono int16 PCM as binary messages and the agent's speech comes back as binary PCM frames
+# on the same socket. Control messages are JSON text:
+#   server -> client  {"type": "ready", ...} once connected, {"type": "clear"} on barge-in (drop any audio still buffered)
+#   client -> server  {"type": "end"} when it has no more audio; the current answer is finished before the socket closes
+# Outbound audio goes through a small bounded queue per connection, so a slow reader makes playout wait instead of
+# buffering without limit, and a client that stops reading for WS_SEND_TIMEOUT seconds is disconnected.
+# The models warm up in the background after start; until then /ready answers 503 and connections are refused.
+#
+# Refused connections are accepted and then closed with a code: 1013 while warming up or at WS_MAX_SESSIONS,
+# 1008 for an output_sample_rate outside OUTPUT_SAMPLE_RATES.
+#
+# Usage: python app/pipeline/ws_server.py   (ws://WS_HOST:WS_PORT/ws?output_sample_rate=24000)
+
+# Import necessary libraries
+import sys
+import os
+import json
+import uuid
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from typing import AsyncIterator, Dict, Optional
+from fastapi import FastAPI, WebSocket
+from starlette.websockets import WebSocketDisconnect, WebSocketState
+from session import ParticipantSession
+from http_client import http_clients
+from stt_scheduler import stt_scheduler
+from metrics_server import start_metrics_server, add_health_routes
+from readiness import readiness, warm_up_process
+from config import settings
+
+INPUT_SAMPLE_RATE = 16000
+FRAME_MS = 20
+OUTPUT_SAMPLE_RATES = (8000, 16000, 22050, 24000, 44100, 48000)
+
+logger = logging.getLogger(__name__)
+
+class InboundFrame:
+
+    """One inbound audio frame; the session only reads .data."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+class WebSocketTrack:
+
+    """Inbound audio of one connection. Binary messages of any size are re-cut into 20 ms frames, the unit the VAD classifies."""
+
+    def __init__(self, websocket: WebSocket, sample_rate: int = INPUT_SAMPLE_RATE, frame_ms: int = FRAME_MS):
+        self.websocket = websocket
+        self.frame_bytes = sample_rate * frame_ms // 1000 * 2
+        self.ended = False  # The client sent {"type": "end"} rather than disconnecting
+
+    async def recv(self) -> AsyncIterator[InboundFrame]:
+        pending = bytearray()
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+            if message.get("bytes") is not None:
+                pending.extend(message["bytes"])
+                while len(pending) >= self.frame_bytes:
+                    yield InboundFrame(bytes(pending[:self.frame_bytes]))
+                    del pending[:self.frame_bytes]
+            elif message.get("text") is not None:
+                try:
+                    event = json.loads(message["text"])
+                except json.JSONDecodeError:
+                    logger.warning("Ignoring malformed control message")
+                    continue
+                if event.get("type") == "end":
+                    self.ended = True
+                    return
+
+class WebSocketAudioOutput:
+
+    """Session output that sends PCM frames to the client through a bounded queue drained by one sender task.
+    capture_frame waits while the queue is full, which carries the client's read rate back to the playout clock."""
+
+    def __init__(self, websocket: WebSocket, sample_rate: int = None, num_channels: int = 1,
+                 queue_ms: int = None, send_timeout: float = None):
+        self.websocket = websocket
+        self.sample_rate = sample_rate or settings.WS_OUTPUT_SAMPLE_RATE
+        self.num_channels = num_channels
+        self.send_timeout = settings.WS_SEND_TIMEOUT if send_timeout is None else send_timeout
+        queue_frames = max((settings.WS_SEND_QUEUE_MS if queue_ms is None else queue_ms) // FRAME_MS, 1)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_frames)
+        self.closed = asyncio.Event()
+
+        self.frames_sent = 0
+        self.frames_cleared = 0
+        self.full_waits = 0  # capture_frame calls that found the queue full
+
+    async def capture_frame(self, data: bytes):
+        if self.closed.is_set():
+            raise ConnectionError("WebSocket is closed")
+        if self.queue.full():
+            self.full_waits += 1
+        try:
+            await asyncio.wait_for(self.queue.put(data), timeout=self.send_timeout)
+        except asyncio.TimeoutError:
+            self.closed.set()
+            raise ConnectionError(f"Client read no audio for {self.send_timeout}s")
+
+    def send_event(self, event: dict):
+        """Queue a control message behind any audio already queued."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning(f"Send queue full, dropping control message {event.get('type')}")
+
+    def clear_queue(self):
+        """Drop queued audio and tell the client to drop what it has buffered (used on barge-in)."""
+        while not self.queue.empty():
+            if isinstance(self.queue.get_nowait(), bytes):
+                self.frames_cleared += 1
+        self.send_event({"type": "clear"})
+
+    async def run(self):
+        """Send queued frames and events until cancelled or the client goes away."""
+        try:
+            while True:
+                item = await self.queue.get()
+                if isinstance(item, bytes):
+                    await self.websocket.send_bytes(item)
+                    self.frames_sent += 1
+                else:
+                    await self.websocket.send_text(json.dumps(item))
+        except (WebSocketDisconnect, RuntimeError, ConnectionError) as e:
+            logger.debug(f"Sender stopped: {e}")
+        finally:
+            self.closed.set()
+
+    def stats(self) -> dict:
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_cleared": self.frames_cleared,
+            "full_waits": self.full_waits,
+            "queued": self.queue.qsize(),
+        }
+
+class WebSocketAgent:
+
+    """All WebSocket sessions of one process. Like VoiceAgentManager, every session shares the STT model, the HTTP pools
+    and one turn limiter, so the number of concurrent STT/LLM/TTS turns is capped per process."""
+
+    def __init__(self, max_sessions: int = None, turn_limiter: asyncio.Semaphore = None, session_kwargs: dict = None):
+        self.max_sessions = settings.WS_MAX_SESSIONS if max_sessions is None else max_sessions
+        self.turn_limiter = turn_limiter or asyncio.Semaphore(settings.MAX_CONCURRENT_TURNS)
+        self.session_kwargs = session_kwargs or {}
+        self.sessions: Dict[str, ParticipantSession] = {}
+
+    async def handle(self, websocket: WebSocket, output_sample_rate: Optional[int] = None):
+        """Run one connection's session until the client ends it or disconnects"""
+        if output_sample_rate is not None and output_sample_rate not in OUTPUT_SAMPLE_RATES:
+            await self.refuse(websocket, 1008, f"Unsupported output_sample_rate {output_sample_rate}")
+            return
+        if not readiness.ready:
+            await self.refuse(websocket, 1013, "Still warming up")  # Try again later
+            return
+        if len(self.sessions) >= self.max_sessions:
+            await self.refuse(websocket, 1013, f"Session limit reached ({self.max_sessions})")
+            return
+
+        # The session takes its slot before the first await, so simultaneous connections cannot exceed the limit
+        session_id = f"ws-{uuid.uuid4().hex[:8]}"
+        output = WebSocketAudioOutput(websocket, output_sample_rate)
+        session = ParticipantSession(session_id, output, sample_rate=INPUT_SAMPLE_RATE,
+                                     turn_limiter=self.turn_limiter, **self.session_kwargs)
+        track = WebSocketTrack(websocket)
+        self.sessions[session_id] = session
+        try:
+            await websocket.accept()
+        except BaseException:
+            self.sessions.pop(session_id, None)
+            raise
+
+        sender = asyncio.create_task(output.run())
+        output.send_event({
+            "type": "ready",
+            "session_id": session_id,
+            "input_sample_rate": INPUT_SAMPLE_RATE,
+            "output_sample_rate": output.sample_rate,
+            "frame_ms": FRAME_MS
+        })
+        logger.info(f"Session {session_id} opened ({len(self.sessions)} active)")
+
+        stream = asyncio.create_task(session.process_audio_stream(track))
+        closed = asyncio.create_task(output.closed.wait())
+        try:
+            # A client that stops reading closes the session, even while it is still sending audio
+            await asyncio.wait([stream, closed], return_when=asyncio.FIRST_COMPLETED)
+
+            if stream.done() and track.ended:
+                # Finish the answer to the last utterance before closing
+                while session.is_processing and not output.closed.is_set():
+                    await asyncio.sleep(0.05)
+                await self.drain(output)
+        finally:
+            for task in (stream, closed, sender):
+                task.cancel()
+            await asyncio.gather(stream, closed, sender, return_exceptions=True)
+            await session.close()
+            self.sessions.pop(session_id, None)
+
+            if websocket.client_state == WebSocketState.CONNECTED:
+                try:
+                    await websocket.close()
+                except RuntimeError:
+                    pass
+            logger.info(f"Session {session_id} closed: {output.stats()}")
+            await session.log_session_summary()
+
+    async def refuse(self, websocket: WebSocket, code: int, reason: str):
+        """Close a connection with a WebSocket close code. Closing before accept() would reach the client as HTTP 403."""
+        logger.warning(f"{reason}, refusing connection")
+        await websocket.accept()
+        await websocket.close(code=code, reason=reason)
+
+    async def drain(self, output: WebSocketAudioOutput, timeout: float = None):
+        """Wait until the sender has written every queued frame."""
+        deadline = asyncio.get_running_loop().time() + (settings.WS_SEND_TIMEOUT if timeout is None else timeout)
+        while not output.queue.empty() and not output.closed.is_set():
+            if asyncio.get_running_loop().time() > deadline:
+                return
+            await asyncio.sleep(0.02)
+
+def create_app(agent: WebSocketAgent = None) -> FastAPI:
+    """The WebSocket app; process-wide resources are warmed up and released in its lifespan."""
+    agent = agent or WebSocketAgent()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        metrics_server = start_metrics_server()
+        # Serve /health and /ready at once; sessions are accepted when the warm-up has finished
+        warmup_task = asyncio.create_task(warm_up_process())
+        try:
+            yield
+        finally:
+            warmup_task.cancel()
+            if metrics_server:
+                await metrics_server.aclose()
+            await http_clients.aclose()
+            await stt_scheduler.aclose()
+
+    app = FastAPI(title="Voice Agent WebSocket", lifespan=lifespan)
+    app.state.agent = agent
+    add_health_routes(app)
+
+    @app.websocket("/ws")
+    async def audio_socket(websocket: WebSocket, output_sample_rate: Optional[int] = None):
+        await agent.handle(websocket, output_sample_rate)
+
+    return app
+
+def main():
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Serving WebSocket audio at ws://{settings.WS_HOST}:{settings.WS_PORT}/ws")
+    uvicorn.run(create_app(), host=settings.WS_HOST, port=settings.WS_PORT, log_level="warning")
+
+if __name__ == "__main__":
+    main()
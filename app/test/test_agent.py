@@ -9,7 +9,7 @@ from pathlib import Path
 # Add the parent directory to Python path to locate the pipeline module
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
-from pipeline.voice_agent import voice_agent_pipeline
+from pipeline.voice_agent import voice_agent_pipeline, seconds
 
 async def test():
 
@@ -29,7 +29,7 @@ async def test():
     print(f"Audio Output: {result['audio_path']}")
     print("\nMetrics:")
     for metric, value in result['metrics'].items():
-        print(f"{metric}: {value:.3f} sec")
+        print(f"{metric}: {seconds(value)}")
 
 if __name__ == "__main__":
     asyncio.run(test())
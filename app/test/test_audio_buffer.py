@@ -0,0 +1,59 @@
+# Check the inbound audio ring buffer: wraparound, contiguous zero-copy views and the utterance window
+
+# Import necessary modules
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from pipeline.audio_buffer import AudioRingBuffer
+
+def ramp(start, count):
+    # Sample values equal their absolute index, so any view can be checked against np.arange
+    return np.arange(start, start + count, dtype=np.int16)
+
+def test_views_across_the_wrap_point_are_contiguous():
+    buffer = AudioRingBuffer(max_utterance_samples=6, preroll_samples=2, headroom_samples=2)  # capacity 10
+    for start in range(0, 33, 3):
+        buffer.write(ramp(start, 3))
+
+    assert buffer.written == 33 and buffer.oldest == 23
+    window = buffer.view(25, 33)  # Starts at offset 5 and crosses the end of the first copy
+    assert np.array_equal(window, ramp(25, 8))
+    assert np.shares_memory(window, buffer.data)
+    assert not window.flags.writeable
+
+def test_overwritten_samples_cannot_be_read():
+    buffer = AudioRingBuffer(max_utterance_samples=6, preroll_samples=2, headroom_samples=2)
+    buffer.write(ramp(0, 25))
+
+    assert not buffer.is_valid(14)
+    assert buffer.is_valid(15)
+    try:
+        buffer.view(14, 20)
+    except IndexError:
+        pass
+    else:
+        raise AssertionError("Expected IndexError for overwritten samples")
+
+def test_write_larger_than_capacity_keeps_the_newest_samples():
+    buffer = AudioRingBuffer(max_utterance_samples=6, preroll_samples=2, headroom_samples=2)
+    buffer.write(ramp(0, 4))
+    buffer.write(ramp(4, 23))
+
+    assert buffer.written == 27
+    assert np.array_equal(buffer.view(buffer.oldest), ramp(17, 10))
+
+def test_utterance_window_includes_preroll_and_slides_at_max_length():
+    buffer = AudioRingBuffer(max_utterance_samples=6, preroll_samples=2, headroom_samples=2)
+    buffer.write(ramp(0, 5))
+    buffer.begin_utterance()
+    assert buffer.utterance_start == 3
+
+    buffer.write(ramp(5, 6))
+    assert buffer.utterance_full
+    start, end = buffer.end_utterance()
+    assert (start, end) == (5, 11)
+    assert np.array_equal(buffer.view(start, end), ramp(5, 6))
+    assert buffer.utterance_length == 0
@@ -0,0 +1,93 @@
+# Check the outbound audio conversion: resampling is continuous across chunk boundaries, downsampling does not alias,
+# and output is cut into exact frames
+
+# Import necessary modules
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from pipeline.audio_out import AudioConverter, StreamResampler
+
+def tone(rate, seconds, channels=1, frequency=440):
+    t = np.arange(int(rate * seconds)) / rate
+    samples = (np.sin(2 * np.pi * frequency * t) * 10000).astype(np.float32)
+    return np.repeat(samples[:, None], channels, axis=1)
+
+def chunks_of(samples, sizes):
+    start, k = 0, 0
+    while start < len(samples):
+        size = sizes[k % len(sizes)]
+        yield samples[start:start + size]
+        start += size
+        k += 1
+
+def test_resampler_output_does_not_depend_on_chunking():
+    samples = tone(24000, 0.5)
+    whole = StreamResampler(24000, 16000).process(samples)
+
+    resampler = StreamResampler(24000, 16000)
+    pieces = np.concatenate([resampler.process(chunk) for chunk in chunks_of(samples, [1, 7, 480, 333, 2])])
+
+    assert len(pieces) == len(whole)
+    assert np.allclose(pieces, whole, atol=1e-2)
+
+def test_upsampling_keeps_the_rate_ratio():
+    resampler = StreamResampler(16000, 48000)
+    out = np.concatenate([resampler.process(chunk) for chunk in chunks_of(tone(16000, 1.0), [320])])
+    # The last output sample cannot be interpolated until the next input sample arrives
+    assert abs(len(out) - 48000) <= 3
+
+def rms(samples):
+    return float(np.sqrt(np.mean(np.square(samples))))
+
+def test_downsampling_to_8khz_does_not_alias():
+    # A 6 kHz tone is above the 4 kHz Nyquist frequency of 8 kHz output; unfiltered it folds back to 2 kHz at full level
+    resampler = StreamResampler(24000, 8000)
+    out = np.concatenate([resampler.process(chunk) for chunk in chunks_of(tone(24000, 1.0, frequency=6000), [480])])
+    assert rms(out[800:]) < rms(tone(8000, 1.0)) / 100  # At least 40 dB down
+
+def test_downsampling_keeps_the_pass_band():
+    resampler = StreamResampler(24000, 8000)
+    out = np.concatenate([resampler.process(chunk) for chunk in chunks_of(tone(24000, 1.0), [480])])
+    assert abs(rms(out[800:]) / rms(tone(8000, 1.0)) - 1) < 0.02
+
+def test_converter_flush_releases_the_filter_delay():
+    converter = AudioConverter(src_rate=24000, dst_rate=8000)
+    pcm = tone(24000, 1.0).astype(np.int16).tobytes()
+    frames = [frame for offset in range(0, len(pcm), 960) for frame in converter.push(pcm[offset:offset + 960])]
+    frames.extend(converter.flush())
+
+    # One second in, one second (50 frames of 20 ms) out, ending with the tone rather than the filter's delay
+    assert len(frames) == 50
+    assert rms(np.frombuffer(frames[-1], dtype=np.int16).astype(np.float32)) > 5000
+
+def test_converter_emits_exact_20ms_frames():
+    converter = AudioConverter(src_rate=22050, dst_rate=48000, src_channels=1, dst_channels=2)
+    pcm = tone(22050, 1.0).astype(np.int16).tobytes()
+
+    frames = []
+    for size in (101, 4410, 2, 9999):
+        for offset in range(0, len(pcm), size * 2):
+            frames.extend(converter.push(pcm[offset:offset + size * 2]))
+        frames.extend(converter.flush())
+
+        assert all(len(frame) == 48000 * 20 // 1000 * 2 * 2 for frame in frames)
+        frames.clear()
+
+def test_converter_passthrough_only_repackages():
+    converter = AudioConverter(16000, 16000)
+    frames = converter.push(b"\x01\x00" * 500)
+
+    assert frames == [b"\x01\x00" * 320]
+    assert converter.flush() == [b"\x01\x00" * 180 + b"\x00" * 280]
+
+def test_converter_rejects_rates_too_low_for_one_frame():
+    # 40 Hz has no whole sample in 20 ms; a zero frame size used to make push() loop forever
+    for rate in (40, 0, -16000):
+        try:
+            AudioConverter(16000, rate)
+        except ValueError:
+            continue
+        raise AssertionError(f"Expected ValueError for {rate} Hz")
@@ -0,0 +1,42 @@
+# Check how streamed LLM text is split into speakable phrases
+
+# Import necessary modules
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from pipeline.chunker import SentenceChunker
+
+def feed_tokens(chunker, text, size=3):
+    phrases = []
+    for start in range(0, len(text), size):
+        phrases.extend(chunker.feed(text[start:start + size]))
+    return phrases
+
+def test_sentences_are_emitted_as_soon_as_they_end():
+    chunker = SentenceChunker()
+    assert feed_tokens(chunker, "Sure. I can help with that! Anything else? ") == ["Sure.", "I can help with that!", "Anything else?"]
+    assert chunker.flush() == []
+
+def test_abbreviations_do_not_end_a_sentence():
+    chunker = SentenceChunker()
+    phrases = feed_tokens(chunker, "Dr. Smith sees patients at 9.30 on Main St. every day. Call ahead, e.g. by phone. ")
+    assert phrases == ["Dr. Smith sees patients at 9.30 on Main St. every day.", "Call ahead, e.g. by phone."]
+
+def test_clauses_split_only_past_the_minimum_length():
+    chunker = SentenceChunker(min_chars=20)
+    assert chunker.feed("Yes, well, ") == []
+    assert chunker.feed("our office is open on weekdays, and ") == ["Yes, well, our office is open on weekdays,"]
+    assert chunker.flush() == ["and"]
+
+def test_long_text_without_punctuation_is_split_at_a_space():
+    chunker = SentenceChunker(min_chars=20, max_chars=30)
+    phrases = chunker.feed("one two three four five six seven eight nine ten")
+    assert phrases == ["one two three four five six"]
+    assert chunker.flush() == ["seven eight nine ten"]
+
+def test_flush_returns_the_unterminated_remainder_once():
+    chunker = SentenceChunker()
+    assert chunker.feed("Thanks for calling") == []
+    assert chunker.flush() == ["Thanks for calling"]
+    assert chunker.flush() == []
@@ -0,0 +1,47 @@
+# Check the LLM response cache: key normalization, LRU and TTL eviction, and prompts excluded from caching
+
+# Import necessary modules
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from pipeline.llm_cache import ResponseCache, normalize_prompt
+
+def key(cache, text):
+    return cache.make_key(text, "prompt", "model", 0.7)
+
+def test_normalized_prompts_share_a_key():
+    cache = ResponseCache(max_entries=10, ttl_seconds=60)
+    assert normalize_prompt("  What ARE your hours?! ") == "what are your hours"
+    assert key(cache, "What are your hours?") == key(cache, "what are your  hours")
+    assert key(cache, "What are your hours?") != cache.make_key("What are your hours?", "prompt", "other-model", 0.7)
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"  # "b" is now the least recently used
+    cache.put("c", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    assert len(cache.entries) == 2
+
+def test_entries_expire_after_the_ttl():
+    cache = ResponseCache(max_entries=10, ttl_seconds=0.05)
+    cache.put("a", "A")
+    assert cache.get("a") == "A"
+    time.sleep(0.06)
+
+    assert cache.get("a") is None
+    assert "a" not in cache.entries
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_time_sensitive_prompts_are_not_cacheable():
+    cache = ResponseCache(max_entries=10, ttl_seconds=60)
+    assert not cache.is_cacheable("What's the weather like in Mumbai today?")
+    assert not cache.is_cacheable("Tell me a joke")
+    assert cache.is_cacheable("What are your opening hours?")
+    assert cache.stats()["skipped"] == 2
@@ -0,0 +1,110 @@
+# Check LLM request hedging: which model wins, failover when the primary errors, and that the loser is closed
+
+# Import necessary modules
+import os
+import sys
+import asyncio
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from config import settings
+from pipeline.llm_hedge import HedgeStats, _background_tasks, hedged_call, hedged_stream
+
+class FixedDeadline(HedgeStats):
+
+    """Hedges after a fixed 50 ms, whatever the configured deadline."""
+
+    def deadline(self) -> float:
+        return 0.05
+
+def model(name, delay, closed, fail=False):
+    """A fake streaming model: first token after delay seconds, records its name in closed when its stream is closed."""
+    async def stream():
+        try:
+            await asyncio.sleep(delay)
+            if fail:
+                raise RuntimeError(f"{name} failed")
+            for token in ("one ", "two"):
+                yield f"{name}:{token}"
+        finally:
+            closed.append(name)
+    return stream
+
+def run(primary, fallback, stats):
+    outcome = {}
+
+    async def consume():
+        return [token async for token in hedged_stream(primary, fallback, stats, outcome)]
+
+    return asyncio.run(consume()), outcome
+
+def test_fast_primary_is_not_hedged():
+    closed, stats = [], FixedDeadline("test")
+    tokens, outcome = run(model("primary", 0.01, closed), model("fallback", 0.01, closed), stats)
+
+    assert tokens == ["primary:one ", "primary:two"]
+    assert outcome == {"winner": "primary"}
+    assert stats.hedged == 0 and closed == ["primary"]
+    assert len(stats.primary_latency) == 1
+
+def test_slow_primary_loses_to_the_fallback_and_is_cancelled():
+    closed, stats = [], FixedDeadline("test")
+    tokens, outcome = run(model("primary", 1.0, closed), model("fallback", 0.01, closed), stats)
+
+    assert tokens == ["fallback:one ", "fallback:two"]
+    assert outcome == {"hedged": True, "winner": "fallback"}
+    assert stats.hedged == 1 and stats.fallback_wins == 1
+    assert sorted(closed) == ["fallback", "primary"]
+    # The cancelled primary still counts, as a lower bound, in the percentile window and in the latency saved
+    assert len(stats.primary_latency) == 1 and stats.primary_latency[0] < 1.0
+    assert list(stats.saved) == [] and len(stats.saved_lower_bound) == 1 and stats.saved_lower_bound[0] >= 0
+    assert stats.stats()["saved_lower_bound_ms"]["count"] == 1
+    assert stats.stats()["saved_ms"]["measured"] == 0 and stats.stats()["saved_ms"]["unmeasured"] == 1
+
+def test_grace_period_measures_the_latency_saved(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGE_LOSER_GRACE_MS", 200)
+    closed, stats = [], FixedDeadline("test")
+
+    async def consume():
+        tokens = [token async for token in hedged_stream(model("primary", 0.15, closed), model("fallback", 0.01, closed), stats)]
+        await asyncio.gather(*_background_tasks)
+        return tokens
+
+    assert asyncio.run(consume()) == ["fallback:one ", "fallback:two"]
+    assert len(stats.saved) == 1 and 0.05 < stats.saved[0] < 0.15
+    assert list(stats.saved_lower_bound) == [] and stats.unmeasured_wins == 0
+    assert sorted(closed) == ["fallback", "primary"]
+
+def test_primary_that_answers_first_after_the_hedge_still_wins():
+    closed, stats = [], FixedDeadline("test")
+    tokens, outcome = run(model("primary", 0.08, closed), model("fallback", 1.0, closed), stats)
+
+    assert tokens == ["primary:one ", "primary:two"]
+    assert outcome == {"hedged": True, "winner": "primary"}
+    assert stats.primary_wins_after_hedge == 1
+    assert sorted(closed) == ["fallback", "primary"]
+
+def test_failed_primary_fails_over_before_the_deadline():
+    closed, stats = [], HedgeStats("test")  # Default deadline, far longer than this test
+    tokens, outcome = run(model("primary", 0.01, closed, fail=True), model("fallback", 0.01, closed), stats)
+
+    assert tokens == ["fallback:one ", "fallback:two"]
+    assert outcome["winner"] == "fallback"
+    assert stats.failovers == 1
+
+def test_error_is_raised_when_no_model_answers():
+    closed, stats = [], FixedDeadline("test")
+    try:
+        run(model("primary", 0.01, closed, fail=True), None, stats)
+    except RuntimeError as e:
+        assert str(e) == "primary failed"
+    else:
+        raise AssertionError("Expected the primary's error")
+
+def test_hedged_call_returns_the_first_complete_answer():
+    async def answer(text, delay):
+        await asyncio.sleep(delay)
+        return text
+
+    outcome = {}
+    result = asyncio.run(hedged_call(lambda: answer("slow", 1.0), lambda: answer("fast", 0.01), FixedDeadline("test"), outcome))
+    assert result == "fast" and outcome["winner"] == "fallback"
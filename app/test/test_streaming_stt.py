@@ -0,0 +1,83 @@
+# Check the streaming transcriber: local-agreement commits, and that a decode never overlaps another on the same transcriber
+
+# Import necessary modules
+import os
+import sys
+import time
+import threading
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from pipeline import streaming_stt as streaming_module
+from pipeline.streaming_stt import StreamingTranscriber
+
+class ScriptedEngine:
+
+    """Answers each decode with the next scripted word list, taking delay seconds, and records overlapping decodes."""
+
+    def __init__(self, script, delay=0.0):
+        self.script = list(script)
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def transcribe(self, audio, language=None, word_timestamps=False, prompt=None):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        words = self.script.pop(0) if len(self.script) > 1 else self.script[0]
+        with self.lock:
+            self.running -= 1
+        return {
+            "text": "".join(words),
+            "language": "en",
+            "language_probability": 0.99,
+            "avg_logprob": -0.2,
+            "words": [(0.2 * i, 0.2 * i + 0.2, word) for i, word in enumerate(words)],
+        }
+
+def transcriber_with(monkeypatch, engine):
+    monkeypatch.setattr(streaming_module.stt, "get_engine", lambda: engine)
+    transcriber = StreamingTranscriber(sample_rate=16000)
+    transcriber.insert_audio(np.zeros(16000, dtype=np.int16))
+    return transcriber
+
+def test_words_two_decodes_agree_on_are_committed(monkeypatch):
+    engine = ScriptedEngine([[" Hello", " word"], [" hello", " world,", " how"]])
+    transcriber = transcriber_with(monkeypatch, engine)
+
+    assert transcriber.process() == "Hello word"
+    assert transcriber.committed == []
+    assert transcriber.process() == "hello world, how"
+    assert [word for _, _, word in transcriber.committed] == [" hello"]
+    assert transcriber.language == "en" and transcriber.detected
+
+def test_finalize_without_reset_keeps_the_utterance(monkeypatch):
+    engine = ScriptedEngine([[" one", " two"]])
+    transcriber = transcriber_with(monkeypatch, engine)
+
+    assert transcriber.finalize(reset=False) == ("one two", "en")
+    assert len(transcriber.buffer) == 16000
+    assert transcriber.finalize() == ("one two", "en")
+    assert len(transcriber.buffer) == 0 and transcriber.committed == []
+
+def test_partial_waits_for_a_speculative_finalize_still_decoding(monkeypatch):
+    # A discarded speculative turn cannot stop its finalize() on the worker; the next partial must not interleave with it
+    engine = ScriptedEngine([[" one", " two"]], delay=0.05)
+    transcriber = transcriber_with(monkeypatch, engine)
+
+    threads = [
+        threading.Thread(target=transcriber.finalize, kwargs={"reset": False}),
+        threading.Thread(target=transcriber.process),
+        threading.Thread(target=transcriber.process),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert engine.max_running == 1
+    assert transcriber.decodes == 3
@@ -0,0 +1,32 @@
+# Compare the faster-whisper and openai-whisper STT engines on the same audio
+
+# Import necessary modules
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from pipeline.stt import create_engine
+
+def test():
+    '''    Function to transcribe the test audio with each engine and print text, language and decode time.   '''
+
+    file_path = "app/test/test_audio.wav"
+
+    for name in ("faster-whisper", "whisper"):
+        load_start = time.perf_counter()
+        engine = create_engine(name)
+        load_time = time.perf_counter() - load_start
+
+        # First call includes one-off warm-up work, so time the second one as well
+        for run in range(2):
+            start = time.perf_counter()
+            result = engine.transcribe(file_path)
+            elapsed = time.perf_counter() - start
+            print(f"[{engine.name}] run {run + 1}: {elapsed:.3f}s (load {load_time:.2f}s)")
+
+        print(f"[{engine.name}] Transcription: {result['text']}")
+        print(f"[{engine.name}] Detected Language: {result['language']} ({result['language_probability']})")
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,65 @@
+# Check that the STT scheduler batches final transcriptions across sessions and runs other model calls one at a time
+
+# Import necessary modules
+import os
+import sys
+import asyncio
+import threading
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from pipeline import stt_scheduler as scheduler_module
+from pipeline.stt_scheduler import STTScheduler
+
+class RecordingEngine:
+
+    """Returns one result per input and records the size of every batch it decodes."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def transcribe_batch(self, audios, languages):
+        self.batch_sizes.append(len(audios))
+        return [{"text": f"utterance {len(audio)}", "language": language or "en"} for audio, language in zip(audios, languages)]
+
+def run_scheduler(engine, monkeypatch, jobs):
+    # stt_scheduler holds its own reference to the stt module; the engine is swapped there
+    monkeypatch.setattr(scheduler_module.stt, "get_engine", lambda: engine)
+
+    async def main():
+        scheduler = STTScheduler(batch_window_ms=50, max_batch_size=8, max_queue=16, workers=1)
+        try:
+            return await asyncio.gather(*(job(scheduler) for job in jobs)), scheduler.stats()
+        finally:
+            await scheduler.aclose()
+
+    return asyncio.run(main())
+
+def test_simultaneous_finals_are_decoded_as_one_batch(monkeypatch):
+    engine = RecordingEngine()
+    jobs = [lambda s, n=n: s.transcribe(np.zeros(1600 * n, dtype=np.float32), language="en") for n in (1, 2, 3)]
+    results, stats = run_scheduler(engine, monkeypatch, jobs)
+
+    assert [result["text"] for result in results] == ["utterance 1600", "utterance 3200", "utterance 4800"]
+    assert engine.batch_sizes == [3]
+    assert stats["batches"] == 1 and stats["avg_batch_size"] == 3
+
+def test_streaming_finalize_calls_are_not_batched(monkeypatch):
+    # A streaming session finalizes through run(); those calls never join a batch
+    engine = RecordingEngine()
+    running, overlaps = [], []
+
+    def finalize(name):
+        running.append(name)
+        overlaps.append(len(running))
+        threading.Event().wait(0.01)
+        running.remove(name)
+        return name
+
+    jobs = [lambda s, n=n: s.run(finalize, f"session {n}") for n in range(3)]
+    results, stats = run_scheduler(engine, monkeypatch, jobs)
+
+    assert results == ["session 0", "session 1", "session 2"]
+    assert engine.batch_sizes == [] and stats["batches"] == 0
+    assert max(overlaps) == 1
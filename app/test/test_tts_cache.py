@@ -0,0 +1,67 @@
+# Check the TTS cache: memory LRU eviction, the disk byte budget and content addressing by voice
+
+# Import necessary modules
+import os
+import sys
+import time
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from pipeline.tts_cache import TTSCache, make_key
+
+FRAME_BYTES = 4
+
+def frames(fill, count):
+    return [bytes([fill]) * FRAME_BYTES for _ in range(count)]
+
+def test_least_recently_used_entry_leaves_memory_first(tmp_path):
+    cache = TTSCache(memory_bytes=16, disk_dir=str(tmp_path), disk_bytes=1024)
+    cache.put("a", frames(1, 2))
+    cache.put("b", frames(2, 2))
+    assert cache.get_from_memory("a") == frames(1, 2)  # "b" is now the least recently used
+    cache.put("c", frames(3, 2))
+
+    assert cache.get_from_memory("b") is None
+    assert list(cache.memory) == ["a", "c"] and cache.memory_size == 16
+
+    # Still on disk, and promoted back into memory on read
+    assert cache.get("b", FRAME_BYTES) == frames(2, 2)
+    assert cache.disk_hits == 1 and "b" in cache.memory
+
+def test_disk_stays_within_its_byte_budget(tmp_path):
+    cache = TTSCache(memory_bytes=0, disk_dir=str(tmp_path), disk_bytes=20)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, frames(i, 2))
+        time.sleep(0.01)  # Distinct mtimes, so the oldest file is evicted first
+
+    assert cache.disk_size == 16
+    assert sum(p.stat().st_size for p in tmp_path.glob("*/*.pcm")) == 16
+    assert cache.get("a", FRAME_BYTES) is None
+    assert cache.get("c", FRAME_BYTES) == frames(2, 2)
+    assert cache.misses == 1
+
+def test_counters_and_disk_size_hold_under_concurrent_writers(tmp_path):
+    cache = TTSCache(memory_bytes=0, disk_dir=str(tmp_path), disk_bytes=1 << 20)
+
+    def work(worker):
+        for i in range(50):
+            cache.put(f"{worker}-{i}", frames(worker, 1))
+            cache.get(f"{worker}-{i}", FRAME_BYTES)
+            cache.get(f"missing-{worker}-{i}", FRAME_BYTES)
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert cache.hits == 200 and cache.disk_hits == 200 and cache.misses == 200
+    assert cache.disk_size == 200 * FRAME_BYTES
+
+def test_key_changes_with_voice_but_not_with_whitespace():
+    settings = {"stability": 0.5}
+    key = make_key("Hello  there", "voice-a", "model", settings, "pcm_16000")
+
+    assert key == make_key("Hello there ", "voice-a", "model", settings, "pcm_16000")
+    assert key != make_key("Hello there", "voice-b", "model", settings, "pcm_16000")
+    assert key != make_key("Hello there", "voice-a", "model", settings, "pcm_24000")
@@ -0,0 +1,72 @@
+# Check the voice activity detector: adaptive noise floor, onset confirmation, hangover and offline speech end detection
+
+# Import necessary modules
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from pipeline.vad import VoiceActivityDetector, find_speech_end
+
+RATE = 16000
+FRAME = RATE // 50  # 20 ms
+
+def noise(seconds, dbfs, seed=0):
+    samples = np.random.default_rng(seed).standard_normal(int(RATE * seconds))
+    return (samples * 32768 * 10 ** (dbfs / 20)).astype(np.int16)
+
+def tone(seconds, dbfs=-20):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (np.sin(2 * np.pi * 440 * t) * np.sqrt(2) * 32768 * 10 ** (dbfs / 20)).astype(np.int16)
+
+def detector():
+    return VoiceActivityDetector(RATE, threshold_db=10, min_energy_dbfs=-50, hangover_ms=200, min_speech_ms=60)
+
+def feed(vad, audio):
+    """Feed 20 ms frames and return (event, stream_time) for every state change."""
+    events = []
+    for start in range(0, len(audio) - FRAME + 1, FRAME):
+        event = vad.process(audio[start:start + FRAME])
+        if event:
+            events.append((event, round(vad.stream_time, 2)))
+    return events
+
+def test_speech_start_is_confirmed_after_the_minimum_speech_time():
+    vad = detector()
+    events = feed(vad, np.concatenate([noise(0.5, -60), tone(0.5)]))
+
+    # Voiced from 0.5 s; confirmed once 60 ms of it has been seen, and back-dated to the onset
+    assert events == [("speech_start", 0.56)]
+    assert round(vad.speech_start_time, 2) == 0.5
+
+def test_a_short_click_does_not_open_an_utterance():
+    vad = detector()
+    assert feed(vad, np.concatenate([noise(0.5, -60), tone(0.04), noise(0.5, -60, seed=1)])) == []
+    assert not vad.has_speech
+
+def test_speech_end_waits_for_the_hangover():
+    vad = detector()
+    events = feed(vad, np.concatenate([noise(0.5, -60), tone(0.5), noise(0.1, -60, seed=1)]))
+    assert events == [("speech_start", 0.56)]
+    assert vad.in_speech and round(vad.silence_duration(), 2) == 0.1
+
+    events = feed(vad, noise(0.2, -60, seed=2))
+    assert events == [("speech_end", 1.2)]
+    assert round(vad.speech_end_time, 2) == 1.0
+
+def test_noise_floor_follows_drops_quickly_and_rises_slowly():
+    vad = detector()
+    feed(vad, noise(0.4, -40))
+    assert abs(vad.noise_floor_db - (-40)) < 1
+
+    feed(vad, noise(0.2, -60, seed=1))
+    assert abs(vad.noise_floor_db - (-60)) < 1  # 10 frames at rate 0.5
+
+    feed(vad, noise(0.2, -52, seed=2))
+    assert -59 < vad.noise_floor_db < -55  # Below the threshold, so not speech, but only slowly adopted
+
+def test_find_speech_end_on_a_whole_buffer():
+    audio = np.concatenate([noise(0.5, -60), tone(0.8), noise(0.7, -60, seed=1)])
+    assert abs(find_speech_end(audio, RATE) - 1.3) < 0.03
+    assert find_speech_end(noise(1.0, -60), RATE) is None